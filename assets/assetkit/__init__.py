@@ -0,0 +1 @@
+# shared helpers for the per-article asset generators under assets/<slug>/
@@ -0,0 +1,184 @@
+# procedural backgrounds: gradients, stripe fields, seeded grain and soft
+# glows are computed as NumPy arrays over a whole canvas region in one
+# vectorized pass instead of one Pillow primitive per ring, line or pixel,
+# then handed to Pillow without a copy (Image.frombuffer) to be blended in C.
+# Coordinates are 1x logical units like everywhere else; grid() maps a
+# region of a (possibly tiled, see tiled.py) canvas to them, so patterns come
+# out the same at every scale and across tile seams. Needs numpy.
+import numpy as np
+from PIL import Image
+
+from . import canvas
+
+# a glow's opacity falls off as exp(-GLOW_FALLOFF * (d / radius)**2),
+# i.e. to about 1% at the radius, where it is cut
+GLOW_FALLOFF = 4.5
+
+RAMP_STEPS = 1024
+
+
+def region(box, size):
+    # device box (l, t, r, b) clipped to a canvas of `size`; None when empty
+    l, t, r, b = box
+    w, h = size
+    l, t = max(int(np.floor(l)), 0), max(int(np.floor(t)), 0)
+    r, b = min(int(np.ceil(r)), w), min(int(np.ceil(b)), h)
+    if r <= l or b <= t:
+        return None
+    return l, t, r, b
+
+
+def grid(box, scale=1, viewport=None):
+    # logical coordinates of the pixels of a canvas region: x as a (1, w)
+    # row and y as an (h, 1) column, ready to broadcast. Pixel centres sit
+    # on integer device coordinates, as with ImageDraw
+    l, t, r, b = box
+    ox, oy = (viewport.x, viewport.y) if viewport is not None else (0, 0)
+    x = np.arange(l + ox, r + ox, dtype=np.float32) / scale
+    y = np.arange(t + oy, b + oy, dtype=np.float32) / scale
+    return x[None, :], y[:, None]
+
+
+def _ramp(t, colors):
+    # uint8 RGBA of t's shape plus 4: colours spaced evenly over t in [0, 1],
+    # looked up in a RAMP_STEPS table (finer than 8-bit output can show)
+    colors = np.array([tuple(c) + (255,) * (4 - len(c)) for c in colors], dtype=np.float32)
+    stops = np.linspace(0, 1, len(colors))
+    steps = np.linspace(0, 1, RAMP_STEPS)
+    table = np.stack([np.interp(steps, stops, colors[:, i]) for i in range(4)], axis=1)
+    # gathered as one uint32 per pixel rather than four bytes
+    table = np.rint(table).astype(np.uint8).view(np.uint32)[:, 0]
+    index = np.clip(t * (RAMP_STEPS - 1) + 0.5, 0, RAMP_STEPS - 1).astype(np.uint16)
+    return table[index].view(np.uint8).reshape(index.shape + (4,))
+
+
+def linear_gradient(x, y, start, end, colors):
+    # colours along start -> end, held beyond either end
+    (x0, y0), (x1, y1) = start, end
+    dx, dy = x1 - x0, y1 - y0
+    norm = float(dx * dx + dy * dy or 1)
+    # an axis-aligned gradient is ramped once per row or column and broadcast
+    t = 0
+    if dx:
+        t = t + (x - x0) * (dx / norm)
+    if dy:
+        t = t + (y - y0) * (dy / norm)
+    shape = np.broadcast_shapes(x.shape, y.shape)
+    return np.broadcast_to(_ramp(np.asarray(t, dtype=np.float32), colors), shape + (4,))
+
+
+def radial_gradient(x, y, center, radius, colors):
+    # colours from the centre out to radius, held beyond it
+    cx, cy = center
+    return _ramp(np.hypot(x - cx, y - cy) / radius, colors)
+
+
+def glow(x, y, center, radius):
+    # coverage of a soft round glow. The Gaussian is separable, so it is the
+    # outer product of one falloff along the row and one down the column
+    cx, cy = center
+    dx2 = ((x - cx) / np.float32(radius)) ** 2
+    dy2 = ((y - cy) / np.float32(radius)) ** 2
+    falloff = np.exp(-GLOW_FALLOFF * dy2) * np.exp(-GLOW_FALLOFF * dx2)
+    return np.where(dy2 + dx2 < 1, falloff, np.float32(0))
+
+
+def stripes(x, y, start, stop, step, dx, y0, y1, width, scale=1):
+    # anti-aliased coverage of the parallel lines (s, y0) -> (s + dx, y1)
+    # for s in range(start, stop, step), width logical pixels wide and
+    # further apart than that. A thin field covers a few percent of the
+    # frame, so only the pixels within reach of a line on each row are
+    # computed, (rows, lines, reach) at once, and scattered into the frame
+    slope = dx / float(y1 - y0)
+    across = float(np.hypot(1, slope))   # horizontal run per unit of perpendicular distance
+    half = width * scale / 2 + 0.5
+    reach = int(np.ceil(half * across)) + 1
+    rows = np.flatnonzero((y[:, 0] >= y0) & (y[:, 0] <= y1))
+    lines = np.arange(start, stop, step, dtype=np.float32)
+    # each line's centre on each row, in device columns of the region
+    centre = (lines[None, :] + (y[rows] - y0) * slope - x[0, 0]) * scale
+    cols = np.floor(centre)[:, :, None].astype(np.int32) + np.arange(-reach, reach + 1, dtype=np.int32)
+    coverage = np.clip(half - np.abs(cols - centre[:, :, None]) / across, 0, 1)
+    keep = (cols >= 0) & (cols < x.shape[1]) & (coverage > 0)
+    out = np.zeros((y.shape[0], x.shape[1]), dtype=np.float32)
+    out[np.broadcast_to(rows[:, None, None], cols.shape)[keep], cols[keep]] = coverage[keep]
+    return out
+
+
+def _hash(ix, iy, seed):
+    # uint32 hash of integer positions, broadcast
+    h = ix * np.uint32(374761393) + iy * np.uint32(668265263) + np.uint32(seed * 2654435761 % 2**32)
+    h = (h ^ (h >> np.uint32(13))) * np.uint32(1274126177)
+    return h ^ (h >> np.uint32(16))
+
+
+def _frame_range(lo, hi, offset, cell=1):
+    # the cells covering canvas pixels [lo, hi) of a tile at offset
+    return np.arange((lo + offset) // cell, (hi + offset - 1) // cell + 1, dtype=np.uint32)
+
+
+def noise(box, seed=0, viewport=None):
+    # seeded uniform noise in [0, 1) per device pixel: an integer hash of the
+    # pixel's position in the frame, so tiles agree and reruns are identical.
+    # Grain is a texture of the output, it is not scaled with the frame
+    l, t, r, b = box
+    ox, oy = (viewport.x, viewport.y) if viewport is not None else (0, 0)
+    h = _hash(_frame_range(l, r, ox)[None, :], _frame_range(t, b, oy)[:, None], seed)
+    return (h >> np.uint32(8)).astype(np.float32) / float(1 << 24)
+
+
+def specks(box, density, seed=0, viewport=None):
+    # a sparse seeded dust, about density of the pixels: one speck per cell
+    # of 1 / density pixels, at a spot in it hashed from the cell's position
+    # in the frame. Only the cells are hashed, and the specks come back as
+    # canvas (x, y) lists to be drawn as points
+    l, t, r, b = box
+    ox, oy = (viewport.x, viewport.y) if viewport is not None else (0, 0)
+    cell = max(1, round(density ** -0.5))
+    cx, cy = _frame_range(l, r, ox, cell)[None, :], _frame_range(t, b, oy, cell)[:, None]
+    h = _hash(cx, cy, seed)
+    x = (cx * cell + h % np.uint32(cell)).astype(np.int64) - ox
+    y = (cy * cell + (h >> np.uint32(16)) % np.uint32(cell)).astype(np.int64) - oy
+    inside = (x >= l) & (x < r) & (y >= t) & (y < b)
+    return x[inside].tolist(), y[inside].tolist()
+
+
+def to_mask(coverage, opacity=1):
+    # float coverage in [0, 1], times opacity -> 'L' image sharing the
+    # array's memory
+    a = (coverage * np.float32(255 * opacity) + np.float32(0.5)).astype(np.uint8)
+    return Image.frombuffer('L', (a.shape[1], a.shape[0]), a, 'raw', 'L', 0, 1)
+
+
+def to_image(rgba, mode='RGBA'):
+    # a gradient broadcast along an axis (linear_gradient) is made from its
+    # one row or column and stretched, without filling the array first
+    h, w = rgba.shape[:2]
+    if h > 1 and rgba.strides[0] == 0:
+        return to_image(rgba[:1], mode).resize((w, h), Image.NEAREST)
+    if w > 1 and rgba.strides[1] == 0:
+        return to_image(rgba[:, :1], mode).resize((w, h), Image.NEAREST)
+    a = np.ascontiguousarray(rgba, dtype=np.uint8)
+    img = Image.frombuffer('RGBA', (a.shape[1], a.shape[0]), a, 'raw', 'RGBA', 0, 1)
+    return img if mode == 'RGBA' else img.convert(mode)
+
+
+def mix(a, b, t):
+    # palette colour a moved a fraction t of the way to b
+    return tuple(round(u + (v - u) * t) for u, v in zip(a, b))
+
+
+def paint(img, box, color, coverage):
+    # blend a flat colour into img's box through the coverage; Pillow
+    # pastes an image through a mask about twice as fast as a colour
+    mask = to_mask(coverage, color[3] / 255 if len(color) == 4 else 1)
+    img.paste(Image.new(img.mode, mask.size, tuple(color[:3]) + (255,) * (img.mode == 'RGBA')), box[:2], mask)
+
+
+def composite(img, box, rgba, opaque=False):
+    # a gradient or other RGBA array over img at box; an opaque one is
+    # simply pasted
+    if opaque:
+        img.paste(to_image(rgba, img.mode), box[:2])
+    else:
+        canvas.composite(img, to_image(rgba), box[:2])
@@ -0,0 +1,307 @@
+# benchmark harness for the generators: every figure of both articles is
+# rendered at 1x and 2x over a few iterations, timing the draw and encode
+# stages separately, and compared against a JSON baseline kept in the repo.
+#
+# Build boxes and laptops change speed over seconds (turbo, throttling,
+# neighbours), so raw milliseconds from two sessions can't be compared.
+# Every run is followed by a fixed reference workload (calibrate()) and its
+# timings are also kept in calibration units, run ms over reference ms: the
+# two ran at the same host speed. The iterations go round all the cases, so
+# each one is sampled across the session. compare() takes the median in
+# calibration units per case and only reports growth past the threshold by
+# more than the noise band: the run-to-run spread in the baseline and now, and
+# how far cases drift between sessions with nothing changed, estimated from
+# the spread of new / old over all the cases compared.
+#
+# A change that is meant to cost more (or less) re-records the baseline with
+# a note saying why, kept in the file with the earlier ones.
+#
+#   cd assets && python -m assetkit.bench                                     # compare
+#   cd assets && python -m assetkit.bench --save-baseline --note 'why ...'    # record
+import argparse
+import ctypes
+import ctypes.util
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import zlib
+
+import PIL
+
+from . import encode, generators, layers, shapes, tag
+from .generators import ASSETS_DIR
+
+BASELINE_PATH = os.path.join(ASSETS_DIR, 'bench-baseline.json')
+SCALES = (1, 2)
+DEFAULT_ITERATIONS = 5
+# a metric regresses when it grows by more than this fraction of the
+# baseline; timings also have to grow by more than MIN_DELTA_MS and clear
+# the threshold by NOISE_BAND standard deviations of the noise (see
+# compare()), and peak memory by MIN_DELTA_BYTES
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA_MS = 2.0
+NOISE_BAND = 3.0
+# fewer timings than this compared (a --filter run) can't tell drift apart
+# from a regression, and only the run-to-run noise is used
+MIN_DRIFT_SAMPLES = 12
+MIN_DELTA_BYTES = 1 << 20
+# the RSS high-water mark moves by whole allocator arenas between passes,
+# and now and then reads below what was already resident; the median of a
+# few passes is what the frame needs
+PEAK_PASSES = 3
+TIMINGS = ('wall', 'draw', 'encode')
+
+
+def reset_caches():
+    # every iteration pays for its own layers, tag sprites and shape masks;
+    # fonts stay warm
+    layers.cache.clear()
+    tag.clear_cache()
+    shapes.clear_cache()
+
+
+def run_once(draw, scale, profile):
+    reset_caches()
+    t0 = time.perf_counter()
+    img = draw(scale)
+    t1 = time.perf_counter()
+    data = encode.encode_png(img, profile)
+    t2 = time.perf_counter()
+    return {'draw': (t1 - t0) * 1000, 'encode': (t2 - t1) * 1000, 'bytes': len(data)}
+
+
+def _trim_heap():
+    # hand freed frames back to the OS so the RSS mark starts from what is
+    # actually live (glibc only; a no-op elsewhere)
+    name = ctypes.util.find_library('c')
+    trim = getattr(ctypes.CDLL(name), 'malloc_trim', None) if name else None
+    if trim is not None:
+        trim(0)
+
+
+def _proc_status(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+
+
+def peak_memory(draw, scale, profile):
+    # separate pass, the timed ones stay unobserved. Frames live in Pillow's
+    # C heap, which tracemalloc can't see, so on Linux the peak RSS mark is
+    # reset and read back around the run; elsewhere only the Python heap is
+    # measured
+    try:
+        _trim_heap()
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        before = _proc_status('VmRSS')
+        run_once(draw, scale, profile)
+        return _proc_status('VmHWM') - before
+    except OSError:
+        pass
+    tracemalloc.start()
+    try:
+        run_once(draw, scale, profile)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def units(values, references):
+    # (median, standard error of the median) of values / references; the
+    # spread is the median absolute deviation, robust to the odd slow run
+    ratios = [v / ref for v, ref in zip(values, references)]
+    med = statistics.median(ratios)
+    mad = statistics.median(abs(x - med) for x in ratios)
+    return med, 1.2533 * 1.4826 * mad / math.sqrt(len(ratios))
+
+
+def timed_run(draw, scale, profile):
+    # a run followed by a calibration at the same host speed
+    r = run_once(draw, scale, profile)
+    r['wall'] = r['draw'] + r['encode']
+    r['calibration'] = calibrate(1)
+    return r
+
+
+def summarize(runs, draw, scale, profile):
+    # the best of N raw timings is kept for reading, as timeit does; the
+    # medians in calibration units and their noise are what compare() uses
+    references = [r['calibration'] for r in runs]
+    result = {
+        'calibration_ms': round(statistics.median(references), 3),
+        'peak_bytes': statistics.median_low(peak_memory(draw, scale, profile) for _ in range(PEAK_PASSES)),
+        'output_bytes': runs[-1]['bytes'],
+    }
+    for metric in TIMINGS:
+        values = [r[metric] for r in runs]
+        med, noise = units(values, references)
+        result[f'{metric}_ms'] = round(min(values), 3)
+        result[f'{metric}_units'] = round(med, 4)
+        result[f'{metric}_noise'] = round(noise, 4)
+    return result
+
+
+def calibrate(iterations=DEFAULT_ITERATIONS):
+    # fixed reference workload: zlib over a frame-sized buffer, what
+    # encoding mostly is
+    data = bytes(range(256)) * (1200 * 630 * 4 // 256)
+    times = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        zlib.compress(data, 6)
+        times.append((time.perf_counter() - t0) * 1000)
+    return round(min(times), 3)
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run(iterations=DEFAULT_ITERATIONS, match=None, profile=encode.PROFILES['default']):
+    # the iterations go round every case in turn rather than one case at a
+    # time, so each case is sampled across the whole session and not only
+    # in whatever phase the host was in for its second of it
+    cases = []
+    for fig, draw in generators.figures().items():
+        if match and match not in fig:
+            continue
+        draw(1)  # warm fonts and imports outside the timed runs
+        cases += [(f'{fig}@{scale}x', draw, scale) for scale in SCALES]
+    runs = {key: [] for key, _, _ in cases}
+    for _ in range(iterations):
+        for key, draw, scale in cases:
+            runs[key].append(timed_run(draw, scale, profile))
+    results = {}
+    for key, draw, scale in cases:
+        r = results[key] = summarize(runs[key], draw, scale, profile)
+        print(f'{key:34} {r["wall_ms"]:9.1f} ms  draw {r["draw_ms"]:8.1f}  encode {r["encode_ms"]:8.1f}'
+              f'  peak {r["peak_bytes"] / 2**20:7.1f} MiB  {r["output_bytes"]:>9} B')
+    return results
+
+
+def drift(results, baseline):
+    # standard deviation of log(new / old) over every timing compared: how
+    # far a case's median moves between sessions on this host beyond what
+    # calibration takes out. Median absolute deviation, so the few cases a
+    # real regression moves don't widen it, and centred on the median, so a
+    # change that slows every case doesn't either
+    logs = [math.log(r[f'{m}_units'] / baseline[key][f'{m}_units'])
+            for key, r in results.items() if baseline.get(key, {}).get('draw_units')
+            for m in TIMINGS]
+    if len(logs) < MIN_DRIFT_SAMPLES:
+        return 0.0
+    med = statistics.median(logs)
+    return 1.4826 * statistics.median(abs(x - med) for x in logs)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    # [(case, metric, baseline value, current value, noise)] for every
+    # regression. Timings are compared in calibration units and have to
+    # clear the threshold by more than the noise band; they are reported in
+    # ms at the current host speed
+    regressions = []
+    spread = drift(results, baseline)
+    for key, r in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ms = r['calibration_ms']
+        for metric in TIMINGS:
+            old, new = base.get(f'{metric}_units'), r[f'{metric}_units']
+            if old is None:
+                continue
+            # run-to-run noise of the two medians, and drift between sessions
+            band = max(NOISE_BAND * math.hypot(base[f'{metric}_noise'], r[f'{metric}_noise']),
+                       old * (math.exp(NOISE_BAND * spread) - 1))
+            if new - band > old * (1 + threshold) and (new - old) * ms > MIN_DELTA_MS:
+                regressions.append((key, f'{metric}_ms', round(old * ms, 3), round(new * ms, 3),
+                                    round(band * ms, 3)))
+        for metric, floor in (('peak_bytes', MIN_DELTA_BYTES), ('output_bytes', 0)):
+            old, new = base.get(metric), r[metric]
+            if old is not None and new > old * (1 + threshold) and new - old > floor:
+                regressions.append((key, metric, old, new, 0))
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, iterations, path=BASELINE_PATH, notes=()):
+    with open(path, 'w') as f:
+        json.dump({'version': 1, 'environment': environment(), 'iterations': iterations,
+                   'notes': list(notes), 'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m assetkit.bench',
+                                     description='Benchmark the asset generators against a stored baseline.')
+    parser.add_argument('--iterations', '-n', type=int, default=DEFAULT_ITERATIONS,
+                        help='timed runs per figure and scale (more runs narrow the noise band)')
+    parser.add_argument('--filter', default=None,
+                        help='only run figures whose name contains this, e.g. things/ or cover')
+    parser.add_argument('--profile', choices=sorted(encode.PROFILES), default='default',
+                        help='encoder profile used for the encode stage')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='fractional growth over the baseline reported as a regression')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results as the new baseline instead of comparing')
+    parser.add_argument('--note', default=None,
+                        help='with --save-baseline: why the baseline moved, added to its notes')
+    args = parser.parse_args(argv)
+
+    if args.note and not args.save_baseline:
+        parser.error('--note goes with --save-baseline')
+    results = run(args.iterations, args.filter, encode.get_profile(args.profile))
+    if args.save_baseline:
+        previous = load_baseline(args.baseline) or {}
+        if args.filter:
+            # keep the cases that were not re-run
+            merged = previous.get('results', {})
+            merged.update(results)
+            results = merged
+        notes = previous.get('notes', []) + ([args.note] if args.note else [])
+        save_baseline(results, args.iterations, args.baseline, notes)
+        print('SAVED', args.baseline)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print('no baseline at', args.baseline, '- run with --save-baseline first')
+        return 0
+    if baseline.get('environment') != environment():
+        print('warning: baseline was recorded on', baseline.get('environment'))
+    if not any('draw_units' in r for r in baseline['results'].values()):
+        print('warning: the baseline has no calibrated timings, only sizes are compared; re-record it')
+    regressions = compare(results, baseline['results'], args.threshold)
+    for key, metric, old, new, noise in regressions:
+        growth = f'+{100 * (new - old) / old:.1f}%' if old else 'new'
+        band = f', noise ±{noise}' if noise else ''
+        print(f'REGRESSION {key} {metric}: {old} -> {new} ({growth}{band})')
+    spread = drift(results, baseline['results'])
+    if spread:
+        print(f'drift between sessions: ±{100 * (math.exp(spread) - 1):.1f}% (1 sd)')
+    if not regressions:
+        print(f'OK: no regressions beyond {100 * args.threshold:.0f}%')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# colour-mode-aware canvases: a frame is only as wide as its background
+# needs. An opaque background gives an RGB canvas (3 bytes a pixel rather
+# than 4, and no alpha channel for the encoder to test and strip) and
+# ImageDraw is opened on it in RGBA mode, so a translucent fill is blended
+# into what is under it where it is drawn instead of being written raw into
+# the alpha channel. Only a transparent background keeps an RGBA canvas.
+# Coverage masks (shapes, sprites, stripes, glows) are L or come with their own alpha,
+# and flat final frames are narrowed to P by the encoder (encode.narrow)
+from PIL import ImageDraw
+
+from . import instrument
+
+
+def canvas_mode(background):
+    if background is not None and (len(background) == 3 or background[3] == 255):
+        return 'RGB'
+    return 'RGBA'
+
+
+def new_canvas(size, background):
+    return instrument.new_image(canvas_mode(background), size, background)
+
+
+def draw(img):
+    # ImageDraw blends RGBA inks into an RGB image; on RGBA it writes them as is
+    return ImageDraw.Draw(img, 'RGBA' if img.mode == 'RGB' else None)
+
+
+def composite(img, src, xy=(0, 0), box=None):
+    # RGBA src (or its box) over img at xy: alpha_composite on an RGBA
+    # canvas, a paste through src's own alpha on an opaque one
+    if img.mode == 'RGBA':
+        img.alpha_composite(src, xy, box or (0, 0))
+        return
+    if box is not None:
+        src = src.crop(box)
+    img.paste(src, xy, src)
+
+
+def stamp(img, sprite, xy):
+    # composite only the part of the sprite that lands on the canvas
+    x, y = xy
+    sw, sh = sprite.size
+    left, top = max(x, 0), max(y, 0)
+    right, bottom = min(x + sw, img.width), min(y + sh, img.height)
+    if right <= left or bottom <= top:
+        return
+    composite(img, sprite, (left, top), (left - x, top - y, right - x, bottom - y))
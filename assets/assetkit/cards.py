@@ -0,0 +1,368 @@
+# bulk template cards: each generator's templates() are figures whose text
+# (titles, item lists, metric values) comes from a feed row instead of the
+# script. A feed of articles, CSV, JSON or JSON lines, names a template and
+# a slug per row, and the whole feed is rendered in one batch run to
+# <out>/<slug>/<figure>.png (plus @2x, ... with --scales).
+# Rows are checked against the template's fields before anything is drawn,
+# and a row that fails, when parsed, drawn or written, is reported with its row
+# number rather than stopping the batch: the failures are listed in
+# cards-report.json and the exit status is 1. A build manifest in the
+# output directory skips cards whose text, code and fonts are unchanged,
+# and --jobs spreads chunks of rows over worker processes; --shard i/N
+# splits the feed across build nodes (see shard.py).
+#
+# In CSV cells, list items are separated by '|' and pairs are written
+# label=value: "+3.2x=faster cycles|+18%=more shipped". JSON takes lists,
+# [label, value] pairs or {label: value} objects.
+#
+#   cd assets && python -m assetkit.cards --list
+#   cd assets && python -m assetkit.cards feed.csv --jobs 0 --profile dev
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from . import encode, fonts, generators, instrument, pipeline, shard, store
+from .generators import ASSETS_DIR
+from .manifest import file_digest, input_hash, package_files
+
+TEXT, LIST, PAIRS = 'text', 'list', 'pairs'
+REQUIRED = object()
+LIST_SEP = '|'
+PAIR_SEP = '='
+ROW_KEYS = ('template', 'slug')
+SLUG = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+DEFAULT_OUT = os.path.join(ASSETS_DIR, 'cards')
+REPORT_NAME = 'cards-report.json'
+# rows per task handed to a worker: enough to amortize the round trip,
+# few enough to keep every worker busy to the end
+CHUNK_SIZE = 16
+
+# outputs: [(file name, scale)]; values: what the template's render takes
+Card = namedtuple('Card', 'row slug template values outputs digests')
+
+
+class CardError(ValueError):
+    pass
+
+
+class Field:
+    def __init__(self, kind=TEXT, default=REQUIRED, min_items=0, max_items=None):
+        self.kind = kind
+        self.default = default
+        self.min_items = min_items
+        self.max_items = max_items
+
+    def __repr__(self):
+        spec = self.kind if self.kind == TEXT else f'{self.kind}[{self.min_items}..{self.max_items or ""}]'
+        return spec if self.default is REQUIRED else f'{spec}={self.default!r}'
+
+    def parse(self, name, value):
+        # a CSV cell or JSON value -> what the template takes
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '' or value == []:
+            if self.default is REQUIRED:
+                raise CardError(f'{name}: missing')
+            return self.default
+        if self.kind == TEXT:
+            if isinstance(value, (list, dict)):
+                raise CardError(f'{name}: expected text, got {type(value).__name__}')
+            return str(value)
+        items = value.split(LIST_SEP) if isinstance(value, str) else value
+        if isinstance(items, dict) and self.kind == PAIRS:
+            items = list(items.items())
+        if not isinstance(items, list):
+            raise CardError(f'{name}: expected a list, got {type(items).__name__}')
+        items = tuple(self.item(name, v) for v in items if not (isinstance(v, str) and not v.strip()))
+        if len(items) < self.min_items:
+            raise CardError(f'{name}: {len(items)} item(s), at least {self.min_items} needed')
+        if self.max_items is not None and len(items) > self.max_items:
+            raise CardError(f'{name}: {len(items)} items, at most {self.max_items} fit')
+        return items
+
+    def item(self, name, v):
+        if self.kind == LIST:
+            if not isinstance(v, (str, int, float)):
+                raise CardError(f'{name}: expected text items, got {type(v).__name__}')
+            return str(v).strip()
+        if isinstance(v, str):
+            label, sep, value = v.partition(PAIR_SEP)
+            if not sep:
+                raise CardError(f'{name}: {v.strip()!r} is not label{PAIR_SEP}value')
+            v = (label, value)
+        if not isinstance(v, (list, tuple)) or len(v) != 2:
+            raise CardError(f'{name}: expected [label, value] pairs, got {v!r}')
+        return (str(v[0]).strip(), str(v[1]).strip())
+
+
+class Template:
+    def __init__(self, render, **fields):
+        self.render = render   # render(scale, **values) -> frame
+        self.fields = fields
+
+    def values(self, row):
+        # {field: value} for a feed row; a non-empty column the template
+        # doesn't take is an error rather than text that silently goes missing
+        if None in row:
+            raise CardError('more cells than columns')
+        unknown = sorted(k for k, v in row.items()
+                         if k not in self.fields and k not in ROW_KEYS and v not in (None, '', []))
+        if unknown:
+            raise CardError(f'unknown field(s): {", ".join(unknown)}')
+        return {name: field.parse(name, row.get(name)) for name, field in self.fields.items()}
+
+
+def read_feed(path):
+    # [(row number, row dict or CardError)]: CSV rows count from 1 after the
+    # header, JSON ones from 1 in the list ({"cards": [...]} or a bare list)
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            return list(enumerate(csv.DictReader(f), 1))
+        if ext in ('.jsonl', '.ndjson'):
+            rows = []
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError as e:
+                    rows.append(CardError(f'invalid JSON: {e}'))
+        else:
+            rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = rows.get('cards')
+            if not isinstance(rows, list):
+                raise CardError(f'{path}: expected a list of cards or {{"cards": [...]}}')
+    return [(i, row if isinstance(row, (dict, CardError)) else CardError('expected an object'))
+            for i, row in enumerate(rows, 1)]
+
+
+def code_digests(templates):
+    # per generator: its script, assetkit and its fonts. Computed once per
+    # run, each card's hash then only adds its own values
+    shared = [file_digest(p) for p in package_files()]
+    return {name: [file_digest(generators.GENERATORS[name])] + shared
+                  + [file_digest(p) for p in fonts.font_files(name) if p]
+            for name in {t.split('/')[0] for t in templates}}
+
+
+def plan_row(row, data, templates, default_template, scales, profile, code):
+    # CardError for a row that can't be rendered
+    if isinstance(data, CardError):
+        raise data
+    tname = (str(data.get('template') or '').strip() or default_template)
+    if not tname:
+        raise CardError('no template (add a template column or pass --template)')
+    template = templates.get(tname)
+    if template is None:
+        raise CardError(f'unknown template {tname!r}')
+    slug = str(data.get('slug') or '').strip()
+    if not SLUG.fullmatch(slug):
+        raise CardError(f'slug {slug!r} is not a file name (letters, digits, . _ -)')
+    values = template.values(data)
+    figure = tname.split('/')[1]
+    outputs = [(f'{slug}/{figure}' + (f'@{s}x' if s != 1 else '') + '.png', s) for s in scales]
+    digests = [input_hash(name, scale=scale,
+                          extra=[tname, sorted(values.items()), code[tname.split('/')[0]], profile.key()])
+               for name, scale in outputs]
+    return Card(row, slug, tname, values, outputs, digests)
+
+
+def error_entry(row, data, error):
+    data = data if isinstance(data, dict) else {}
+    return {'row': row, 'slug': data.get('slug'), 'template': data.get('template'), 'error': str(error)}
+
+
+def write_files(out_dir, files):
+    for fname, data in files:
+        path = os.path.join(out_dir, fname)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        store.replace_file(path, data)
+
+
+def render_card(template, card):
+    # every frame of the card before any is written, so a card that fails
+    # halfway leaves no partial outputs behind
+    with instrument.asset(card.outputs[0][0]):
+        return [(name, template.render(scale, **card.values)) for name, scale in card.outputs]
+
+
+def describe(e):
+    return f'{type(e).__name__}: {e}'
+
+
+def encode_card(frames, profile):
+    # every file of the card, or the exception that stopped its encoding
+    try:
+        return [f for name, img in frames for f in encode.encode_all(img, name, profile)]
+    except Exception as e:
+        return e
+
+
+_templates = None
+
+
+def init_worker(instrument_path=None):
+    # forked workers inherit the parent's templates
+    global _templates
+    if _templates is None:
+        _templates = generators.templates()
+    if instrument_path:
+        instrument.enable(instrument_path)
+
+
+def render_batch(cards, out_dir, profile):
+    # worker side of --jobs: the worker encodes and writes its own cards and
+    # hands back only [error or None] per card
+    results = []
+    for card in cards:
+        try:
+            frames = render_card(_templates[card.template], card)
+            for name, img in frames:
+                write_files(out_dir, encode.encode_all(img, name, profile))
+            results.append(None)
+        except Exception as e:
+            results.append(describe(e))
+    return results
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the template cards of every row in a feed.')
+    parser.add_argument('feed', nargs='?', help='CSV, JSON or JSON lines file with one card per row')
+    parser.add_argument('--list', action='store_true', help='list the templates and their fields')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='output directory, one folder per slug')
+    parser.add_argument('--template', default=None,
+                        help='template for rows without a template column, e.g. playbook/cover')
+    parser.add_argument('--scales', default='1',
+                        help='comma-separated scales written per card, e.g. 1,2')
+    parser.add_argument('--jobs', type=pipeline.parse_jobs, default=1,
+                        help='render rows in N worker processes (0 = one per core)')
+    parser.add_argument('--encoders', type=int, default=pipeline.DEFAULT_ENCODERS,
+                        help='encode frames on N threads while the next one is drawn (0 = inline)')
+    parser.add_argument('--profile', choices=sorted(encode.PROFILES), default='default',
+                        help='encoder profile: dev (fast zlib), release (palette + max compression)')
+    parser.add_argument('--force', action='store_true',
+                        help='re-render every card even if its build manifest entry is current')
+    parser.add_argument('--report', metavar='PATH', default=None,
+                        help=f'per-row JSON report (default <out>/{REPORT_NAME})')
+    parser.add_argument('--instrument', metavar='PATH', default=None,
+                        help="append per-card stage timings as JSON lines to PATH ('-' for stderr)")
+    shard.add_argument(parser)
+    args = parser.parse_args(argv)
+
+    global _templates
+    _templates = templates = generators.templates()
+    if args.list:
+        for name, template in sorted(templates.items()):
+            print(name, ' '.join(f'{k}:{f!r}' for k, f in template.fields.items()))
+        return 0
+    if not args.feed:
+        parser.error('a feed is required (or --list)')
+    if args.template and args.template not in templates:
+        parser.error(f'unknown template {args.template!r}; see --list')
+    if args.instrument:
+        instrument.enable(args.instrument)
+    scales = tuple(int(s) for s in args.scales.split(',') if s)
+    profile = encode.get_profile(args.profile)
+    t0 = time.perf_counter()
+
+    feed = read_feed(args.feed)
+    code = code_digests(templates)
+    manifest = shard.open_manifest(args.out, args.shard, args.force)
+    errors = []
+    todo = []
+    unchanged = 0
+    elsewhere = 0   # rows of other shards
+    seen = {}
+    for row, data in feed:
+        try:
+            card = plan_row(row, data, templates, args.template, scales, profile, code)
+            first = seen.setdefault(card.outputs[0][0], row)
+            if first != row:
+                raise CardError(f'same slug and template as row {first}')
+        except CardError as e:
+            errors.append(error_entry(row, data, e))
+            continue
+        if not all([manifest.claim(name) for name, _ in card.outputs]):
+            elsewhere += 1
+            continue
+        if all(manifest.is_fresh(name, d) for (name, _), d in zip(card.outputs, card.digests)):
+            unchanged += 1
+        else:
+            todo.append(card)
+
+    def done(card, error):
+        if error is None:
+            for (name, _), digest in zip(card.outputs, card.digests):
+                manifest.record(name, digest)
+        else:
+            errors.append({'row': card.row, 'slug': card.slug, 'template': card.template, 'error': error})
+
+    def write_card(card, files):
+        # pipeline writer: a card is recorded once all its files are on disk,
+        # and a failed encode or write is that row's error, not the batch's
+        try:
+            if isinstance(files, Exception):
+                raise files
+            write_files(args.out, files)
+        except Exception as e:
+            done(card, describe(e))
+        else:
+            done(card, None)
+
+    jobs = args.jobs or os.cpu_count() or 1
+    if jobs == 1 or len(todo) <= CHUNK_SIZE:
+        with pipeline.Pipeline(args.encoders) as pipe:
+            for card in todo:
+                try:
+                    frames = render_card(templates[card.template], card)
+                except Exception as e:
+                    done(card, describe(e))
+                    continue
+                pipe.put(partial(encode_card, frames, profile), partial(write_card, card))
+                del frames
+    else:
+        batches = chunks(todo, CHUNK_SIZE)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(batches)), initializer=init_worker,
+                                 initargs=(args.instrument,)) as pool:
+            results = pool.map(render_batch, batches, [args.out] * len(batches), [profile] * len(batches))
+            for batch, batch_errors in zip(batches, results):
+                for card, error in zip(batch, batch_errors):
+                    done(card, error)
+    manifest.save()
+    instrument.disable()
+
+    seconds = time.perf_counter() - t0
+    errors.sort(key=lambda e: e['row'])
+    failed = len(errors)
+    rendered = len(feed) - unchanged - failed - elsewhere
+    report = {'feed': args.feed, 'rows': len(feed), 'rendered': rendered, 'unchanged': unchanged,
+              'failed': failed, 'other_shards': elsewhere, 'seconds': round(seconds, 3), 'errors': errors}
+    name = REPORT_NAME if args.shard is None else REPORT_NAME.replace('.json', '.shard-%d-of-%d.json' % args.shard)
+    report_path = args.report or os.path.join(args.out, name)
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    store.replace_file(report_path, json.dumps(report, indent=2) + '\n')
+    for e in errors:
+        print(f"row {e['row']} ({e['slug'] or '?'}): {e['error']}", file=sys.stderr)
+    rate = rendered / seconds * 60 if seconds else 0
+    print(f'{rendered} cards rendered, {unchanged} unchanged, {failed} failed '
+          f'in {seconds:.1f}s ({rate:.0f} cards/min); report in {report_path}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    # through the package module: the generators' templates raise its CardError
+    from . import cards
+    sys.exit(cards.main())
@@ -0,0 +1,251 @@
+# long-lived render daemon: the generators are imported once and Pillow,
+# the font registry, tag sprites, shape masks, text metrics and the layer
+# cache stay warm between requests. Requests are JSON lines over a Unix
+# socket; with --watch an edited generator is re-imported and its main() run
+# in-process, where the build manifest limits the work to figures whose
+# drawing code changed. Rebuilds use the release profile unless --build-args
+# says otherwise, since they overwrite the outputs that get served. Only
+# builds write there: a render is a preview, written to a scratch directory
+# (or --out) so it never replaces an output behind the manifest's back.
+# Edits to assetkit itself restart the daemon.
+#
+#   cd assets && python -m assetkit.daemon serve --watch &
+#   python -m assetkit.daemon render playbook/cover --scale 2
+#   python -m assetkit.daemon build things --force
+#   python -m assetkit.daemon stop
+import argparse
+import glob
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import redirect_stdout
+
+from . import encode, fonts, generators, layers, shapes, store, textlayout
+
+ASSETKIT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f'assetkit-{os.getuid()}.sock')
+PREVIEW_DIR = os.path.join(tempfile.gettempdir(), f'assetkit-{os.getuid()}-previews')
+WATCH_INTERVAL = 0.25
+
+
+def source_files():
+    # {path: generator name, or None for assetkit itself}
+    files = {path: name for name, path in generators.GENERATORS.items()}
+    files.update({path: None for path in glob.glob(os.path.join(ASSETKIT_DIR, '*.py'))})
+    return files
+
+
+class Daemon:
+    def __init__(self, build_args=(), preview_dir=PREVIEW_DIR):
+        self.build_args = list(build_args)   # passed to main() on --watch rebuilds
+        self.preview_dir = preview_dir       # where renders go without an explicit out
+        self.lock = threading.Lock()         # the render code is not thread-safe
+        self.modules = {name: generators.load_generator(name) for name in generators.GENERATORS}
+        self.mtimes = self.scan()
+        self.started = time.time()
+        self.requests = 0
+
+    def scan(self):
+        return {path: os.stat(path).st_mtime_ns for path in source_files()}
+
+    def changed(self):
+        # generator names whose script changed, 'assetkit' for the package
+        mtimes = self.scan()
+        files = source_files()
+        changed = {files[p] or 'assetkit' for p, m in mtimes.items() if self.mtimes.get(p) != m}
+        changed |= {files.get(p) or 'assetkit' for p in self.mtimes if p not in mtimes}
+        self.mtimes = mtimes
+        return changed
+
+    def render(self, figure, scale=1, out=None, profile='default'):
+        name, _, fig = figure.partition('/')
+        module = self.modules[name]
+        img = module.figures()[fig](scale)
+        if out is None:
+            suffix = '' if scale == 1 else f'@{scale}x'
+            out = os.path.join(self.preview_dir, name, f'{fig}{suffix}.png')
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+        store.replace_file(out, encode.encode_png(img, encode.get_profile(profile)))
+        return out
+
+    def build(self, name, argv=()):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.modules[name].main(list(argv))
+        return out.getvalue()
+
+    def reload(self, name):
+        self.modules[name] = generators.load_generator(name)
+
+    def stats(self):
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'fonts': fonts.registry.stats(),
+            'layers': layers.cache.stats(),
+            'text_metrics': textlayout.cache.stats(),
+            'shape_masks': shapes.cache_size(),
+        }
+
+    def handle(self, req):
+        cmd = req.get('cmd')
+        with self.lock:
+            self.requests += 1
+            t0 = time.perf_counter()
+            if cmd == 'render':
+                result = {'path': self.render(req['figure'], req.get('scale', 1), req.get('out'),
+                                              req.get('profile', 'default'))}
+            elif cmd == 'build':
+                result = {'output': self.build(req['generator'], req.get('args', []))}
+            elif cmd == 'list':
+                result = {'figures': sorted(generators.figures(self.modules))}
+            elif cmd == 'stats':
+                result = self.stats()
+            else:
+                raise ValueError(f'unknown command {cmd!r}')
+            result['ms'] = round((time.perf_counter() - t0) * 1000, 3)
+        return result
+
+    def watch(self, interval=WATCH_INTERVAL, restart=None):
+        while True:
+            time.sleep(interval)
+            changed = self.changed()
+            if not changed:
+                continue
+            if 'assetkit' in changed:
+                # module objects are shared too widely to reload in place
+                print('assetkit changed, restarting', flush=True)
+                restart()
+                return
+            for name in sorted(changed):
+                with self.lock:
+                    t0 = time.perf_counter()
+                    try:
+                        self.reload(name)
+                        output = self.build(name, self.build_args)
+                    except Exception:
+                        traceback.print_exc()
+                        continue
+                    ms = (time.perf_counter() - t0) * 1000
+                for line in output.splitlines():
+                    if line.startswith('WROTE'):
+                        print(line, flush=True)
+                print(f'REBUILT {name} in {ms:.0f} ms', flush=True)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def reply(self, resp):
+        self.wfile.write((json.dumps(resp) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                if req.get('cmd') == 'stop':
+                    # answered before the server is told to stop; serve()
+                    # joins this thread before it closes the socket
+                    self.reply({'ok': True})
+                    threading.Thread(target=self.server.shutdown).start()
+                    return
+                resp = {'ok': True, **self.server.daemon.handle(req)}
+            except Exception as e:
+                resp = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            self.reply(resp)
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # server_close() waits for the handler threads, so no reply is cut off
+    daemon_threads = False
+    block_on_close = True
+
+
+def serve(path=DEFAULT_SOCKET, watch=False, build_args=(), preview_dir=PREVIEW_DIR):
+    if os.path.exists(path):
+        os.remove(path)
+    daemon = Daemon(build_args, preview_dir)
+    server = Server(path, Handler)
+    server.daemon = daemon
+
+    def restart():
+        server.server_close()
+        os.remove(path)
+        os.chdir(generators.ASSETS_DIR)
+        os.execv(sys.executable, [sys.executable, '-m', 'assetkit.daemon'] + sys.argv[1:])
+
+    if watch:
+        threading.Thread(target=daemon.watch, kwargs={'restart': restart}, daemon=True).start()
+    print(f'listening on {path}', flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def request(req, path=DEFAULT_SOCKET):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall((json.dumps(req) + '\n').encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        return json.loads(sock.makefile('rb').readline())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m assetkit.daemon',
+                                     description='Keep the generators warm and render on request.')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve', help='run the daemon in the foreground')
+    p.add_argument('--watch', action='store_true',
+                   help='rebuild a generator\'s changed figures as soon as its source is saved')
+    p.add_argument('--build-args', default='--profile release',
+                   help='arguments for the generators\' main() on --watch rebuilds (e.g. \'--profile dev\' '
+                        'for faster rebuilds that overwrite the outputs with larger files)')
+    p.add_argument('--preview-dir', default=PREVIEW_DIR,
+                   help='where render writes without --out (default: %(default)s)')
+    p = sub.add_parser('render', help='render one figure')
+    p.add_argument('figure', help='e.g. playbook/cover or things/cover_modern')
+    p.add_argument('--scale', type=int, default=1)
+    p.add_argument('--out', default=None,
+                   help='output path (default: the daemon\'s preview directory; use build to update the '
+                        'generator\'s outputs)')
+    p.add_argument('--profile', choices=sorted(encode.PROFILES), default='default')
+    p = sub.add_parser('build', help='run a generator\'s main() inside the daemon')
+    p.add_argument('generator', choices=sorted(generators.GENERATORS))
+    p.add_argument('args', nargs=argparse.REMAINDER)
+    sub.add_parser('list', help='list the figures the daemon can render')
+    sub.add_parser('stats', help='cache statistics')
+    sub.add_parser('stop', help='shut the daemon down')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args.socket, args.watch, args.build_args.split(), os.path.abspath(args.preview_dir))
+        return 0
+    req = {'cmd': args.command}
+    if args.command == 'render':
+        req.update(figure=args.figure, scale=args.scale, out=args.out and os.path.abspath(args.out),
+                   profile=args.profile)
+    elif args.command == 'build':
+        req.update(generator=args.generator, args=args.args)
+    resp = request(req, args.socket)
+    if not resp.pop('ok'):
+        print('error:', resp['error'], file=sys.stderr)
+        return 1
+    if 'output' in resp:
+        sys.stdout.write(resp.pop('output'))
+    if resp:
+        print(json.dumps(resp, indent=2) if args.command in ('stats', 'list') else resp)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# encoder stage shared by the generators: a profile picks the PNG zlib level,
+# whether flat figures are stored losslessly as palette (P) images, and which
+# WebP/AVIF siblings are written next to each PNG. `default` matches a bare
+# img.save(path), so existing outputs don't change unless a profile asks for it
+import io
+import os
+
+import numpy as np
+from PIL import Image, features
+
+from . import instrument
+
+
+class EncoderProfile:
+    def __init__(self, name, compress_level=6, optimize=False, palette=False,
+                 siblings=(), webp_method=4, avif_quality=90, avif_speed=8):
+        self.name = name
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self.palette = palette
+        self.siblings = tuple(siblings)
+        self.webp_method = webp_method
+        self.avif_quality = avif_quality
+        self.avif_speed = avif_speed
+
+    def key(self):
+        # everything that changes the encoded bytes, for build manifests
+        return (self.name, self.compress_level, self.optimize, self.palette, self.siblings,
+                self.webp_method, self.avif_quality, self.avif_speed)
+
+    def with_siblings(self, siblings):
+        return EncoderProfile(self.name, self.compress_level, self.optimize, self.palette,
+                              siblings, self.webp_method, self.avif_quality, self.avif_speed)
+
+
+PROFILES = {
+    'default': EncoderProfile('default'),
+    # fast local iteration: cheapest zlib level, nothing extra
+    'dev': EncoderProfile('dev', compress_level=1, webp_method=0, avif_speed=10),
+    # what gets served: smallest lossless PNG, palette when the colours fit
+    'release': EncoderProfile('release', compress_level=9, optimize=True, palette=True,
+                              webp_method=6, avif_speed=6),
+}
+
+
+def get_profile(name, siblings=None):
+    profile = PROFILES[name]
+    if siblings is not None:
+        profile = profile.with_siblings(siblings)
+    return profile
+
+
+def narrow(img):
+    # losslessly drop what the frame doesn't use: alpha when it is fully
+    # opaque, and truecolour when it has at most 256 distinct colours
+    if img.mode == 'RGBA' and img.getchannel('A').getextrema() == (255, 255):
+        img = img.convert('RGB')
+    if img.mode != 'RGB':
+        return img
+    colors = img.getcolors(256)
+    if colors is None:
+        return img
+    # every pixel looked up in the sorted palette by its exact colour;
+    # quantize() matches at reduced precision and merges close colours
+    rgb = np.asarray(img).astype(np.uint32)
+    keys = rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2]
+    palette = np.array(sorted(r << 16 | g << 8 | b for _, (r, g, b) in colors), dtype=np.uint32)
+    p = Image.frombytes('P', img.size, np.searchsorted(palette, keys).astype(np.uint8).tobytes())
+    p.putpalette(np.stack([palette >> 16, palette >> 8 & 255, palette & 255], axis=1).astype(np.uint8).tobytes())
+    return p
+
+
+def encode_png(img, profile=PROFILES['default']):
+    if profile.palette:
+        img = narrow(img)
+    # the zlib level is always spelled out (6 is what a bare save uses), so a
+    # change of Pillow's default can't change the bytes; Pillow writes no
+    # tIME or text chunks unless asked, and none are asked for
+    buf = io.BytesIO()
+    img.save(buf, format='PNG', compress_level=profile.compress_level, optimize=profile.optimize)
+    return buf.getvalue()
+
+
+def encode_sibling(img, fmt, profile):
+    buf = io.BytesIO()
+    if fmt == 'webp':
+        img.save(buf, format='WEBP', lossless=True, method=profile.webp_method)
+    elif fmt == 'avif':
+        if not features.check('avif'):
+            return None
+        img.save(buf, format='AVIF', quality=profile.avif_quality, speed=profile.avif_speed)
+    else:
+        raise ValueError(f'unknown sibling format {fmt!r}')
+    return buf.getvalue()
+
+
+def output_names(name, profile=PROFILES['default']):
+    # [(file name, format)]: the PNG followed by its WebP/AVIF siblings
+    base = os.path.splitext(name)[0]
+    return [(name, 'png')] + [(f'{base}.{fmt}', fmt) for fmt in profile.siblings]
+
+
+def encode_format(img, fmt, profile=PROFILES['default']):
+    if fmt == 'png':
+        return encode_png(img, profile)
+    return encode_sibling(img, fmt, profile)
+
+
+def encode_all(img, name, profile=PROFILES['default']):
+    # [(file name, data)] for output_names(); unavailable formats are skipped
+    files = []
+    with instrument.stage('encode'):
+        for fname, fmt in output_names(name, profile):
+            data = encode_format(img, fmt, profile)
+            if data is not None:
+                files.append((fname, data))
+    return files
+
+
+def baseline_size(img):
+    # size of a bare 32-bit img.save(), what every asset used to cost
+    with instrument.stage('baseline'):
+        return len(encode_png(img if img.mode == 'RGBA' else img.convert('RGBA')))
+
+
+def report_line(path, baseline, sizes):
+    # sizes: [(file name, bytes)] as written, PNG first
+    png = sizes[0][1]
+    parts = [f'{os.path.splitext(n)[1][1:]} {size}' for n, size in sizes]
+    saved = baseline - png
+    pct = 100 * saved / baseline if baseline else 0
+    return f'SAVED {path}: {baseline} -> {png} bytes ({saved} saved, {pct:.1f}%) [{", ".join(parts)}]'
@@ -0,0 +1,107 @@
+# process-wide font registry: candidate paths are resolved once per family and
+# weight, and FreeTypeFont objects are kept in a bounded LRU keyed by
+# (family, size, weight) so repeated labels don't re-parse the TTF
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+DEFAULT_MAXSIZE = 64
+
+
+def font_key(font):
+    # FreeType fonts are identified by file and size; anything else (the PIL
+    # bitmap default) by identity
+    if hasattr(font, 'path'):
+        return font.path, font.size
+    return id(font)
+
+
+class FontRegistry:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.candidates = {}  # (family, weight) -> candidate paths
+        self.paths = {}       # (family, weight) -> resolved path, None for the PIL default
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register(self, family, candidates, bold=None):
+        # bold falls back to the regular list, which is what the generators did so far
+        regular, bold = list(candidates), list(candidates if bold is None else bold)
+        if (self.candidates.get((family, 'regular')) == regular
+                and self.candidates.get((family, 'bold')) == bold):
+            return  # re-imported generator, keep its fonts warm
+        self.candidates[(family, 'regular')] = regular
+        self.candidates[(family, 'bold')] = bold
+        for weight in ('regular', 'bold'):
+            self.paths.pop((family, weight), None)
+        for key in [k for k in self.cache if k[0] == family]:
+            del self.cache[key]
+
+    def resolve(self, family, weight='regular'):
+        key = (family, weight)
+        if key not in self.paths:
+            self._load(family, weight, 10)
+        return self.paths[key]
+
+    def _load(self, family, weight, size):
+        key = (family, weight)
+        if key not in self.candidates:
+            raise KeyError(f'unknown font family {family!r}')
+        if key in self.paths:
+            path = self.paths[key]
+            return ImageFont.truetype(path, size) if path else ImageFont.load_default()
+        for p in self.candidates[key]:
+            try:
+                font = ImageFont.truetype(p, size)
+            except Exception:
+                continue
+            self.paths[key] = p
+            return font
+        self.paths[key] = None
+        return ImageFont.load_default()
+
+    def get(self, family, size, bold=False):
+        weight = 'bold' if bold else 'regular'
+        key = (family, size, weight)
+        font = self.cache.get(key)
+        if font is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return font
+        self.misses += 1
+        font = self._load(family, weight, size)
+        self.cache[key] = font
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+        return font
+
+    def files(self, family):
+        # resolved font files of a family, for build manifests
+        paths = {self.resolve(family, weight) for weight in ('regular', 'bold')}
+        return sorted(p for p in paths if p)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'cached': len(self.cache),
+        }
+
+
+registry = FontRegistry()
+
+
+def register(family, candidates, bold=None):
+    registry.register(family, candidates, bold)
+
+
+def get_font(family, size, bold=False):
+    return registry.get(family, size, bold)
+
+
+def font_files(family):
+    return registry.files(family)
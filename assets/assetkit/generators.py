@@ -0,0 +1,37 @@
+# the per-article generators are scripts in hyphenated directories, not
+# packages; this loads them as modules so their figures() can be called by
+# the benchmark and the render daemon, and their templates() by the bulk
+# card builder
+import importlib.util
+import os
+
+ASSETS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GENERATORS = {
+    'playbook': os.path.join(ASSETS_DIR, 'the-new-builder-playbook', 'generate_pngs.py'),
+    'things': os.path.join(ASSETS_DIR, 'things-are-moving-fast', 'generate_things_assets.py'),
+}
+
+
+def load_generator(name):
+    # a fresh module each call, so it doubles as a reload
+    spec = importlib.util.spec_from_file_location(f'{name}_generator', GENERATORS[name])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def figures(modules=None):
+    # {'playbook/cover': render(scale) -> frame, ...} across every generator
+    modules = modules or {name: load_generator(name) for name in GENERATORS}
+    return {f'{name}/{fig}': render
+            for name, module in modules.items()
+            for fig, render in module.figures().items()}
+
+
+def templates(modules=None):
+    # {'playbook/cover': cards.Template, ...} across every generator
+    modules = modules or {name: load_generator(name) for name in GENERATORS}
+    return {f'{name}/{tpl}': template
+            for name, module in modules.items()
+            for tpl, template in module.templates().items()}
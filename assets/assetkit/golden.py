@@ -0,0 +1,213 @@
+# golden-image regression check: every figure of both generators is rendered
+# in memory and compared with a reference PNG under assets/golden. The index
+# next to the references keeps each one's pixel digest, so an unchanged
+# figure passes on a hash compare without decoding its reference; only a
+# changed one is diffed per pixel with numpy against a per-channel
+# tolerance, and a heatmap of where it moved is written to golden-diff/.
+#
+# The references are committed, rendered with the fonts named in the index;
+# checking with other fonts resolved fails up front, every text run would
+# move. A figure with no reference fails too, unless --update is given, which
+# records it; update re-records every reference after an intended change.
+#
+#   cd assets && python -m assetkit.golden            # check, exit 1 on failures
+#   cd assets && python -m assetkit.golden --update   # check, record new figures
+#   cd assets && python -m assetkit.golden update     # re-record references
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import PIL
+from PIL import Image
+
+from . import fonts, generators, store
+from .generators import ASSETS_DIR
+
+GOLDEN_DIR = os.path.join(ASSETS_DIR, 'golden')
+DIFF_DIR = os.path.join(ASSETS_DIR, 'golden-diff')
+INDEX_NAME = 'index.json'
+SCALES = (1, 2)
+# a pixel differs when any channel moved by more than TOLERANCE; a figure
+# fails when more than MAX_FRACTION of its pixels differ
+DEFAULT_TOLERANCE = 4
+DEFAULT_MAX_FRACTION = 0.0
+
+
+def dhash(img, size=8):
+    # 64-bit difference hash of the luminance: a rough measure of how far a
+    # failing figure moved (a few bits for antialiasing, dozens for layout)
+    small = np.asarray(img.convert('L').resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def environment():
+    # what a reference depends on besides the drawing code
+    return {
+        'pillow': PIL.__version__,
+        'fonts': {name: [os.path.basename(p) for p in fonts.font_files(name) if p]
+                  for name in ('playbook', 'things')},
+    }
+
+
+def golden_path(key, root=GOLDEN_DIR):
+    # 'playbook/cover@2x' -> golden/playbook/cover@2x.png
+    return os.path.join(root, key + '.png')
+
+
+def load_index(root=GOLDEN_DIR):
+    path = os.path.join(root, INDEX_NAME)
+    if not os.path.exists(path):
+        return {'version': 1, 'environment': None, 'figures': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_index(index, root=GOLDEN_DIR):
+    store.replace_file(os.path.join(root, INDEX_NAME), json.dumps(index, indent=2, sort_keys=True) + '\n')
+
+
+def render_all(match=None, scales=SCALES, figures=None):
+    # (key, frame) for every figure and scale, rendered in memory
+    for fig, render in (figures or generators.figures()).items():
+        if match and match not in fig:
+            continue
+        for scale in scales:
+            yield f'{fig}@{scale}x', render(scale)
+
+
+def pixel_delta(img, ref):
+    # per-pixel largest channel difference, as an (h, w) uint8 array
+    a = np.asarray(img.convert('RGBA'), dtype=np.int16)
+    b = np.asarray(ref.convert('RGBA'), dtype=np.int16)
+    return np.abs(a - b).max(axis=2).astype(np.uint8)
+
+
+def heatmap(ref, delta, tolerance):
+    # the reference in dimmed grey, pixels within tolerance faintly yellow,
+    # the ones beyond it red, brighter the further they moved
+    base = np.asarray(ref.convert('L'), dtype=np.float32) * 0.3
+    out = np.repeat(base[:, :, None], 3, axis=2)
+    over = delta > tolerance
+    near = (delta > 0) & ~over
+    out[near] = (120, 120, 0)
+    out[over, 0] = 128 + delta[over] / 2
+    out[over, 1:] = 0
+    return Image.fromarray(out.astype(np.uint8), 'RGB')
+
+
+def check_one(key, img, entry, tolerance, max_fraction, root=GOLDEN_DIR, diff_dir=DIFF_DIR):
+    # (passed, message)
+    if entry is None or not os.path.exists(golden_path(key, root)):
+        return False, 'no reference (record it with --update)'
+    if store.pixel_digest(img) == entry['pixels']:
+        return True, 'identical'
+    with Image.open(golden_path(key, root)) as ref:
+        ref.load()
+    if ref.size != img.size:
+        return False, f'size {img.size[0]}x{img.size[1]}, reference {ref.size[0]}x{ref.size[1]}'
+    delta = pixel_delta(img, ref)
+    over = int((delta > tolerance).sum())
+    fraction = over / delta.size
+    detail = (f'{over} px over tolerance {tolerance} ({100 * fraction:.3f}%), max delta {int(delta.max())}, '
+              f'dhash distance {hamming(dhash(img), entry["dhash"])}')
+    if fraction <= max_fraction:
+        return True, 'within tolerance: ' + detail
+    path = os.path.join(diff_dir, key + '.png')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    heatmap(ref, delta, tolerance).save(path)
+    return False, f'{detail} -> {os.path.relpath(path, ASSETS_DIR)}'
+
+
+def record(key, img, index, root=GOLDEN_DIR):
+    path = golden_path(key, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    img.save(path, optimize=True)
+    index['figures'][key] = {'pixels': store.pixel_digest(img), 'dhash': dhash(img),
+                             'size': list(img.size)}
+    return path
+
+
+def check(match=None, scales=SCALES, tolerance=DEFAULT_TOLERANCE, max_fraction=DEFAULT_MAX_FRACTION,
+          root=GOLDEN_DIR, diff_dir=DIFF_DIR, update_missing=False):
+    # (failures, figures recorded for lack of a reference)
+    index = load_index(root)
+    figures = generators.figures()
+    # the generators register their fonts on import, so only now
+    env = environment()
+    failures = recorded = 0
+    # new references are only recorded with the fonts the others were
+    pinned = (index['environment'] or {}).get('fonts')
+    fonts_match = pinned in (None, env['fonts'])
+    if not fonts_match:
+        print('FAIL fonts: rendering with', env['fonts'], 'but the references are pinned to', pinned)
+        failures += 1
+    for key, img in render_all(match, scales, figures):
+        entry = index['figures'].get(key)
+        if update_missing and fonts_match and (entry is None or not os.path.exists(golden_path(key, root))):
+            path = record(key, img, index, root)
+            print('NEW', key, 'recorded', os.path.relpath(path, ASSETS_DIR))
+            recorded += 1
+            continue
+        passed, message = check_one(key, img, entry, tolerance, max_fraction, root, diff_dir)
+        print('PASS' if passed else 'FAIL', key, message)
+        failures += not passed
+    if recorded:
+        index['environment'] = env
+        save_index(index, root)
+    if failures and index['environment'] not in (None, env):
+        print('warning: references were recorded with', index['environment'])
+    return failures, recorded
+
+
+def update(match=None, scales=SCALES, root=GOLDEN_DIR):
+    index = load_index(root)
+    for key, img in render_all(match, scales):
+        path = record(key, img, index, root)
+        print('RECORDED', os.path.relpath(path, ASSETS_DIR))
+    index['environment'] = environment()
+    save_index(index, root)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m assetkit.golden',
+                                     description='Compare the generated figures with golden references.')
+    parser.add_argument('command', nargs='?', choices=('check', 'update'), default='check')
+    parser.add_argument('--filter', default=None,
+                        help='only figures whose name contains this, e.g. things/ or cover')
+    parser.add_argument('--scales', default=','.join(str(s) for s in SCALES),
+                        help='comma-separated scales to render each figure at')
+    parser.add_argument('--tolerance', type=int, default=DEFAULT_TOLERANCE,
+                        help='per-channel difference a pixel may have before it counts as changed')
+    parser.add_argument('--max-fraction', type=float, default=DEFAULT_MAX_FRACTION,
+                        help='fraction of changed pixels a figure may have and still pass')
+    parser.add_argument('--update', action='store_true',
+                        help='record a reference for figures that have none instead of failing them')
+    parser.add_argument('--root', default=GOLDEN_DIR, help='reference directory')
+    parser.add_argument('--diff-dir', default=DIFF_DIR, help='where heatmaps of failing figures go')
+    args = parser.parse_args(argv)
+    scales = tuple(int(s) for s in args.scales.split(',') if s)
+
+    t0 = time.perf_counter()
+    if args.command == 'update':
+        update(args.filter, scales, args.root)
+        return 0
+    failures, recorded = check(args.filter, scales, args.tolerance, args.max_fraction, args.root, args.diff_dir,
+                               args.update)
+    elapsed = time.perf_counter() - t0
+    summary = f'{failures} failing' if failures else 'OK'
+    if recorded:
+        summary += f', {recorded} recorded'
+    print(summary, f'({elapsed:.1f} s)')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
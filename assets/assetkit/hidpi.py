@@ -0,0 +1,124 @@
+# native hi-DPI drawing: figures are written in 1x logical coordinates and
+# ScaledDraw maps every coordinate, radius and stroke width onto a canvas that
+# is `scale` times larger, so @2x/@3x assets are drawn directly instead of
+# being LANCZOS-upscaled from the 1x frame. With a Viewport the canvas is only
+# one tile of the full frame (see tiled.py) and coordinates are shifted to it.
+# Given the canvas image, rounded rectangles and ellipses are stamped
+# anti-aliased from the shape mask cache (see shapes.py)
+from collections import namedtuple
+
+from . import canvas, shapes
+
+# device-pixel offset of a tile canvas inside the full frame, and the frame size
+Viewport = namedtuple('Viewport', 'x y width height')
+
+
+def scale_value(v, scale):
+    if scale == 1:
+        return v
+    v = v * scale
+    return v if isinstance(v, int) else round(v)
+
+
+def scale_xy(xy, scale):
+    if scale == 1:
+        return xy
+    if isinstance(xy, (int, float)):
+        return scale_value(xy, scale)
+    return type(xy)(scale_xy(v, scale) for v in xy)
+
+
+def shift_xy(xy, dx, dy):
+    # works on flat [x1, y1, x2, y2] sequences and on lists of (x, y) pairs
+    if not dx and not dy:
+        return xy
+    if isinstance(xy[0], (int, float)):
+        return type(xy)(v - (dx if i % 2 == 0 else dy) for i, v in enumerate(xy))
+    return type(xy)((x - dx, y - dy) for x, y in xy)
+
+
+def scale_size(size, scale):
+    w, h = size
+    return scale_value(w, scale), scale_value(h, scale)
+
+
+def device_xy(xy, scale=1, viewport=None):
+    # logical point -> pixel position on the (possibly tiled) canvas
+    xy = scale_xy(xy, scale)
+    if viewport is not None:
+        xy = shift_xy(xy, viewport.x, viewport.y)
+    return xy
+
+
+class ScaledDraw:
+    def __init__(self, draw, scale=1, viewport=None, img=None):
+        self.draw = draw
+        self.scale = scale
+        self.viewport = viewport
+        self.img = img
+
+    @property
+    def size(self):
+        # logical size of the frame (not of a tile canvas)
+        if self.viewport is not None:
+            w, h = self.viewport.width, self.viewport.height
+        else:
+            w, h = self.draw.im.size
+        if self.scale == 1:
+            return w, h
+        return round(w / self.scale), round(h / self.scale)
+
+    def _xy(self, xy):
+        return device_xy(xy, self.scale, self.viewport)
+
+    def _w(self, width):
+        return max(1, scale_value(width, self.scale))
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        self.draw.rectangle(self._xy(xy), fill=fill, outline=outline, width=self._w(width))
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        if self.img is not None:
+            shapes.rounded_rectangle(self.img, self._xy(xy), scale_value(radius, self.scale),
+                                     fill, outline, self._w(width))
+            return
+        self.draw.rounded_rectangle(self._xy(xy), radius=scale_value(radius, self.scale),
+                                    fill=fill, outline=outline, width=self._w(width))
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        if self.img is not None:
+            shapes.ellipse(self.img, self._xy(xy), fill, outline, self._w(width))
+            return
+        self.draw.ellipse(self._xy(xy), fill=fill, outline=outline, width=self._w(width))
+
+    def pieslice(self, xy, start, end, fill=None, outline=None, width=1):
+        self.draw.pieslice(self._xy(xy), start, end, fill=fill, outline=outline, width=self._w(width))
+
+    def line(self, xy, fill=None, width=0):
+        self.draw.line(self._xy(xy), fill=fill, width=scale_value(width, self.scale))
+
+    def polygon(self, xy, fill=None, outline=None, width=1):
+        self.draw.polygon(self._xy(xy), fill=fill, outline=outline, width=self._w(width))
+
+    # fonts are passed in already sized for the canvas (see the generators'
+    # font helpers), only the anchor point and line spacing are scaled here
+    def text(self, xy, text, fill=None, font=None, **kwargs):
+        self.draw.text(self._xy(xy), text, fill=fill, font=font, **kwargs)
+
+    def multiline_text(self, xy, text, fill=None, font=None, spacing=4, **kwargs):
+        self.draw.multiline_text(self._xy(xy), text, fill=fill, font=font,
+                                 spacing=scale_value(spacing, self.scale), **kwargs)
+
+    def textbbox(self, xy, text, font=None, **kwargs):
+        box = self.draw.textbbox(self._xy(xy), text, font=font, **kwargs)
+        if self.viewport is not None:
+            box = shift_xy(box, -self.viewport.x, -self.viewport.y)
+        if self.scale == 1:
+            return box
+        return tuple(v / self.scale for v in box)
+
+
+def scaled_draw(img, scale=1, viewport=None):
+    # the usual way to draw on a canvas: blending inks (canvas.draw) and
+    # anti-aliased shapes
+    return ScaledDraw(canvas.draw(img), scale, viewport, img)
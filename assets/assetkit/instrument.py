@@ -0,0 +1,117 @@
+# per-asset instrumentation: the generators wrap each output in asset() and
+# the shared stages (canvas allocation, drawing, tag compositing, resize,
+# encode, file write) in stage(). When enabled, every asset is written as one
+# JSON line with the exclusive time of each stage and what it allocated;
+# optionally the whole run is profiled with cProfile. Off by default, and
+# stage() then hands back a shared no-op context
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+from PIL import Image
+
+_NULL = nullcontext()
+
+_enabled = False
+_out = None
+_profiler = None
+_pstats_path = None
+_record = None   # the asset being built
+_stack = []      # open stages: [name, start, time spent in nested stages]
+
+
+def enabled():
+    return _enabled
+
+
+def enable(path='-', pstats_path=None):
+    # path: JSON lines file (appended to, '-' for stderr); pstats_path: where
+    # disable() dumps the cProfile stats of everything in between
+    global _enabled, _out, _profiler, _pstats_path
+    _out = sys.stderr if path == '-' else open(path, 'a', buffering=1)
+    _enabled = True
+    if pstats_path:
+        _pstats_path = pstats_path
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def disable():
+    global _enabled, _out, _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_pstats_path)
+        _profiler = None
+    if _out is not None and _out is not sys.stderr:
+        _out.close()
+    _out = None
+    _enabled = False
+
+
+def _pillow_counts():
+    stats = Image.core.get_stats()
+    return {'images': stats['new_count'], 'blocks': stats['allocated_blocks']}
+
+
+@contextmanager
+def _asset(name, fields):
+    global _record
+    outer = _record
+    _record = {'asset': name, **fields, 'pid': os.getpid(), 'stages': {},
+               'alloc': {'frames': 0, 'frame_bytes': 0}}
+    counts = _pillow_counts()
+    start = time.perf_counter()
+    try:
+        yield _record
+    finally:
+        _record['total_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        after = _pillow_counts()
+        _record['alloc'].update({k: after[k] - counts[k] for k in after})
+        _record['stages'] = {k: round(v, 3) for k, v in _record['stages'].items()}
+        _out.write(json.dumps(_record, sort_keys=True) + '\n')
+        _record = outer
+
+
+def asset(name, **fields):
+    # extra fields (scale, kind, ...) are copied into the record as they are
+    if not _enabled:
+        return _NULL
+    return _asset(name, fields)
+
+
+@contextmanager
+def _stage(name):
+    frame = [name, time.perf_counter(), 0.0]
+    _stack.append(frame)
+    try:
+        yield
+    finally:
+        _stack.pop()
+        elapsed = (time.perf_counter() - frame[1]) * 1000
+        if _stack:
+            _stack[-1][2] += elapsed
+        if _record is not None:
+            stages = _record['stages']
+            # exclusive time, so the stages of an asset add up to its total
+            stages[name] = stages.get(name, 0.0) + elapsed - frame[2]
+
+
+def stage(name):
+    if not _enabled:
+        return _NULL
+    return _stage(name)
+
+
+def new_image(mode, size, color=0):
+    # Image.new under the 'alloc' stage, counting the frame bytes
+    if not _enabled:
+        return Image.new(mode, size, color)
+    with _stage('alloc'):
+        img = Image.new(mode, size, color)
+    if _record is not None:
+        _record['alloc']['frames'] += 1
+        _record['alloc']['frame_bytes'] += len(img.getbands()) * img.width * img.height
+    return img
@@ -0,0 +1,80 @@
+# layered compositing: a frame is a stack of named layers (background,
+# decoration, title, tag, ...) painted in order onto one canvas. The canvas
+# after each cacheable layer is kept under the content keys of the layers
+# below it, so variants that share a prefix of the stack (title / no-title,
+# localised titles, alternate taglines) resume from the cached canvas and
+# only pay for the layers that differ
+from collections import OrderedDict
+
+from . import canvas, instrument
+
+DEFAULT_MAXSIZE = 8
+
+
+class Layer:
+    def __init__(self, name, key, paint, cache=True):
+        self.name = name
+        self.key = key        # hashable description of everything the layer draws
+        self.paint = paint    # paint(img) draws the layer onto the canvas in place
+        self.cache = cache    # keep the canvas after this layer for other variants
+
+    def __repr__(self):
+        return f'Layer({self.name!r}, {self.key!r})'
+
+
+class LayerCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        img = self.frames.get(key)
+        if img is not None:
+            self.frames.move_to_end(key)
+        return img
+
+    def _put(self, key, img):
+        with instrument.stage('alloc'):
+            self.frames[key] = img.copy()
+        if len(self.frames) > self.maxsize:
+            self.frames.popitem(last=False)
+
+    def render(self, size, color, layers, mode=None):
+        mode = mode or canvas.canvas_mode(color)
+        prefix = [(mode, tuple(size), color)]
+        for layer in layers:
+            prefix.append(prefix[-1] + ((layer.name, layer.key),))
+
+        # resume from the longest cached prefix of the stack
+        start = 0
+        img = None
+        for i in range(len(layers), 0, -1):
+            cached = self._get(prefix[i])
+            if cached is not None:
+                with instrument.stage('alloc'):
+                    img = cached.copy()
+                start = i
+                self.hits += 1
+                break
+        if img is None:
+            self.misses += 1
+            img = instrument.new_image(mode, size, color)
+
+        for i in range(start, len(layers)):
+            with instrument.stage('draw'):
+                layers[i].paint(img)
+            # the full stack is the caller's result, only intermediate frames are shared
+            if layers[i].cache and i + 1 < len(layers):
+                self._put(prefix[i + 1], img)
+        return img
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cached': len(self.frames)}
+
+    def clear(self):
+        self.frames.clear()
+
+
+cache = LayerCache()
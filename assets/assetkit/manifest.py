@@ -0,0 +1,87 @@
+# incremental builds: every output records a hash of what went into it (spec
+# name, size, scale, drawing code, palette, font files and the Pillow
+# version) in a JSON manifest next to the outputs, and a later run only
+# re-renders the assets whose hash moved
+import glob
+import hashlib
+import inspect
+import json
+import os
+
+import PIL
+
+MANIFEST_NAME = 'build-manifest.json'
+
+ASSETKIT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_file_digests = {}
+
+
+def file_digest(path):
+    if path not in _file_digests:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        _file_digests[path] = h.hexdigest()
+    return _file_digests[path]
+
+
+def source_digest(objs):
+    h = hashlib.sha256()
+    for obj in objs:
+        h.update(inspect.getsource(obj).encode('utf-8'))
+    return h.hexdigest()
+
+
+def package_files():
+    # every assetkit module. A figure reaches far more of the package than
+    # its generator names (shape masks, text layout, font loading, encoders),
+    # so generators hash all of it rather than a list that has to be kept up
+    return sorted(glob.glob(os.path.join(ASSETKIT_DIR, '*.py')))
+
+
+def input_hash(name, size=None, scale=1, code=(), palette=None, font_files=(), extra=None, code_files=()):
+    # code: functions and modules hashed by source; code_files: whole files
+    payload = {
+        'name': name,
+        'size': list(size) if size else None,
+        'scale': scale,
+        'code': source_digest(code),
+        'code_files': [file_digest(p) for p in code_files],
+        'palette': {k: list(v) for k, v in sorted((palette or {}).items())},
+        'fonts': [file_digest(p) for p in font_files if p],
+        'pillow': PIL.__version__,
+        'extra': extra,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=repr).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, out_dir, force=False, name=MANIFEST_NAME):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, name)
+        self.force = force
+        self.assets = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.assets = json.load(f).get('assets', {})
+
+    def claim(self, name):
+        # whether this build renders the output; a sharded build only
+        # renders its own (see shard.ShardManifest)
+        return True
+
+    def is_fresh(self, name, digest):
+        if self.force or self.assets.get(name) != digest:
+            return False
+        return os.path.exists(os.path.join(self.out_dir, name))
+
+    def record(self, name, digest):
+        self.assets[name] = digest
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({'version': 1, 'assets': self.assets}, f, indent=2, sort_keys=True)
+            f.write('\n')
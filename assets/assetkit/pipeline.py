@@ -0,0 +1,98 @@
+# draw -> encode -> write pipeline: the generator draws frames on the main
+# thread and hands each one over with the function that encodes it and the
+# one that writes the result. Encoder threads run the encodes (zlib and
+# Pillow's WebP/AVIF encoders release the GIL, so they overlap with drawing
+# the next frame) and a single writer thread runs the writes in submission
+# order, so WROTE lines and reports come out as they always did. At most
+# `depth` frames are in flight between draw and disk: put() blocks until the
+# oldest one is written, which keeps memory bounded at hi-DPI scales.
+#
+# With encoders=0, or while instrument is enabled (its per-asset records are
+# kept per thread of control, and overlapping stages would make the timings
+# meaningless), every put() encodes and writes inline.
+import argparse
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import instrument
+
+DEFAULT_ENCODERS = 2
+
+
+def parse_jobs(text):
+    # worker process count for --jobs, 0 meaning one per core; an argparse type
+    try:
+        jobs = int(text)
+    except ValueError:
+        jobs = -1
+    if jobs < 0:
+        raise argparse.ArgumentTypeError(f'expected a worker count >= 0 (0 = one per core), got {text!r}')
+    return jobs
+
+
+class Pipeline:
+    def __init__(self, encoders=DEFAULT_ENCODERS, depth=None):
+        self.inline = encoders < 1 or instrument.enabled()
+        if self.inline:
+            return
+        self.slots = threading.Semaphore(depth or encoders + 1)
+        self.pool = ThreadPoolExecutor(encoders, thread_name_prefix='encode')
+        self.pending = queue.Queue()   # (future, write) in submission order
+        self.error = None
+        self.writer = threading.Thread(target=self._drain, name='write', daemon=True)
+        self.writer.start()
+
+    def put(self, encode, write):
+        # write(encode()), or write() when there is nothing to encode (outputs
+        # that were streamed to disk while drawing still report in order)
+        if self.inline:
+            if encode is None:
+                write()
+            else:
+                write(encode())
+            return
+        self.slots.acquire()
+        if self.error is not None:
+            self.slots.release()
+            raise self.error
+        future = self.pool.submit(encode) if encode is not None else None
+        self.pending.put((future, write))
+
+    def _drain(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            future, write = item
+            try:
+                if self.error is None:
+                    write(*(() if future is None else (future.result(),)))
+            except BaseException as e:
+                # keep draining so the drawing side never blocks on a slot;
+                # put() and close() re-raise
+                self.error = e
+            finally:
+                self.slots.release()
+
+    def close(self):
+        # wait for everything put so far to be written
+        if self.inline:
+            return
+        self.pending.put(None)
+        self.writer.join()
+        self.pool.shutdown()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # on a failed build, flush what was handed over but let the original
+        # error through
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:
+                raise
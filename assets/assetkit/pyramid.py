@@ -0,0 +1,100 @@
+# responsive output pyramid: every srcset width of a figure comes from one
+# render at the smallest scale that covers the widest one. Narrower widths
+# are derived by halving with reduce(2), a box filter much cheaper than
+# LANCZOS, while the level is still at least twice the target, then one
+# LANCZOS resample to the exact width. Halved levels are shared between
+# widths, so no width is resampled from full resolution. srcset.json next
+# to the outputs lists every width with its file, pixel size and bytes
+import json
+import math
+import os
+
+from PIL import Image
+
+from . import instrument
+from .store import replace_file
+
+SRCSET_NAME = 'srcset.json'
+
+
+def parse_widths(text):
+    return sorted({int(w) for w in text.split(',') if w})
+
+
+def render_scale(width, widths):
+    # smallest integer scale whose frame is at least as wide as every width
+    return max(1, math.ceil(max(widths) / width))
+
+
+def width_name(name, width):
+    base, ext = os.path.splitext(name)
+    return f'{base}-{width}w{ext}'
+
+
+def pyramid(img, widths):
+    # [(width, frame)] widest first; widths above the frame's are skipped
+    # rather than upscaled
+    levels = [img]
+    frames = []
+    for width in sorted(set(widths), reverse=True):
+        if width > img.width:
+            continue
+        with instrument.stage('resize'):
+            while levels[-1].width >= 2 * width:
+                levels.append(levels[-1].reduce(2))
+            src = levels[-1]
+            if src.width == width:
+                frames.append((width, src))
+                continue
+            height = max(1, round(img.height * width / img.width))
+            frames.append((width, src.resize((width, height), Image.LANCZOS)))
+    return frames
+
+
+class SrcsetManifest:
+    def __init__(self, out_dir, name=SRCSET_NAME):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, name)
+        self.images = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.images = json.load(f).get('images', {})
+        self.widths = {}
+
+    def record(self, name, widths):
+        self.widths[name] = sorted(widths)
+
+    def rescan(self):
+        # every listed image's widths from the files present, once the
+        # outputs of several builds (shards) are copied into one directory
+        files = set(os.listdir(self.out_dir))
+        for name in self.images:
+            base, ext = os.path.splitext(name)
+            prefix = base + '-'
+            self.record(name, [int(f[len(prefix):-len(ext) - 1]) for f in files
+                               if f.startswith(prefix) and f.endswith('w' + ext)
+                               and f[len(prefix):-len(ext) - 1].isdigit()])
+
+    def entries(self, name, widths):
+        # read back from the files, so outputs left unchanged by an
+        # incremental build are listed too
+        entries = []
+        for width in widths:
+            fname = width_name(name, width)
+            path = os.path.join(self.out_dir, fname)
+            if not os.path.exists(path):
+                continue
+            with Image.open(path) as im:
+                w, h = im.size
+            entries.append({'file': fname, 'width': w, 'height': h, 'bytes': os.path.getsize(path)})
+        return entries
+
+    def save(self):
+        # call once every output has been written
+        for name, widths in self.widths.items():
+            entries = self.entries(name, widths)
+            self.images[name] = {
+                'srcset': ', '.join(f"{e['file']} {e['width']}w" for e in entries),
+                'widths': entries,
+            }
+        replace_file(self.path, json.dumps({'version': 1, 'images': self.images}, indent=2, sort_keys=True) + '\n')
@@ -0,0 +1,497 @@
+# retained scene graph: a figure is described once as a tree of shapes and
+# text, and emitters walk that tree to produce each output format. The raster
+# emitter draws through ScaledDraw (so hi-DPI is native) and the SVG emitter
+# writes the same nodes as markup, which keeps PNG and SVG in step
+import hashlib
+import math
+from dataclasses import dataclass, field
+
+from . import backgrounds, canvas, fonts, instrument, svg, textlayout, tiled
+from .hidpi import device_xy, scale_size, scale_value, scale_xy, scaled_draw
+from .layers import Layer
+from .tag import stamp_tag
+
+SVG_FONT_FAMILY = 'Inter, Arial, sans-serif'
+
+
+@dataclass
+class Rect:
+    x: float
+    y: float
+    w: float
+    h: float
+    radius: float = 0  # > 0 makes it a rounded rect
+    fill: tuple = None
+    stroke: tuple = None
+    width: int = 1
+    kind = 'rect'
+
+
+@dataclass
+class Ellipse:
+    cx: float
+    cy: float
+    rx: float
+    ry: float
+    fill: tuple = None
+    stroke: tuple = None
+    width: int = 1
+    kind = 'ellipse'
+
+
+@dataclass
+class Line:
+    points: list
+    stroke: tuple
+    width: int = 1
+    kind = 'line'
+
+
+@dataclass
+class Polygon:
+    points: list
+    fill: tuple = None
+    stroke: tuple = None
+    width: int = 1
+    kind = 'polygon'
+
+
+@dataclass
+class Stripes:
+    # a field of parallel lines from (s, y0) to (s + dx, y1) for s in
+    # range(start, stop, step): one node instead of one Line per stripe
+    start: int
+    stop: int
+    step: int
+    dx: float
+    y0: float
+    y1: float
+    stroke: tuple
+    width: int = 1
+    kind = 'stripes'
+
+
+@dataclass
+class Gradient:
+    # a rect filled with colours spaced evenly from p0 to p1; radial=True
+    # spreads them from p0 out to the distance of p1
+    x: float
+    y: float
+    w: float
+    h: float
+    colors: tuple
+    p0: tuple
+    p1: tuple
+    radial: bool = False
+    kind = 'gradient'
+
+
+@dataclass
+class Glow:
+    # soft round light fading out towards radius
+    cx: float
+    cy: float
+    radius: float
+    color: tuple
+    kind = 'glow'
+
+
+@dataclass
+class Grain:
+    # seeded per-pixel noise over the frame, color blended in at up to
+    # `amount` opacity; with density < 1 only that fraction of the pixels,
+    # as specks at `amount`. Raster only, the SVG has no equivalent
+    color: tuple
+    amount: float
+    seed: int = 0
+    density: float = 1
+    kind = 'grain'
+
+
+@dataclass
+class Text:
+    # (x, y) is the top-left of the first line, as with ImageDraw.text
+    x: float
+    y: float
+    text: str
+    size: int
+    fill: tuple
+    bold: bool = False
+    spacing: int = 4
+    kind = 'text'
+
+
+@dataclass
+class TextBox:
+    # text laid out in a w x h box (see textlayout.py): wrapped at words,
+    # shrunk towards min_size and then ellipsized if it still doesn't fit;
+    # h=None only wraps. valign places the lines in the box: top, middle, bottom
+    x: float
+    y: float
+    w: float
+    h: float
+    text: str
+    size: int
+    fill: tuple
+    bold: bool = False
+    align: str = 'left'
+    spacing: int = 4
+    max_lines: int = None
+    min_size: int = None
+    valign: str = 'top'
+    kind = 'textbox'
+
+
+@dataclass
+class Tag:
+    # text label with an optional rounded background, rasterised once as a
+    # cached sprite (see tag.py); (x, y) is where the text itself starts
+    x: float
+    y: float
+    text: str
+    size: int
+    fill: tuple
+    background: tuple = None
+    pad: tuple = (0, 0)
+    radius: float = 0
+    bold: bool = False
+    kind = 'tag'
+
+
+@dataclass
+class Group:
+    children: list = field(default_factory=list)
+    name: str = None
+    # False for a group that differs between variants of a figure (its
+    # title): the frame after it is not worth keeping (see scene_layers)
+    cache: bool = True
+    kind = 'group'
+
+    def add(self, *nodes):
+        self.children.extend(nodes)
+        return self
+
+
+@dataclass
+class Scene(Group):
+    width: int = 0
+    height: int = 0
+    background: tuple = (255, 255, 255)
+    font_family: str = 'default'
+    kind = 'scene'
+
+
+class Emitter:
+    def layout(self, n):
+        # line breaks are decided once at 1x, so every scale and the SVG agree
+        def font_for_size(size):
+            return fonts.get_font(self.scene.font_family, size, n.bold)
+        return textlayout.fit(n.text, font_for_size, n.size, n.w, n.h, n.min_size,
+                              align=n.align, spacing=n.spacing, max_lines=n.max_lines)
+
+    def origin(self, n, box):
+        if n.h is None or n.valign == 'top':
+            return n.x, n.y
+        free = n.h - box.height
+        return n.x, n.y + (free / 2 if n.valign == 'middle' else free)
+
+    def emit(self, node):
+        if isinstance(node, Group):
+            self.begin_group(node)
+            for child in node.children:
+                self.emit(child)
+            self.end_group(node)
+        else:
+            getattr(self, node.kind)(node)
+
+    def begin_group(self, node):
+        pass
+
+    def end_group(self, node):
+        pass
+
+
+class RasterEmitter(Emitter):
+    def __init__(self, scene, scale=1, img=None, viewport=None):
+        # with a viewport, img is one tile of the frame (see tiled.py)
+        self.scene = scene
+        self.scale = scale
+        self.viewport = viewport
+        if img is None:
+            img = canvas.new_canvas(scale_size((scene.width, scene.height), scale), scene.background)
+        self.img = img
+        self.draw = scaled_draw(self.img, scale, viewport)
+
+    def font(self, node, size=None):
+        size = node.size if size is None else size
+        return fonts.get_font(self.scene.font_family, round(size * self.scale), node.bold)
+
+    def rect(self, n):
+        xy = [n.x, n.y, n.x + n.w, n.y + n.h]
+        if n.radius:
+            self.draw.rounded_rectangle(xy, radius=n.radius, fill=n.fill, outline=n.stroke, width=n.width)
+        else:
+            self.draw.rectangle(xy, fill=n.fill, outline=n.stroke, width=n.width)
+
+    def ellipse(self, n):
+        xy = [n.cx - n.rx, n.cy - n.ry, n.cx + n.rx, n.cy + n.ry]
+        self.draw.ellipse(xy, fill=n.fill, outline=n.stroke, width=n.width)
+
+    def line(self, n):
+        self.draw.line(n.points, fill=n.stroke, width=n.width)
+
+    def polygon(self, n):
+        self.draw.polygon(n.points, fill=n.fill, outline=n.stroke, width=n.width)
+
+    def canvas_box(self, xy):
+        # logical [x0, y0, x1, y1] -> device box on this canvas, clipped
+        l, t, r, b = [v * self.scale for v in xy]
+        if self.viewport is not None:
+            l, t, r, b = l - self.viewport.x, t - self.viewport.y, r - self.viewport.x, b - self.viewport.y
+        return backgrounds.region((l, t, r + 1, b + 1), self.img.size)
+
+    def stripes(self, n):
+        box = self.canvas_box([min(n.start, n.start + n.dx) - n.width, n.y0,
+                               max(n.stop, n.stop + n.dx) + n.width, n.y1])
+        if box is None:
+            return
+        x, y = backgrounds.grid(box, self.scale, self.viewport)
+        coverage = backgrounds.stripes(x, y, n.start, n.stop, n.step, n.dx, n.y0, n.y1, n.width, self.scale)
+        backgrounds.paint(self.img, box, n.stroke, coverage)
+
+    def gradient(self, n):
+        box = self.canvas_box([n.x, n.y, n.x + n.w, n.y + n.h])
+        if box is None:
+            return
+        x, y = backgrounds.grid(box, self.scale, self.viewport)
+        if n.radial:
+            radius = math.hypot(n.p1[0] - n.p0[0], n.p1[1] - n.p0[1])
+            rgba = backgrounds.radial_gradient(x, y, n.p0, radius, n.colors)
+        else:
+            rgba = backgrounds.linear_gradient(x, y, n.p0, n.p1, n.colors)
+        backgrounds.composite(self.img, box, rgba, opaque=all(len(c) == 3 or c[3] == 255 for c in n.colors))
+
+    def glow(self, n):
+        box = self.canvas_box([n.cx - n.radius, n.cy - n.radius, n.cx + n.radius, n.cy + n.radius])
+        if box is None:
+            return
+        x, y = backgrounds.grid(box, self.scale, self.viewport)
+        backgrounds.paint(self.img, box, n.color, backgrounds.glow(x, y, (n.cx, n.cy), n.radius))
+
+    def grain(self, n):
+        box = (0, 0) + self.img.size
+        if n.density < 1:
+            xs, ys = backgrounds.specks(box, n.density, n.seed, self.viewport)
+            fill = tuple(n.color[:3]) + (round(n.amount * (n.color[3] if len(n.color) == 4 else 255)),)
+            canvas.draw(self.img).point(list(zip(xs, ys)), fill=fill)
+            return
+        backgrounds.paint(self.img, box, n.color, backgrounds.noise(box, n.seed, self.viewport) * n.amount)
+
+    def text(self, n):
+        if '\n' in n.text:
+            self.draw.multiline_text((n.x, n.y), n.text, font=self.font(n), fill=n.fill, spacing=n.spacing)
+        else:
+            self.draw.text((n.x, n.y), n.text, font=self.font(n), fill=n.fill)
+
+    def textbox(self, n):
+        box = self.layout(n)
+        textlayout.draw_layout(self.draw, self.origin(n, box), box, self.font(n, box.size), n.fill)
+
+    def tag(self, n):
+        stamp_tag(self.img, device_xy((n.x, n.y), self.scale, self.viewport), n.text, self.font(n), n.fill,
+                  n.background, scale_xy(n.pad, self.scale), scale_value(n.radius, self.scale))
+
+
+def svg_color(col):
+    # (attribute value, opacity or None)
+    if col is None:
+        return 'none', None
+    hexcol = '#%02x%02x%02x' % tuple(col[:3])
+    if len(col) == 4 and col[3] != 255:
+        return hexcol, f'{col[3] / 255:.3f}'.rstrip('0').rstrip('.')
+    return hexcol, None
+
+
+def svg_paint(fill=None, stroke=None, width=1):
+    # presentation attributes as a style dict for svg.SvgDocument
+    style = {}
+    for name, col in (('fill', fill), ('stroke', stroke)):
+        if name == 'stroke' and col is None:
+            continue
+        style[name], opacity = svg_color(col)
+        if opacity is not None:
+            style[name + '-opacity'] = opacity
+    if stroke is not None:
+        style['stroke-width'] = width
+    return style
+
+
+class SvgEmitter(Emitter):
+    def __init__(self, scene, precision=2):
+        self.scene = scene
+        # the font family is inherited from the root instead of repeated per text
+        self.doc = svg.SvgDocument(scene.width, scene.height, {'font-family': SVG_FONT_FAMILY}, precision)
+        self.ids = 0
+
+    def begin_group(self, node):
+        if node is self.scene:
+            self.doc.add('rect', {'width': '100%', 'height': '100%'}, svg_paint(fill=node.background))
+        else:
+            self.doc.open('g', {'id': node.name} if node.name else None)
+
+    def end_group(self, node):
+        if node is not self.scene:
+            self.doc.close()
+
+    def rect(self, n):
+        attrs = {'x': n.x, 'y': n.y, 'width': n.w, 'height': n.h}
+        if n.radius:
+            attrs['rx'] = n.radius
+        self.doc.add('rect', attrs, svg_paint(n.fill, n.stroke, n.width))
+
+    def ellipse(self, n):
+        if n.rx == n.ry:
+            self.doc.add('circle', {'cx': n.cx, 'cy': n.cy, 'r': n.rx}, svg_paint(n.fill, n.stroke, n.width))
+        else:
+            self.doc.add('ellipse', {'cx': n.cx, 'cy': n.cy, 'rx': n.rx, 'ry': n.ry},
+                         svg_paint(n.fill, n.stroke, n.width))
+
+    def line(self, n):
+        self.doc.add('polyline', {'points': list(n.points)}, svg_paint(None, n.stroke, n.width))
+
+    def polygon(self, n):
+        self.doc.add('polygon', {'points': list(n.points)}, svg_paint(n.fill, n.stroke, n.width))
+
+    def stripes(self, n):
+        for s in range(n.start, n.stop, n.step):
+            self.line(Line([(s, n.y0), (s + n.dx, n.y1)], n.stroke, n.width))
+
+    def new_id(self, prefix):
+        self.ids += 1
+        return f'{prefix}-{self.ids}'
+
+    def define_gradient(self, tag, geometry, stops):
+        # [(offset, colour)] as a userSpaceOnUse gradient; its url()
+        gid = self.new_id(tag[:-len('Gradient')])
+        children = []
+        for offset, col in stops:
+            value, opacity = svg_color(col)
+            stop = {'offset': offset, 'stop-color': value}
+            if opacity is not None:
+                stop['stop-opacity'] = opacity
+            children.append(svg.Element('stop', stop))
+        self.doc.define(svg.Element(tag, {'id': gid, **geometry, 'gradientUnits': 'userSpaceOnUse'},
+                                    children=children))
+        return f'url(#{gid})'
+
+    def gradient(self, n):
+        last = max(len(n.colors) - 1, 1)
+        stops = [(i / last, col) for i, col in enumerate(n.colors)]
+        (x0, y0), (x1, y1) = n.p0, n.p1
+        if n.radial:
+            fill = self.define_gradient('radialGradient', {'cx': x0, 'cy': y0, 'r': math.hypot(x1 - x0, y1 - y0)},
+                                        stops)
+        else:
+            fill = self.define_gradient('linearGradient', {'x1': x0, 'y1': y0, 'x2': x1, 'y2': y1}, stops)
+        self.doc.add('rect', {'x': n.x, 'y': n.y, 'width': n.w, 'height': n.h}, {'fill': fill})
+
+    def glow(self, n):
+        # the Gaussian falloff sampled into gradient stops
+        alpha = n.color[3] if len(n.color) == 4 else 255
+        stops = [(t, tuple(n.color[:3]) + (round(alpha * math.exp(-backgrounds.GLOW_FALLOFF * t * t)),))
+                 for t in (0, 0.25, 0.5, 0.75, 1)]
+        fill = self.define_gradient('radialGradient', {'cx': n.cx, 'cy': n.cy, 'r': n.radius}, stops)
+        self.doc.add('circle', {'cx': n.cx, 'cy': n.cy, 'r': n.radius}, {'fill': fill})
+
+    def grain(self, n):
+        pass
+
+    def text_style(self, n, size):
+        style = svg_paint(fill=n.fill)
+        style['font-size'] = size
+        if n.bold:
+            style['font-weight'] = 'bold'
+        return style
+
+    def text(self, n):
+        # SVG positions text by its baseline, Pillow by the ascender line, so
+        # shift by the ascent of the same font the raster emitter uses
+        font = fonts.get_font(self.scene.font_family, n.size, n.bold)
+        ascent = font.getmetrics()[0]
+        attrs = {'x': n.x, 'y': n.y + ascent}
+        lines = n.text.split('\n')
+        if len(lines) == 1:
+            self.doc.add('text', attrs, self.text_style(n, n.size), text=n.text)
+            return
+        line_height = textlayout.line_height(font, n.spacing)
+        spans = [svg.Element('tspan', {'x': n.x, 'dy': 0 if i == 0 else line_height}, text=line)
+                 for i, line in enumerate(lines)]
+        self.doc.add('text', attrs, self.text_style(n, n.size), children=spans)
+
+    def textbox(self, n):
+        box = self.layout(n)
+        x, y = self.origin(n, box)
+        ascent = fonts.get_font(self.scene.font_family, box.size, n.bold).getmetrics()[0]
+        if len(box.lines) == 1:
+            line = box.lines[0]
+            self.doc.add('text', {'x': x + line.x, 'y': y + line.y + ascent}, self.text_style(n, box.size),
+                         text=line.text)
+            return
+        spans = [svg.Element('tspan', {'x': x + line.x, 'y': y + line.y + ascent}, text=line.text)
+                 for line in box.lines]
+        self.doc.add('text', None, self.text_style(n, box.size), children=spans)
+
+    def tag(self, n):
+        group = Group(name='tag')
+        self.begin_group(group)
+        if n.background is not None:
+            px, py = n.pad
+            font = fonts.get_font(self.scene.font_family, n.size, n.bold)
+            r, b = textlayout.measure(font, n.text).bbox[2:]
+            self.rect(Rect(n.x - px, n.y - py, r + 2*px, b + 2*py, radius=n.radius, fill=n.background))
+        self.text(Text(n.x, n.y, n.text, n.size, n.fill, bold=n.bold))
+        self.end_group(group)
+
+
+def scene_layers(scene, scale=1):
+    # each top-level child is a layer keyed by its content; the named groups
+    # below the first per-variant one (background shapes, accents, ...) are
+    # the frames worth caching. A frame above a title is keyed by the title
+    # too, so no other variant would resume from it
+    layers = []
+    shared = True
+    for child in scene.children:
+        def paint(img, child=child):
+            RasterEmitter(scene, scale, img).emit(child)
+        key = (scene.font_family, hashlib.sha1(repr(child).encode('utf-8')).hexdigest())
+        name = getattr(child, 'name', None)
+        shared = shared and getattr(child, 'cache', True)
+        layers.append(Layer(name or child.kind, key, paint, cache=shared and name is not None))
+    return layers
+
+
+def render_png(scene, scale=1, cache=None):
+    # with a LayerCache, variants of a figure that share their lower layers
+    # (e.g. the cover with and without title) reuse the painted frame
+    if cache is not None:
+        size = scale_size((scene.width, scene.height), scale)
+        return cache.render(size, scene.background, scene_layers(scene, scale))
+    emitter = RasterEmitter(scene, scale)
+    with instrument.stage('draw'):
+        emitter.emit(scene)
+    return emitter.img
+
+
+def render_png_tiled(path, scene, scale=1, tile_height=tiled.DEFAULT_TILE_HEIGHT, compress_level=6):
+    # large exports: paint the scene strip by strip straight into a PNG file
+    def paint(canvas, viewport):
+        RasterEmitter(scene, scale, canvas, viewport).emit(scene)
+    size = scale_size((scene.width, scene.height), scale)
+    return tiled.render_tiled(path, size, scene.background, paint, tile_height,
+                              compress_level=compress_level)
+
+
+def render_svg(scene, minify=False, precision=2):
+    emitter = SvgEmitter(scene, precision)
+    emitter.emit(scene)
+    return emitter.doc.serialize(minify)
@@ -0,0 +1,246 @@
+# anti-aliased shape primitives: Pillow's rounded rectangles and ellipses are
+# aliased, so each shape is rasterised SUPERSAMPLE times larger over its own
+# bounding box and box-filtered back down with reduce() into an 'L' coverage
+# mask, cached under (shape, device size, radius, stroke width, alpha).
+# Sizes are device pixels, so the scale is part of the key. A shape is then
+# a few blits of its colour through the cached masks, and repeated panels,
+# cards and icon circles cost no rasterising at all after the first one.
+# A rounded rect only needs its corners supersampled: it is cut into pieces
+# (corners, sides, centre) trimmed to what they cover, and a piece covered
+# all the way is filled without a mask, so a large panel or outline ring
+# costs little more than its edges. Both shapes are symmetric about both
+# axes, so only their top-left quarter is supersampled (an ellipse's BAND
+# rows at a time to keep the 16x buffer small) and mirrored into the other
+# three; each quarter of an ellipse is cut into bands whose covered run is
+# filled without a mask too.
+# Masks are cached already scaled by the colour's alpha, least recently used
+# dropped past MAXSIZE.
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+from . import canvas, instrument
+
+SUPERSAMPLE = 4
+BAND = 64
+MAXSIZE = 256
+FULL = [0] * 255 + [255]
+
+_shapes = OrderedDict()
+
+
+def supersampled(kind, size, radius=0, width=0, crop=None):
+    # coverage of the filled shape (width 0) or of its outline ring, for a
+    # shape drawn by ImageDraw over the inclusive box (0, 0, w - 1, h - 1),
+    # over the device box crop (default all of it)
+    w, h = size
+    ss = SUPERSAMPLE
+    l, t, r, b = crop or (0, 0, w, h)
+    big = Image.new('L', ((r - l) * ss, (b - t) * ss), 0)
+    d = ImageDraw.Draw(big)
+    box = [-l * ss, -t * ss, (w - l) * ss - 1, (h - t) * ss - 1]
+    paint = {'outline': 255, 'width': width * ss} if width else {'fill': 255}
+    if kind == 'ellipse':
+        d.ellipse(box, **paint)
+    else:
+        d.rounded_rectangle(box, radius=radius * ss, **paint)
+    return big.reduce(ss)
+
+
+def scaled(mask, alpha):
+    if alpha == 255:
+        return mask
+    return mask.point([v * alpha // 255 for v in range(256)])
+
+
+def trim(slices, alpha=255):
+    # [((x, y), mask or (w, h))]: empty pieces dropped, the rest cut to
+    # their bounding box; a piece covered all the way (to alpha, for a mask
+    # already scaled by it) is just its size
+    pieces = []
+    for (x, y), mask in slices:
+        box = mask.getbbox()
+        if box is None:
+            continue
+        if box != (0, 0) + mask.size:
+            mask = mask.crop(box)
+        if mask.getextrema() == (alpha, alpha):
+            mask = mask.size
+        pieces.append(((x + box[0], y + box[1]), mask))
+    return pieces
+
+
+def stretch(pieces, size):
+    # trimmed pieces of a one pixel wide (or high) strip grown to size
+    # along it; the other dimension of size is 0
+    grown = []
+    for xy, mask in pieces:
+        full = isinstance(mask, tuple)
+        w, h = mask if full else mask.size
+        to = (size[0] or w, size[1] or h)
+        grown.append((xy, to if full else mask.resize(to, Image.NEAREST)))
+    return grown
+
+
+def nine_slice(tile, size, alpha=255):
+    # trimmed pieces growing a small rounded rect (a 2c + 1 square whose
+    # centre row and column are straight) to size: its corner quadrants are
+    # kept and the row and column through its centre stretched along the
+    # sides, trimmed before they are stretched
+    w, h = size
+    c = tile.width // 2
+    e = c + 1   # where the far quadrants start
+    mw, mh = w - 2 * c, h - 2 * c
+    pieces = trim([((x, y), tile.crop((l, t, l + c, t + c)))
+                   for x, l in ((0, 0), (w - c, e)) for y, t in ((0, 0), (h - c, e))], alpha)
+    for xy, box, to in (((c, 0), (c, 0, e, c), (mw, 0)), ((c, h - c), (c, e, e, e + c), (mw, 0)),
+                        ((0, c), (0, c, c, e), (0, mh)), ((w - c, c), (e, c, e + c, e), (0, mh))):
+        pieces += stretch(trim([(xy, tile.crop(box))], alpha), to)
+    centre = tile.getpixel((c, c))
+    if centre == alpha:
+        pieces.append(((c, c), (mw, mh)))
+    elif centre:
+        pieces.append(((c, c), Image.new('L', (mw, mh), centre)))
+    return pieces
+
+
+def quadrant(kind, size, radius=0, width=0):
+    # top-left quarter of a shape symmetric about both axes, its middle row
+    # and column included for an odd size
+    w, h = size
+    qw, qh = (w + 1) // 2, (h + 1) // 2
+    mask = Image.new('L', (qw, qh), 0)
+    for t in range(0, qh, BAND):
+        mask.paste(supersampled(kind, size, radius, width, (0, t, qw, min(t + BAND, qh))), (0, t))
+    return mask
+
+
+def split(xy, mask, alpha=255):
+    # trimmed pieces of a quarter cut into BAND rows, the columns covered
+    # all the way down a band (one run, for a filled or ring quarter) a box
+    # between the band's edges, so only the edges are kept as masks
+    x, y = xy
+    if not mask.width:
+        return []
+    covered = [255 if v == alpha else 0 for v in range(256)]
+    slices = []
+    for t in range(0, mask.height, BAND):
+        band = mask.crop((0, t, mask.width, min(t + BAND, mask.height)))
+        # a column averages 255 only if every row of it is covered
+        run = band.point(covered).reduce((1, band.height)).point(FULL).getbbox()
+        if run is None:
+            slices.append(((x, y + t), band))
+            continue
+        l, r = run[0], run[2]
+        slices += [((x, y + t), band.crop((0, 0, l, band.height))),
+                   ((x + l, y + t), band.crop((l, 0, r, band.height))),
+                   ((x + r, y + t), band.crop((r, 0, band.width, band.height)))]
+    return trim(slices, alpha)
+
+
+def quarters(quarter, size):
+    # the four quarters of the whole shape from its top-left one
+    w, h = size
+    qw, qh = quarter.size
+    l, t = qw - w // 2, qh - h // 2   # the middle column and row are not repeated
+    return [
+        ((0, 0), quarter),
+        ((qw, 0), quarter.transpose(Image.FLIP_LEFT_RIGHT).crop((l, 0, qw, qh))),
+        ((0, qh), quarter.transpose(Image.FLIP_TOP_BOTTOM).crop((0, t, qw, qh))),
+        ((qw, qh), quarter.transpose(Image.ROTATE_180).crop((l, t, qw, qh))),
+    ]
+
+
+def mirror(quarter, size, alpha=255):
+    # pieces of the whole shape from its top-left quarter
+    return [piece for xy, mask in quarters(quarter, size) for piece in split(xy, mask, alpha)]
+
+
+def unfold(quarter, size):
+    # the whole mask from its top-left quarter
+    mask = Image.new('L', size, 0)
+    for xy, piece in quarters(quarter, size):
+        mask.paste(piece, xy)
+    return mask
+
+
+def shape_pieces(kind, size, radius=0, width=0, alpha=255):
+    key = (kind, size, radius, width, alpha)
+    pieces = _shapes.get(key)
+    if pieces is not None:
+        _shapes.move_to_end(key)
+        return pieces
+    # the coverage is scaled by alpha before it is sliced and stretched
+    if kind == 'ellipse':
+        pieces = mirror(scaled(quadrant(kind, size, 0, width), alpha), size, alpha)
+    else:
+        # corner quadrants of c pixels, straight from column c - 1 on
+        c = max(radius, width) + 2
+        if min(size) > 2 * c + 1:
+            n = 2 * c + 1
+            tile = unfold(quadrant(kind, (n, n), radius, width), (n, n))
+            pieces = nine_slice(scaled(tile, alpha), size, alpha)
+        else:
+            pieces = trim([((0, 0), scaled(supersampled(kind, size, radius, width), alpha))], alpha)
+    _shapes[key] = pieces
+    if len(_shapes) > MAXSIZE:
+        _shapes.popitem(last=False)
+    return pieces
+
+
+def fill_mask(img, xy, mask, color):
+    # blend a flat colour into img through mask (or over a (w, h) box)
+    # placed at xy; a mask is already scaled by the colour's alpha, a box
+    # is filled at it
+    alpha = color[3] if len(color) == 4 else 255
+    rgb = tuple(color[:3])
+    if isinstance(mask, tuple):
+        x1, y1 = xy[0] + mask[0], xy[1] + mask[1]
+        if img.mode == 'RGB' and alpha == 255:
+            img.paste(rgb, xy + (x1, y1))
+            return
+        if img.mode == 'RGB':
+            # blends as the paste through a flat mask would, without the mask
+            ImageDraw.Draw(img, 'RGBA').rectangle(xy + (x1 - 1, y1 - 1), fill=rgb + (alpha,))
+            return
+        mask = Image.new('L', mask, alpha)
+    if img.mode == 'RGBA':
+        sprite = Image.new('RGBA', mask.size, rgb + (0,))
+        sprite.putalpha(mask)
+        canvas.stamp(img, sprite, xy)
+    else:
+        img.paste(rgb, xy + (xy[0] + mask.width, xy[1] + mask.height), mask)
+
+
+def draw_shape(img, kind, xy, radius=0, fill=None, outline=None, width=1):
+    # xy: inclusive device box as for ImageDraw; the outline is drawn over
+    # the fill, inside the box
+    x0, y0, x1, y1 = (round(v) for v in xy)
+    if x1 < x0 or y1 < y0:
+        return
+    size = (x1 - x0 + 1, y1 - y0 + 1)
+    radius = min(round(radius), min(size) // 2)
+    paints = [(fill, 0)] + ([(outline, width)] if width > 0 else [])
+    with instrument.stage('shapes'):
+        for color, stroke in paints:
+            alpha = 255 if color is None or len(color) < 4 else color[3]
+            if color is None or alpha == 0:
+                continue
+            for (dx, dy), mask in shape_pieces(kind, size, radius, stroke, alpha):
+                fill_mask(img, (x0 + dx, y0 + dy), mask, color)
+
+
+def rounded_rectangle(img, xy, radius=0, fill=None, outline=None, width=1):
+    draw_shape(img, 'rounded_rect', xy, radius, fill, outline, width)
+
+
+def ellipse(img, xy, fill=None, outline=None, width=1):
+    draw_shape(img, 'ellipse', xy, 0, fill, outline, width)
+
+
+def cache_size():
+    return len(_shapes)
+
+
+def clear_cache():
+    _shapes.clear()
@@ -0,0 +1,242 @@
+# sharded builds over several nodes: with --shard i/N a node renders only
+# the assets whose ID hashes to shard i. The ID is the output name without
+# its scale, width and extension, so a figure's 1x, @2x, srcset widths and
+# SVG (or a card's frames) stay on one node, and the hash is SHA-256 rather
+# than hash(), so every node agrees whatever its PYTHONHASHSEED.
+# Each node keeps a partial manifest, build-manifest.shard-i-of-N.json, next
+# to its outputs: the input digests of what it owns, the SHA-256 of every
+# file it wrote, a digest of the whole build plan and what the pixels and
+# bytes depend on besides the code (Pillow, zlib, FreeType, the font files).
+# Once the nodes' output directories are copied into one, merge checks that
+# every shard is there, built from the same plan in the same environment,
+# with no asset missing or built twice, and writes the combined
+# build-manifest.json (and srcset.json, from the files now together).
+#
+#   node i:  python generate_pngs.py --shard i/4
+#   after:   cd assets && python -m assetkit.shard merge the-new-builder-playbook --verify
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import zlib
+
+import PIL
+from PIL import features
+
+from . import fonts, pyramid
+from .manifest import MANIFEST_NAME, BuildManifest, file_digest
+
+PARTIAL_GLOB = 'build-manifest.shard-*-of-*.json'
+# ancillary PNG chunks that would make equal frames differ between nodes
+METADATA_CHUNKS = {b'tIME', b'tEXt', b'zTXt', b'iTXt', b'eXIf'}
+_SUFFIX = re.compile(r'(@\d+x|-\d+w)?\.\w+$')
+
+
+def parse_shard(text):
+    # 'i/N' -> (i, N), shards counted from 1; an argparse type
+    m = re.fullmatch(r'(\d+)/(\d+)', text.strip())
+    if not m or not 1 <= int(m.group(1)) <= int(m.group(2)):
+        raise argparse.ArgumentTypeError(f'expected i/N with 1 <= i <= N, got {text!r}')
+    return int(m.group(1)), int(m.group(2))
+
+
+def add_argument(parser):
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                        help='render only the assets of shard I of N and keep a partial manifest '
+                             'for python -m assetkit.shard merge')
+
+
+def asset_id(name):
+    return _SUFFIX.sub('', name)
+
+
+def shard_of(aid, count):
+    digest = hashlib.sha256(aid.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def manifest_name(shard):
+    return f'build-manifest.shard-{shard[0]}-of-{shard[1]}.json'
+
+
+def content_digest(path):
+    # not file_digest(): outputs change under the same path
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def environment():
+    # what the bytes depend on besides the inputs: the rasteriser, both zlibs
+    # (Pillow's encodes PNGs, Python's the tiled exports) and the font files
+    # every registered family resolved to
+    families = sorted({family for family, _ in fonts.registry.candidates})
+    return {
+        'pillow': PIL.__version__,
+        'zlib': features.version('zlib'),
+        'python-zlib': zlib.ZLIB_RUNTIME_VERSION,
+        'freetype2': features.version('freetype2'),
+        'raqm': features.version('raqm'),
+        'fonts': {family: {os.path.basename(p): file_digest(p) for p in fonts.font_files(family)}
+                  for family in families},
+    }
+
+
+def plan_digest(names):
+    return hashlib.sha256('\n'.join(sorted(names)).encode('utf-8')).hexdigest()
+
+
+class ShardManifest(BuildManifest):
+    def __init__(self, out_dir, shard, force=False):
+        super().__init__(out_dir, force, manifest_name(shard))
+        self.index, self.count = shard
+        self.planned = set()   # every output name of the whole build
+        self.owned = {}   # asset ID -> output names
+
+    def claim(self, name):
+        aid = asset_id(name)
+        self.planned.add(name)
+        if shard_of(aid, self.count) != self.index:
+            return False
+        self.owned.setdefault(aid, []).append(name)
+        return True
+
+    def save(self):
+        # only what this shard owns: entries of assets that moved to another
+        # shard or left the plan are dropped
+        names = sorted(n for outputs in self.owned.values() for n in outputs)
+        assets = {n: self.assets[n] for n in names if n in self.assets}
+        files = {n: content_digest(os.path.join(self.out_dir, n)) for n in assets
+                 if os.path.exists(os.path.join(self.out_dir, n))}
+        data = {
+            'version': 1,
+            'shard': [self.index, self.count],
+            'plan': plan_digest(self.planned),
+            'planned': len({asset_id(n) for n in self.planned}),
+            'environment': environment(),
+            'outputs': {aid: sorted(outputs) for aid, outputs in sorted(self.owned.items())},
+            'assets': assets,
+            'files': files,
+        }
+        with open(self.path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+def open_manifest(out_dir, shard=None, force=False):
+    if shard is None:
+        return BuildManifest(out_dir, force=force)
+    return ShardManifest(out_dir, shard, force=force)
+
+
+def png_metadata(path):
+    # names of the metadata chunks in a PNG
+    found = []
+    with open(path, 'rb') as f:
+        if f.read(8) != b'\x89PNG\r\n\x1a\n':
+            return found
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                break
+            length, kind = int.from_bytes(head[:4], 'big'), head[4:]
+            if kind in METADATA_CHUNKS:
+                found.append(kind.decode('ascii'))
+            if kind == b'IEND':
+                break
+            f.seek(length + 4, os.SEEK_CUR)
+    return found
+
+
+def load_partials(out_dir):
+    partials = []
+    for path in sorted(glob.glob(os.path.join(out_dir, PARTIAL_GLOB))):
+        with open(path) as f:
+            partials.append(json.load(f))
+    return partials
+
+
+def merge(out_dir, verify=False):
+    # (merged {output: digest}, problems)
+    partials = load_partials(out_dir)
+    if not partials:
+        return {}, [f'no {PARTIAL_GLOB} in {out_dir}']
+    counts = sorted({p['shard'][1] for p in partials})
+    if len(counts) > 1:
+        return {}, [f'partial manifests from different shard counts: {counts}']
+    count = counts[0]
+    problems = []
+    shards = sorted(p['shard'][0] for p in partials)
+    problems += [f'shard {i}/{count}: no partial manifest' for i in range(1, count + 1) if i not in shards]
+    if len({p['plan'] for p in partials}) > 1:
+        problems.append('shards were built from different plans (inputs or scales differ between nodes)')
+    reference = partials[0]
+    for p in partials[1:]:
+        for key, value in p['environment'].items():
+            if value != reference['environment'].get(key):
+                problems.append(f"shard {p['shard'][0]}/{count}: {key} differs from shard "
+                                f"{reference['shard'][0]}/{count}")
+
+    merged = {}
+    owner = {}
+    for p in partials:
+        index = p['shard'][0]
+        for aid, outputs in p['outputs'].items():
+            if shard_of(aid, count) != index:
+                problems.append(f'{aid}: built by shard {index}/{count}, belongs to {shard_of(aid, count)}/{count}')
+            if aid in owner:
+                problems.append(f'{aid}: built by shards {owner[aid]}/{count} and {index}/{count}')
+            owner[aid] = index
+            for name in outputs:
+                path = os.path.join(out_dir, name)
+                if name not in p['assets']:
+                    problems.append(f'{name}: not rendered by shard {index}/{count}')
+                elif not os.path.exists(path):
+                    problems.append(f'{name}: missing from {out_dir}')
+                elif verify and content_digest(path) != p['files'].get(name):
+                    problems.append(f'{name}: differs from what shard {index}/{count} wrote')
+                elif verify and name.endswith('.png') and png_metadata(path):
+                    problems.append(f"{name}: PNG metadata {', '.join(png_metadata(path))}")
+                else:
+                    merged[name] = p['assets'][name]
+    planned = reference['planned']
+    if len(shards) == count and len(owner) != planned:
+        problems.append(f'{planned} assets planned, {len(owner)} built')
+    return merged, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m assetkit.shard',
+                                     description='Combine the partial manifests of a sharded build.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmd = sub.add_parser('merge', help='check the shards of an output directory and write its build manifest')
+    cmd.add_argument('out_dir', help='output directory holding every shard\'s files and partial manifest')
+    cmd.add_argument('--verify', action='store_true',
+                     help='also hash every output against its partial manifest and check PNGs for metadata')
+    args = parser.parse_args(argv)
+
+    merged, problems = merge(args.out_dir, args.verify)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        print(f'{len(problems)} problem(s), {MANIFEST_NAME} not written')
+        return 1
+    manifest = BuildManifest(args.out_dir)
+    manifest.assets = merged
+    manifest.save()
+    if os.path.exists(os.path.join(args.out_dir, pyramid.SRCSET_NAME)):
+        # each shard listed only the widths it wrote
+        srcset = pyramid.SrcsetManifest(args.out_dir)
+        srcset.rescan()
+        srcset.save()
+    print(f'merged {len(merged)} outputs into {manifest.path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+# content-addressed asset store: encoded files live once under
+# assets/.store/objects keyed by the sha256 of their bytes, and every output
+# path (top level, draft, v1, v2, ...) is a hardlink to its blob (a copy where
+# links aren't possible). A pixel index maps (pixel hash, format, encoder
+# profile) to the blob it encoded to, so a frame whose pixels were stored
+# before is linked without being encoded again. refs.json records which
+# output points at which blob; gc drops blobs nothing points at.
+#
+#   cd assets && python -m assetkit.store ingest things-are-moving-fast/v2 ...
+#   cd assets && python -m assetkit.store gc [--dry-run]
+#   cd assets && python -m assetkit.store ls
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from . import encode, instrument
+from .manifest import file_digest
+
+ASSETS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROOT = os.path.join(ASSETS_DIR, '.store')
+ASSET_EXTENSIONS = ('.png', '.svg', '.webp', '.avif', '.jpg', '.jpeg')
+
+
+def replace_file(path, data):
+    # write through a temporary file and rename, so an output that is a
+    # hardlink into the store is replaced instead of edited in place
+    mode = 'w' if isinstance(data, str) else 'wb'
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, mode) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def pixel_digest(img):
+    h = hashlib.sha256()
+    h.update(f'{img.mode} {img.width}x{img.height}\n'.encode('ascii'))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def pixel_key(digest, fmt, profile):
+    return hashlib.sha256(json.dumps([digest, fmt, profile.key()]).encode('utf-8')).hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.base = os.path.dirname(os.path.abspath(root))  # refs are relative to this
+        self.pixels = self._load('pixels.json')
+        self.refs = self._load('refs.json')
+
+    def _load(self, name):
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _dump(self, name, data):
+        os.makedirs(self.root, exist_ok=True)
+        replace_file(os.path.join(self.root, name), json.dumps(data, indent=2, sort_keys=True) + '\n')
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:])
+
+    def lookup(self, pkey):
+        # blob digest a frame with this pixel key was encoded to, if still stored
+        digest = self.pixels.get(pkey)
+        if digest is not None and os.path.exists(self.blob_path(digest)):
+            return digest
+        return None
+
+    def put(self, data, pkey=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            replace_file(path, data)
+            os.chmod(path, 0o444)
+        if pkey is not None:
+            self.pixels[pkey] = digest
+        return digest
+
+    def _ref(self, path):
+        return os.path.relpath(os.path.abspath(path), self.base)
+
+    def link(self, digest, path):
+        blob = self.blob_path(digest)
+        if os.path.exists(path) and os.path.samefile(blob, path):
+            self.refs[self._ref(path)] = digest
+            return path
+        tmp = f'{path}.tmp{os.getpid()}'
+        with instrument.stage('write'):
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                # other filesystem, or no hardlinks: fall back to a copy
+                with open(blob, 'rb') as src:
+                    replace_file(tmp, src.read())
+            os.replace(tmp, path)
+        self.refs[self._ref(path)] = digest
+        return path
+
+    def size(self, digest):
+        return os.path.getsize(self.blob_path(digest))
+
+    def save(self):
+        self._dump('pixels.json', self.pixels)
+        self._dump('refs.json', self.refs)
+
+    def ingest(self, path):
+        # an existing output file moves into the store and becomes a link
+        with open(path, 'rb') as f:
+            digest = self.put(f.read())
+        self.link(digest, path)
+        return digest
+
+    def _is_live(self, ref, digest):
+        path = os.path.join(self.base, ref)
+        if not os.path.exists(path):
+            return False
+        blob = self.blob_path(digest)
+        if os.path.exists(blob) and os.path.samefile(blob, path):
+            return True
+        # copies, or a file rewritten since it was linked
+        return file_digest(path) == digest
+
+    def gc(self, dry_run=False):
+        # drop refs whose output is gone or was replaced, then every blob no
+        # ref points at; returns the removed blob digests
+        self.refs = {ref: d for ref, d in self.refs.items() if self._is_live(ref, d)}
+        live = set(self.refs.values())
+        removed = []
+        objects = os.path.join(self.root, 'objects')
+        for dirpath, _, files in os.walk(objects):
+            for name in files:
+                digest = os.path.basename(dirpath) + name
+                if digest in live:
+                    continue
+                removed.append(digest)
+                if not dry_run:
+                    os.remove(os.path.join(dirpath, name))
+        gone = set(removed)
+        self.pixels = {k: d for k, d in self.pixels.items() if d not in gone}
+        if not dry_run:
+            self.save()
+        return removed
+
+
+def encode_outputs(store, img, name, profile=encode.PROFILES['default'], pixels=None):
+    # [(file name, pixel key, data or None, digest or None)] for the PNG and
+    # its siblings: data is None where the store already holds the encoding
+    if pixels is None:
+        with instrument.stage('hash'):
+            pixels = pixel_digest(img)
+    files = []
+    for fname, fmt in encode.output_names(name, profile):
+        pkey = pixel_key(pixels, fmt, profile)
+        digest = store.lookup(pkey)
+        if digest is not None:
+            files.append((fname, pkey, None, digest))
+            continue
+        with instrument.stage('encode'):
+            data = encode.encode_format(img, fmt, profile)
+        if data is not None:
+            files.append((fname, pkey, data, None))
+    return files
+
+
+def store_outputs(store, files, out_dir):
+    # put the new encodings, link every output; [(file name, size)]
+    written = []
+    for fname, pkey, data, digest in files:
+        if digest is None:
+            digest = store.put(data, pkey)
+        store.link(digest, os.path.join(out_dir, fname))
+        written.append((fname, store.size(digest)))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m assetkit.store',
+                                     description='Manage the content-addressed asset store.')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='store directory')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help='move existing outputs into the store as hardlinks')
+    ingest.add_argument('paths', nargs='+', help='asset files or directories (searched recursively)')
+    gc = sub.add_parser('gc', help='remove blobs no output refers to')
+    gc.add_argument('--dry-run', action='store_true', help='only list what would be removed')
+    sub.add_parser('ls', help='list outputs and the blobs they point at')
+    args = parser.parse_args(argv)
+    store = BlobStore(args.root)
+
+    if args.command == 'ingest':
+        paths = []
+        for p in args.paths:
+            if os.path.isdir(p):
+                for dirpath, _, files in os.walk(p):
+                    paths += [os.path.join(dirpath, f) for f in sorted(files)]
+            else:
+                paths.append(p)
+        before = len({d for d in store.refs.values()})
+        for path in paths:
+            if path.lower().endswith(ASSET_EXTENSIONS) and not os.path.islink(path):
+                print('STORED', path, store.ingest(path)[:12])
+        store.save()
+        blobs = len(set(store.refs.values()))
+        print(f'{len(store.refs)} outputs -> {blobs} blobs ({blobs - before} new)')
+    elif args.command == 'gc':
+        removed = store.gc(args.dry_run)
+        for digest in removed:
+            print('REMOVE' if not args.dry_run else 'WOULD REMOVE', digest)
+        print(f'{len(removed)} unreferenced blobs')
+    elif args.command == 'ls':
+        for ref, digest in sorted(store.refs.items()):
+            print(f'{digest[:12]}  {store.size(digest):>9}  {ref}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# structured SVG writer: the scene's SVG emitter adds elements to an
+# SvgDocument, which serializes them once the whole figure is known.
+# Presentation attributes shared by several elements become one CSS class,
+# shapes that repeat up to a translation become one <symbol> placed with
+# <use>, numbers are rounded to `precision` decimals, and text and attribute
+# values are escaped. A <use> carries both href and xlink:href, for
+# renderers that predate SVG 2. minify drops the indentation and line breaks; svgz()
+# gzips the result reproducibly
+import gzip
+from xml.sax.saxutils import escape, quoteattr
+
+# what a shape's position is made of, which <use x y> can take over
+TRANSLATION = {
+    'rect': ('x', 'y'),
+    'circle': ('cx', 'cy'),
+    'ellipse': ('cx', 'cy'),
+    'polyline': 'points',
+    'polygon': 'points',
+}
+# presentation attributes that need a unit once they move into CSS
+CSS_UNITS = {'font-size': 'px', 'stroke-width': 'px'}
+XLINK = 'http://www.w3.org/1999/xlink'
+
+
+class Element:
+    __slots__ = ('tag', 'attrs', 'style', 'text', 'children')
+
+    def __init__(self, tag, attrs=None, style=None, text=None, children=()):
+        self.tag = tag
+        self.attrs = attrs or {}   # geometry, ids, references
+        self.style = style or {}   # presentation attributes, may become a class
+        self.text = text           # unescaped
+        self.children = list(children)
+
+
+def class_name(i):
+    # a, b, ..., z, aa, ab, ...
+    name = ''
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        name = chr(ord('a') + r) + name
+    return name
+
+
+def svgz(markup):
+    # mtime=0 keeps the bytes identical between builds
+    return gzip.compress(markup.encode('utf-8'), compresslevel=9, mtime=0)
+
+
+class SvgDocument:
+    def __init__(self, width, height, attrs=None, precision=2):
+        self.precision = precision
+        self.root = Element('svg', {'width': width, 'height': height, 'viewBox': f'0 0 {width} {height}',
+                                    'xmlns': 'http://www.w3.org/2000/svg', **(attrs or {})})
+        self.defs = []
+        self.stack = [self.root]
+
+    def add(self, tag, attrs=None, style=None, text=None, children=()):
+        element = Element(tag, attrs, style, text, children)
+        self.stack[-1].children.append(element)
+        return element
+
+    def open(self, tag, attrs=None, style=None):
+        self.stack.append(self.add(tag, attrs, style))
+
+    def close(self):
+        self.stack.pop()
+
+    def define(self, element):
+        # gradients and the like, referenced by id
+        self.defs.append(element)
+
+    def num(self, v):
+        if isinstance(v, int):
+            return str(v)
+        s = f'{v:.{self.precision}f}'.rstrip('0').rstrip('.')
+        return '0' if s == '-0' else s
+
+    def value(self, v):
+        if isinstance(v, (int, float)):
+            return self.num(v)
+        if isinstance(v, (list, tuple)):
+            return ' '.join(f'{self.num(x)},{self.num(y)}' for x, y in v)
+        return str(v)
+
+    def walk(self, elements):
+        for element in elements:
+            yield element
+            yield from self.walk(element.children)
+
+    def style_key(self, element):
+        return tuple(sorted((k, self.value(v)) for k, v in element.style.items()))
+
+    def placement(self, element):
+        # (shape key without its position, (dx, dy)) or None
+        where = TRANSLATION.get(element.tag)
+        if where is None or element.text is not None or element.children:
+            return None
+        attrs = dict(element.attrs)
+        if where == 'points':
+            points = attrs.pop('points')
+            dx, dy = points[0]
+            attrs['points'] = [(x - dx, y - dy) for x, y in points]
+        else:
+            dx, dy = attrs.pop(where[0], 0), attrs.pop(where[1], 0)
+        shape = tuple(sorted((k, self.value(v)) for k, v in attrs.items()))
+        return (element.tag, shape, self.style_key(element)), (dx, dy)
+
+    def plan(self):
+        # symbols for repeated shapes, then classes for the styles repeated
+        # among what is left to write (a symbol's shape is written once)
+        shapes = {}
+        for element in self.walk(self.root.children):
+            placed = self.placement(element)
+            if placed is not None:
+                shapes.setdefault(placed[0], []).append(element)
+        symbols = {}
+        for key, elements in shapes.items():
+            if len(elements) > 1:
+                symbols[key] = (f'u{len(symbols)}', elements[0])
+
+        styles = {}
+        written = [e for e in self.walk(self.root.children + self.defs)
+                   if e.style and (self.placement(e) or (None,))[0] not in symbols]
+        for element in written + [e for _, e in symbols.values()]:
+            key = self.style_key(element)
+            styles[key] = styles.get(key, 0) + 1
+        repeated = sorted((k for k, n in styles.items() if n > 1), key=lambda k: (-styles[k], k))
+        classes = {key: class_name(i) for i, key in enumerate(repeated)}
+        return classes, symbols
+
+    def head(self, element, classes, attrs=None):
+        # tag and attributes, the style as a class when it has one
+        attrs = dict(element.attrs if attrs is None else attrs)
+        if element.style:
+            cls = classes.get(self.style_key(element))
+            if cls is not None:
+                attrs['class'] = cls
+            else:
+                attrs.update(element.style)
+        return element.tag + ''.join(f' {k}={quoteattr(self.value(v))}' for k, v in attrs.items())
+
+    def markup(self, element, classes, symbols, depth, out, indent):
+        pad = indent * depth
+        placed = self.placement(element) if symbols else None
+        if placed is not None and placed[0] in symbols:
+            dx, dy = placed[1]
+            ref = '#' + symbols[placed[0]][0]
+            use = Element('use', {'href': ref, 'xlink:href': ref})
+            for k, v in (('x', dx), ('y', dy)):
+                if v:
+                    use.attrs[k] = v
+            out.append(f'{pad}<{self.head(use, classes)}/>')
+            return
+        head = self.head(element, classes)
+        if element.text is None and not element.children:
+            out.append(f'{pad}<{head}/>')
+        elif not element.children:
+            out.append(f'{pad}<{head}>{escape(element.text)}</{element.tag}>')
+        elif element.tag == 'text':
+            # tspans stay on the text's line, whitespace there would render
+            inner = []
+            for child in element.children:
+                self.markup(child, classes, {}, 0, inner, '')
+            out.append(f'{pad}<{head}>{"".join(inner)}</{element.tag}>')
+        else:
+            out.append(f'{pad}<{head}>')
+            for child in element.children:
+                self.markup(child, classes, symbols, depth + 1, out, indent)
+            out.append(f'{pad}</{element.tag}>')
+
+    def serialize(self, minify=False):
+        indent = '' if minify else '  '
+        classes, symbols = self.plan()
+        root = dict(self.root.attrs, **({'xmlns:xlink': XLINK} if symbols else {}))
+        out = [f'<{self.head(self.root, classes, root)}>']
+        if classes:
+            rules = []
+            for key, name in classes.items():
+                decls = ';'.join(f'{k}:{v}{CSS_UNITS.get(k, "") if v.replace(".", "").isdigit() else ""}'
+                                 for k, v in key)
+                rules.append(f'.{name}{{{decls}}}')
+            out.append(f'{indent}<style>{"".join(rules)}</style>')
+        if self.defs or symbols:
+            out.append(f'{indent}<defs>')
+            for element in self.defs:
+                self.markup(element, classes, {}, 2, out, indent)
+            for sid, element in symbols.values():
+                # the first occurrence, moved to the origin
+                where = TRANSLATION[element.tag]
+                attrs = dict(element.attrs)
+                if where == 'points':
+                    dx, dy = attrs['points'][0]
+                    attrs['points'] = [(x - dx, y - dy) for x, y in attrs['points']]
+                else:
+                    attrs.pop(where[0], None)
+                    attrs.pop(where[1], None)
+                out.append(f'{indent * 2}<symbol id="{sid}" overflow="visible">')
+                out.append(f'{indent * 3}<{self.head(element, classes, attrs)}/>')
+                out.append(f'{indent * 2}</symbol>')
+            out.append(f'{indent}</defs>')
+        for element in self.root.children:
+            self.markup(element, classes, symbols, 1, out, indent)
+        out.append('</svg>')
+        return ('' if minify else '\n').join(out) + '\n'
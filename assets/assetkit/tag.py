@@ -0,0 +1,57 @@
+# "Beto Dias" tag / watermark: the tag is rasterised once per (text, font,
+# size, colour, background) into a small sprite and only that sprite's
+# bounding box is composited, so the overlay no longer allocates and blends
+# a full-canvas layer per asset. Cards stamp a tag per row and scale, so the
+# sprites are kept in an LRU, least recently used dropped past MAXSIZE
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+from . import canvas, instrument, textlayout
+from .fonts import font_key
+
+MAXSIZE = 64
+
+_sprites = OrderedDict()
+
+
+def tag_sprite(text, font, fill, background=None, pad=(0, 0), radius=0):
+    # (sprite, (dx, dy)): dx/dy place the sprite's top-left relative to the
+    # point the text would be drawn at with ImageDraw.text. Sizes are in
+    # device pixels, i.e. the font and padding are already scaled.
+    key = (text, font_key(font), tuple(fill), background and tuple(background), tuple(pad), radius)
+    cached = _sprites.get(key)
+    if cached is not None:
+        _sprites.move_to_end(key)
+        return cached
+    l, t, r, b = textlayout.measure(font, text).bbox
+    if background is None:
+        dx, dy = l, t
+        w, h = r - l, b - t
+    else:
+        px, py = pad
+        dx, dy = -px, -py
+        w, h = r + 2*px + 1, b + 2*py + 1
+    sprite = Image.new('RGBA', (max(w, 1), max(h, 1)), (0, 0, 0, 0))
+    d = ImageDraw.Draw(sprite)
+    if background is not None:
+        d.rounded_rectangle([0, 0, w-1, h-1], radius=radius, fill=background)
+    d.text((-dx, -dy), text, font=font, fill=fill)
+    _sprites[key] = (sprite, (dx, dy))
+    if len(_sprites) > MAXSIZE:
+        _sprites.popitem(last=False)
+    return sprite, (dx, dy)
+
+
+def stamp_tag(img, xy, text, font, fill, background=None, pad=(0, 0), radius=0):
+    with instrument.stage('tag'):
+        sprite, (dx, dy) = tag_sprite(text, font, fill, background, pad, radius)
+        canvas.stamp(img, sprite, (round(xy[0]) + dx, round(xy[1]) + dy))
+
+
+def cache_size():
+    return len(_sprites)
+
+
+def clear_cache():
+    _sprites.clear()
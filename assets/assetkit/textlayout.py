@@ -0,0 +1,179 @@
+# text layout: strings are measured once per (font, size, text) and the
+# metrics kept in a bounded LRU, so wrapping a label into a box, ellipsizing
+# it or stepping its size down until it fits costs dictionary lookups after
+# the first pass. layout() returns line boxes in the font's pixel units that
+# the raster and SVG emitters both draw from
+from collections import OrderedDict, namedtuple
+
+from .fonts import font_key
+
+DEFAULT_MAXSIZE = 4096
+ELLIPSIS = '…'
+
+Metrics = namedtuple('Metrics', 'advance bbox')
+# x, y: offset of the line's top-left from the layout origin
+LineBox = namedtuple('LineBox', 'text x y width height')
+TextLayout = namedtuple('TextLayout', 'lines width height size truncated')
+
+
+class MetricsCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, font, text, bbox):
+        # wrapping only needs advances, so the bbox (the costlier call) is
+        # filled in the first time something asks for it
+        key = (font_key(font), text)
+        metrics = self.cache.get(key)
+        if metrics is not None and (metrics.bbox is not None or not bbox):
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return metrics
+        self.misses += 1
+        advance = font.getlength(text) if metrics is None else metrics.advance
+        metrics = Metrics(advance, font.getbbox(text) if bbox else None)
+        self.cache[key] = metrics
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return metrics
+
+    def measure(self, font, text):
+        return self._lookup(font, text, True)
+
+    def advance(self, font, text):
+        return self._lookup(font, text, False).advance
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cached': len(self.cache)}
+
+    def clear(self):
+        self.cache.clear()
+
+
+cache = MetricsCache()
+
+
+def measure(font, text):
+    return cache.measure(font, text)
+
+
+def text_width(font, text):
+    return cache.advance(font, text)
+
+
+def line_height(font, spacing=4):
+    # distance between baselines, as ImageDraw.multiline_text spaces lines
+    return measure(font, 'A').bbox[3] + spacing
+
+
+def _break_word(word, font, width):
+    # a word wider than the box is split at characters
+    parts = []
+    while word:
+        n = len(word)
+        while n > 1 and text_width(font, word[:n]) > width:
+            n -= 1
+        parts.append(word[:n])
+        word = word[n:]
+    return parts
+
+
+def wrap(text, font, width, max_lines=None):
+    # greedy word wrap; '\n' still forces a break. With max_lines it stops
+    # at one line past that, which is all a caller cutting there looks at
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        for word in paragraph.split():
+            candidate = f'{line} {word}' if line else word
+            if text_width(font, candidate) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            if text_width(font, word) <= width:
+                line = word
+            else:
+                *head, line = _break_word(word, font, width)
+                lines.extend(head)
+            if max_lines is not None and len(lines) > max_lines:
+                return lines
+        lines.append(line)
+    return lines
+
+
+def ellipsize(text, font, width, ellipsis=ELLIPSIS, force=False):
+    # text cut so that it plus the ellipsis fits width; force adds the
+    # ellipsis even when the text fits (it was cut somewhere else)
+    if not force and text_width(font, text) <= width:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if text_width(font, text[:mid].rstrip() + ellipsis) <= width:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + ellipsis
+
+
+def _lines(text, font, width, height, spacing, max_lines):
+    # (lines, line limit or None); the lines may stop one past the limit
+    limit = max_lines
+    if height is not None:
+        fitting = max(1, (height + spacing) // line_height(font, spacing))
+        limit = fitting if limit is None else min(limit, fitting)
+    lines = wrap(text, font, width, limit) if width is not None else text.split('\n')
+    return lines, limit
+
+
+def layout(text, font, width=None, height=None, align='left', spacing=4, max_lines=None,
+           ellipsis=ELLIPSIS):
+    # width wraps (None keeps the given lines), height and max_lines cap the
+    # line count and ellipsize the last line that is kept
+    step = line_height(font, spacing)
+    lines, limit = _lines(text, font, width, height, spacing, max_lines)
+    truncated = limit is not None and len(lines) > limit
+    if truncated:
+        lines = lines[:limit]
+        last_width = width if width is not None else text_width(font, lines[-1])
+        lines[-1] = ellipsize(lines[-1], font, last_width, ellipsis, force=True)
+    widths = [text_width(font, line) for line in lines]
+    box_width = width if width is not None else max(widths)
+    boxes = []
+    for i, (line, w) in enumerate(zip(lines, widths)):
+        if align == 'center':
+            x = (box_width - w) / 2
+        elif align == 'right':
+            x = box_width - w
+        else:
+            x = 0
+        boxes.append(LineBox(line, x, i * step, w, step - spacing))
+    return TextLayout(boxes, box_width, len(lines) * step - spacing,
+                      getattr(font, 'size', None), truncated)
+
+
+def fit(text, font_for_size, size, width=None, height=None, min_size=None, **kwargs):
+    # the largest size from size down to min_size whose layout is not
+    # truncated; below that the min_size layout, ellipsized. The larger
+    # sizes are only wrapped far enough to see that they truncate
+    min_size = size if min_size is None else min_size
+    spacing, max_lines = kwargs.get('spacing', 4), kwargs.get('max_lines')
+    for s in range(size, min_size - 1, -1):
+        font = font_for_size(s)
+        lines, limit = _lines(text, font, width, height, spacing, max_lines)
+        if limit is None or len(lines) <= limit:
+            break
+    return layout(text, font, width, height, **kwargs)
+
+
+def draw_layout(draw, xy, box, font, fill):
+    # draw through ImageDraw or ScaledDraw; font is sized for the canvas,
+    # the layout and xy are in the draw's own coordinates
+    x, y = xy
+    for line in box.lines:
+        draw.text((x + line.x, y + line.y), line.text, font=font, fill=fill)
@@ -0,0 +1,109 @@
+# tiled, bounded-memory rendering for large print / social exports (4x, 8x):
+# the frame is painted one horizontal strip at a time onto a small canvas
+# whose Viewport places it inside the full frame, and each strip's rows go
+# straight into a streaming PNG writer. Peak memory is one strip plus the
+# zlib window, whatever the output size
+import os
+import struct
+import zlib
+
+from . import canvas, instrument
+from .hidpi import Viewport
+
+DEFAULT_TILE_HEIGHT = 256
+
+_COLOR_TYPES = {'L': (0, 1), 'RGB': (2, 3), 'LA': (4, 2), 'RGBA': (6, 4)}
+
+
+class PngWriter:
+    # minimal streaming PNG encoder: 8-bit samples, filter type 0 on every
+    # row, one zlib stream split over IDAT chunks as it fills. The file is
+    # written beside path and renamed over it once complete
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, path, size, mode='RGBA', compress_level=6):
+        if mode not in _COLOR_TYPES:
+            raise ValueError(f'unsupported mode {mode!r}')
+        self.width, self.height = size
+        color_type, self.channels = _COLOR_TYPES[mode]
+        self.stride = self.width * self.channels
+        self.rows = 0
+        self.pending = []
+        self.pending_size = 0
+        self.zlib = zlib.compressobj(compress_level)
+        self.path = path
+        self.tmp = f'{path}.tmp{os.getpid()}'
+        self.f = open(self.tmp, 'wb')
+        self.f.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, color_type, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self.f.write(struct.pack('>I', len(data)))
+        self.f.write(kind)
+        self.f.write(data)
+        self.f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+    def _emit(self, data):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+        if self.pending_size >= self.CHUNK_SIZE:
+            self._chunk(b'IDAT', b''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def write_rows(self, data):
+        # data: raw rows (Image.tobytes() of a full-width strip)
+        n = len(data) // self.stride
+        if self.rows + n > self.height:
+            raise ValueError('more rows than the image height')
+        stride = self.stride
+        raw = b''.join(b'\x00' + data[i*stride:(i+1)*stride] for i in range(n))
+        self._emit(self.zlib.compress(raw))
+        self.rows += n
+
+    def close(self):
+        if self.f.closed:
+            return
+        try:
+            if self.rows != self.height:
+                raise ValueError(f'wrote {self.rows} of {self.height} rows')
+            self.pending.append(self.zlib.flush())
+            self._chunk(b'IDAT', b''.join(self.pending))
+            self._chunk(b'IEND', b'')
+        except BaseException:
+            self.abort()
+            raise
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def render_tiled(path, size, background, paint, tile_height=DEFAULT_TILE_HEIGHT,
+                 mode=None, compress_level=6):
+    # size is the full frame in device pixels; paint(canvas, viewport) draws
+    # whatever part of the figure falls on the strip
+    width, height = size
+    mode = mode or canvas.canvas_mode(background)
+    with PngWriter(path, size, mode, compress_level) as png:
+        for top in range(0, height, tile_height):
+            h = min(tile_height, height - top)
+            strip = instrument.new_image(mode, (width, h), background)
+            with instrument.stage('draw'):
+                paint(strip, Viewport(0, top, width, height))
+            with instrument.stage('encode'):
+                png.write_rows(strip.tobytes())
+    return path
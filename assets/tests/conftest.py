@@ -0,0 +1,6 @@
+# the tests run from assets/ (python -m pytest tests); assetkit is imported
+# from there, as the generator scripts do
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,99 @@
+# the array patterns: gradients end on their colours, noise and dust are
+# the same for a seed on every run and every tile, stripes and glows cover
+# what they should
+import numpy as np
+import pytest
+from PIL import Image
+
+from assetkit import backgrounds
+from assetkit.hidpi import Viewport
+
+BG = (11, 15, 26)
+CYAN = (0, 229, 255)
+CORAL = (255, 107, 107)
+
+
+def test_linear_gradient_ends_on_its_colours():
+    x, y = backgrounds.grid((0, 0, 201, 3))
+    rgba = backgrounds.linear_gradient(x, y, (50, 0), (150, 0), (BG, CYAN, CORAL))
+    assert rgba.shape == (3, 201, 4)
+    assert tuple(rgba[1, 50]) == BG + (255,)
+    assert tuple(rgba[1, 100]) == CYAN + (255,)
+    assert tuple(rgba[1, 150]) == CORAL + (255,)
+    # held beyond either end
+    assert tuple(rgba[1, 0]) == BG + (255,) and tuple(rgba[1, 200]) == CORAL + (255,)
+
+
+def test_axis_aligned_gradient_is_stretched_from_one_column():
+    x, y = backgrounds.grid((0, 0, 40, 30), scale=2)
+    rgba = backgrounds.linear_gradient(x, y, (0, 0), (0, 14), (BG + (255,), CYAN + (128,)))
+    assert rgba.strides[1] == 0
+    img = backgrounds.to_image(rgba)
+    assert img.size == (40, 30)
+    assert np.array_equal(np.asarray(img), np.ascontiguousarray(rgba))
+    assert img.getpixel((7, 0)) == BG + (255,) and img.getpixel((39, 29)) == CYAN + (128,)
+
+
+def test_radial_gradient_and_glow_fall_off_from_the_centre():
+    x, y = backgrounds.grid((0, 0, 101, 101))
+    rgba = backgrounds.radial_gradient(x, y, (50, 50), 40, (CYAN, BG))
+    assert tuple(rgba[50, 50]) == CYAN + (255,)
+    assert tuple(rgba[50, 90]) == BG + (255,) and tuple(rgba[0, 0]) == BG + (255,)
+    coverage = backgrounds.glow(x, y, (50, 50), 40)
+    assert coverage[50, 50] == 1
+    assert coverage[50, 60] > coverage[50, 70] > 0
+    assert coverage[50, 91] == 0 and coverage[0, 0] == 0
+
+
+def test_noise_is_seeded_and_agrees_across_tiles():
+    box = (0, 0, 64, 48)
+    a = backgrounds.noise(box, seed=3)
+    assert np.array_equal(a, backgrounds.noise(box, seed=3))
+    assert not np.array_equal(a, backgrounds.noise(box, seed=4))
+    assert 0 <= a.min() and a.max() < 1 and 0.4 < a.mean() < 0.6
+    # a strip of the frame, painted on its own canvas
+    strip = backgrounds.noise((0, 0, 64, 16), seed=3, viewport=Viewport(0, 20, 64, 48))
+    assert np.array_equal(strip, a[20:36])
+
+
+def test_specks_are_seeded_sparse_and_agree_across_tiles():
+    box = (0, 0, 400, 300)
+    xs, ys = backgrounds.specks(box, 0.01, seed=7)
+    assert (xs, ys) == backgrounds.specks(box, 0.01, seed=7)
+    assert (xs, ys) != backgrounds.specks(box, 0.01, seed=8)
+    assert len(xs) == (400 // 10) * (300 // 10)
+    assert all(0 <= x < 400 for x in xs) and all(0 <= y < 300 for y in ys)
+    frame = set(zip(xs, ys))
+    txs, tys = backgrounds.specks((0, 0, 400, 64), 0.01, seed=7, viewport=Viewport(0, 128, 400, 300))
+    assert {(x, y + 128) for x, y in zip(txs, tys)} == {(x, y) for x, y in frame if 128 <= y < 192}
+
+
+@pytest.mark.parametrize('scale', [1, 2])
+def test_stripes_cover_their_lines_only(scale):
+    # vertical stripes 2 px wide at x = 10, 30, 50
+    x, y = backgrounds.grid((0, 0, 60 * scale, 20 * scale), scale)
+    coverage = backgrounds.stripes(x, y, 10, 60, 20, 0, 0, 20, 2, scale)
+    assert coverage.shape == (20 * scale, 60 * scale)
+    row = coverage[5]
+    for s in (10, 30, 50):
+        assert row[s * scale] == 1
+    assert row[20 * scale] == 0 and row[0] == 0
+    assert np.array_equal(coverage[0], coverage[-1])
+
+
+def test_stripes_match_the_dense_distance():
+    # the sparse scatter against the coverage measured at every pixel
+    x, y = backgrounds.grid((0, 0, 300, 90))
+    coverage = backgrounds.stripes(x, y, -100, 400, 40, -90, 0, 90, 2)
+    slope = -1.0
+    v = x - y * slope + 100
+    k = np.clip(np.rint(v / 40), 0, len(range(-100, 400, 40)) - 1)
+    dense = np.clip(1.5 - np.abs(v - k * 40) / np.hypot(1, slope), 0, 1)
+    assert np.allclose(coverage, dense, atol=1e-5)
+
+
+def test_paint_blends_through_the_coverage():
+    img = Image.new('RGB', (4, 1), BG)
+    backgrounds.paint(img, (0, 0, 4, 1), CYAN + (128,), np.array([[0, 0.5, 1, 1]], dtype=np.float32))
+    assert img.getpixel((0, 0)) == BG
+    assert img.getpixel((2, 0)) == img.getpixel((3, 0)) != img.getpixel((1, 0)) != BG
@@ -0,0 +1,87 @@
+# compare() on synthetic results: timings are in calibration units with
+# their run-to-run noise, so no figure is rendered here
+import math
+
+from assetkit import bench
+
+
+def case(units, noise=0.01, calibration_ms=10.0, peak=50 << 20, output=100_000):
+    r = {'calibration_ms': calibration_ms, 'peak_bytes': peak, 'output_bytes': output}
+    for metric in bench.TIMINGS:
+        r[f'{metric}_units'] = units
+        r[f'{metric}_noise'] = noise
+        r[f'{metric}_ms'] = units * calibration_ms
+    return r
+
+
+def cases(n, **kw):
+    return {f'fig{i}@1x': case(**kw) for i in range(n)}
+
+
+def test_units_takes_the_median_ratio():
+    med, noise = bench.units([10, 20, 30, 400], [10, 10, 10, 10])
+    assert med == 2.5 and noise > 0
+    assert bench.units([5, 10], [5, 10]) == (1.0, 0.0)
+
+
+def test_unchanged_results_pass():
+    base = cases(6, units=2.0)
+    assert bench.compare(base, base) == []
+    assert bench.drift(base, base) == 0.0
+
+
+def test_host_speed_is_taken_out():
+    # twice as slow a host: raw ms double, calibration units don't
+    base = cases(6, units=2.0)
+    slow = cases(6, units=2.0, calibration_ms=20.0)
+    assert bench.compare(slow, base) == []
+
+
+def test_growth_past_threshold_and_noise_regresses():
+    base = cases(6, units=2.0)
+    results = cases(6, units=2.0)
+    results['fig0@1x'] = case(units=3.0)
+    regressions = bench.compare(results, base)
+    assert {(key, metric) for key, metric, *_ in regressions} == {
+        ('fig0@1x', 'wall_ms'), ('fig0@1x', 'draw_ms'), ('fig0@1x', 'encode_ms')}
+    key, metric, old, new, band = regressions[0]
+    assert (old, new) == (20.0, 30.0) and band > 0
+
+
+def test_growth_within_the_noise_band_passes():
+    # +40% on a case whose medians are this noisy is not a finding
+    base = {'fig@1x': case(units=2.0, noise=0.2)}
+    assert bench.compare({'fig@1x': case(units=2.8, noise=0.2)}, base) == []
+    assert bench.compare({'fig@1x': case(units=2.8, noise=0.01)}, {'fig@1x': case(units=2.0, noise=0.01)})
+
+
+def test_small_absolute_growth_passes():
+    base = {'fig@1x': case(units=0.05)}
+    assert bench.compare({'fig@1x': case(units=0.1)}, base) == []
+
+
+def test_drift_widens_the_band():
+    # every case moved by up to ±20% between sessions: +30% on one is noise
+    base = cases(6, units=2.0)
+    results = {key: case(units=2.0 * f) for key, f in zip(base, (0.8, 0.9, 1.0, 1.1, 1.2, 1.3))}
+    assert bench.drift(results, base) > math.log(1.1)
+    assert bench.compare(results, base) == []
+
+
+def test_drift_needs_enough_samples():
+    base = {'fig@1x': case(units=2.0)}
+    assert bench.drift({'fig@1x': case(units=3.0)}, base) == 0.0
+
+
+def test_memory_and_size_regressions():
+    base = {'fig@1x': case(units=2.0)}
+    assert bench.compare({'fig@1x': case(units=2.0, peak=(50 << 20) + (1 << 19))}, base) == []
+    grown = bench.compare({'fig@1x': case(units=2.0, peak=80 << 20, output=200_000)}, base)
+    assert [metric for _, metric, *_ in grown] == ['peak_bytes', 'output_bytes']
+
+
+def test_baseline_without_calibrated_timings_compares_sizes():
+    old = {'fig@1x': {'wall_ms': 1.0, 'draw_ms': 1.0, 'encode_ms': 1.0,
+                      'peak_bytes': 50 << 20, 'output_bytes': 100_000}}
+    assert bench.compare({'fig@1x': case(units=9.0)}, old) == []
+    assert bench.compare({'fig@1x': case(units=9.0, output=200_000)}, old)[0][1] == 'output_bytes'
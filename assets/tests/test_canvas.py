@@ -0,0 +1,76 @@
+# colour-mode-aware canvases: an opaque background gives an RGB canvas, and
+# translucent inks, sprites and composites blend on it as they would on an
+# opaque RGBA canvas instead of being written raw
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from assetkit import canvas
+
+BG = (11, 15, 26)
+CYAN = (0, 229, 255)
+
+
+def close(a, b, tolerance=1):
+    # Pillow rounds the RGB blend and the RGBA composite differently by a level
+    diff = [abs(u - v) for u, v in zip(a.convert('RGB').tobytes(), b.convert('RGB').tobytes())]
+    return max(diff) <= tolerance
+
+
+def sprite(size=(30, 20), seed=0):
+    rng = random.Random(seed)
+    img = Image.new('RGBA', size)
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256), rng.choice((0, 40, 128, 255)))
+                 for _ in range(size[0] * size[1])])
+    return img
+
+
+def test_canvas_mode_follows_the_background():
+    assert canvas.canvas_mode(BG) == 'RGB' and canvas.canvas_mode(BG + (255,)) == 'RGB'
+    assert canvas.canvas_mode(BG + (128,)) == 'RGBA' and canvas.canvas_mode(None) == 'RGBA'
+    img = canvas.new_canvas((4, 3), BG + (255,))
+    assert img.mode == 'RGB' and img.getpixel((0, 0)) == BG
+
+
+@pytest.mark.parametrize('alpha', [0, 1, 64, 128, 254, 255])
+def test_translucent_ink_blends_into_an_rgb_canvas(alpha):
+    rgb = canvas.new_canvas((40, 30), BG)
+    canvas.draw(rgb).rectangle([5, 5, 30, 20], fill=CYAN + (alpha,))
+    rgba = Image.new('RGBA', (40, 30), BG + (255,))
+    layer = Image.new('RGBA', rgba.size, (0, 0, 0, 0))
+    ImageDraw.Draw(layer).rectangle([5, 5, 30, 20], fill=CYAN + (alpha,))
+    rgba.alpha_composite(layer)
+    assert close(rgb, rgba)
+    if alpha == 0:
+        assert rgb.getpixel((10, 10)) == BG
+    if alpha == 255:
+        assert rgb.getpixel((10, 10)) == CYAN
+
+
+def test_draw_writes_raw_on_an_rgba_canvas():
+    img = canvas.new_canvas((4, 4), None)
+    canvas.draw(img).point((1, 1), fill=CYAN + (40,))
+    assert img.getpixel((1, 1)) == CYAN + (40,)
+
+
+@pytest.mark.parametrize('box', [None, (5, 2, 25, 18)])
+def test_composite_matches_on_both_canvases(box):
+    src = sprite()
+    rgb = canvas.new_canvas((50, 40), BG)
+    rgba = Image.new('RGBA', (50, 40), BG + (255,))
+    canvas.composite(rgb, src, (7, 9), box)
+    canvas.composite(rgba, src, (7, 9), box)
+    assert rgba.mode == 'RGBA' and close(rgb, rgba)
+
+
+@pytest.mark.parametrize('xy', [(-10, -5), (35, 30), (-40, 0), (10, 10)])
+def test_stamp_clips_to_the_canvas(xy):
+    src = sprite()
+    img = canvas.new_canvas((50, 40), BG)
+    canvas.stamp(img, src, xy)
+    # the same sprite over a canvas large enough to hold it, cropped back
+    pad = 50
+    big = canvas.new_canvas((50 + 2 * pad, 40 + 2 * pad), BG)
+    canvas.composite(big, src, (xy[0] + pad, xy[1] + pad))
+    assert img.tobytes() == big.crop((pad, pad, pad + 50, pad + 40)).tobytes()
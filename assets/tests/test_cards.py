@@ -0,0 +1,123 @@
+# feeds and rows: a bad, duplicate or unsafe row is reported against its
+# row number and never stops the batch or writes outside the output folder
+import json
+
+import pytest
+from PIL import Image
+
+from assetkit import cards, encode
+from assetkit.cards import LIST, PAIRS, CardError, Field, Template
+
+TEMPLATES = {
+    'gen/cover': Template(lambda scale, title, subtitle: Image.new('RGB', (4 * scale, 2 * scale)),
+                          title=Field(), subtitle=Field(default='')),
+    'gen/list': Template(lambda scale, items: Image.new('RGB', (4 * scale, 2 * scale)),
+                         items=Field(LIST, min_items=1, max_items=2)),
+    'gen/metrics': Template(lambda scale, metrics: Image.new('RGB', (4 * scale, 2 * scale)),
+                            metrics=Field(PAIRS, min_items=1)),
+}
+CODE = {'gen': ['code']}
+PROFILE = encode.PROFILES['dev']
+
+
+def plan(data, default_template=None, scales=(1,)):
+    return cards.plan_row(1, data, TEMPLATES, default_template, scales, PROFILE, CODE)
+
+
+def test_csv_rows_count_from_one_after_the_header(tmp_path):
+    path = tmp_path / 'feed.csv'
+    path.write_text('template,slug,items\n'
+                    'gen/list,a,one|two\n'
+                    'gen/list,b,one,extra\n')
+    (row_a, a), (row_b, b) = cards.read_feed(str(path))
+    assert (row_a, row_b) == (1, 2)
+    assert plan(a).values == {'items': ('one', 'two')}
+    with pytest.raises(CardError, match='more cells than columns'):
+        plan(b)
+
+
+def test_bad_json_lines_are_kept_as_row_errors(tmp_path):
+    path = tmp_path / 'feed.jsonl'
+    path.write_text('{"template": "gen/cover", "slug": "a", "title": "A"}\n'
+                    '\n'
+                    '{"slug": "b", \n'
+                    '["not", "an", "object"]\n')
+    rows = cards.read_feed(str(path))
+    assert [row for row, _ in rows] == [1, 2, 3]
+    assert rows[0][1]['slug'] == 'a'
+    assert isinstance(rows[1][1], CardError) and 'invalid JSON' in str(rows[1][1])
+    assert isinstance(rows[2][1], CardError) and 'expected an object' in str(rows[2][1])
+    with pytest.raises(CardError, match='invalid JSON'):
+        plan(rows[1][1])
+
+
+def test_json_feed_needs_a_list(tmp_path):
+    path = tmp_path / 'feed.json'
+    path.write_text(json.dumps({'cards': [{'slug': 'a'}]}))
+    assert cards.read_feed(str(path)) == [(1, {'slug': 'a'})]
+    path.write_text(json.dumps({'rows': []}))
+    with pytest.raises(CardError, match='expected a list'):
+        cards.read_feed(str(path))
+
+
+@pytest.mark.parametrize('slug', ['', '../up', 'a/b', '/abs', '.hidden', 'a b', 'a\\b', '..'])
+def test_unsafe_slugs_are_rejected(slug):
+    with pytest.raises(CardError, match='is not a file name'):
+        plan({'template': 'gen/cover', 'slug': slug, 'title': 'T'})
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'slug': 'a', 'title': 'T'}, 'no template'),
+    ({'template': 'gen/nope', 'slug': 'a'}, 'unknown template'),
+    ({'template': 'gen/cover', 'slug': 'a'}, 'title: missing'),
+    ({'template': 'gen/cover', 'slug': 'a', 'title': 'T', 'colour': 'red'}, r'unknown field\(s\): colour'),
+    ({'template': 'gen/cover', 'slug': 'a', 'title': ['T']}, 'expected text'),
+    ({'template': 'gen/list', 'slug': 'a', 'items': 'one|two|three'}, 'at most 2 fit'),
+    ({'template': 'gen/metrics', 'slug': 'a', 'metrics': 'fast'}, 'is not label=value'),
+])
+def test_bad_rows_are_rejected(data, message):
+    with pytest.raises(CardError, match=message):
+        plan(data)
+
+
+def test_rows_plan_outputs_and_digests():
+    card = plan({'slug': 'post-1', 'title': 'T', 'metrics': ''}, default_template='gen/cover', scales=(1, 2))
+    assert [name for name, _ in card.outputs] == ['post-1/cover.png', 'post-1/cover@2x.png']
+    other = plan({'slug': 'post-1', 'title': 'U'}, default_template='gen/cover', scales=(1, 2))
+    assert len(set(card.digests + other.digests)) == 4
+
+
+def run(tmp_path, rows, *args):
+    feed = tmp_path / 'feed.json'
+    feed.write_text(json.dumps(rows))
+    out = tmp_path / 'out'
+    status = cards.main([str(feed), '--out', str(out), '--profile', 'dev', *args])
+    report = json.loads((out / cards.REPORT_NAME).read_text())
+    return status, report, out
+
+
+def test_duplicate_and_bad_rows_are_reported_not_fatal(tmp_path):
+    rows = [{'template': 'playbook/cover', 'slug': 'a', 'title': 'First'},
+            {'template': 'playbook/cover', 'slug': 'a', 'title': 'Again'},
+            {'template': 'playbook/cover', 'slug': '../a', 'title': 'Escape'},
+            {'template': 'playbook/cover', 'slug': 'b', 'title': 'Second'}]
+    status, report, out = run(tmp_path, rows, '--encoders', '0')
+    assert status == 1
+    assert (report['rendered'], report['failed']) == (2, 2)
+    assert [(e['row'], e['error']) for e in report['errors']] == [
+        (2, 'same slug and template as row 1'),
+        (3, "slug '../a' is not a file name (letters, digits, . _ -)")]
+    assert sorted(p.name for p in out.iterdir() if p.is_dir()) == ['a', 'b']
+    assert not (tmp_path / 'a').exists()
+
+
+@pytest.mark.parametrize('encoders', ['0', '2'])
+def test_write_errors_fail_only_their_row(tmp_path, encoders):
+    (tmp_path / 'out').mkdir()
+    (tmp_path / 'out' / 'b').write_text('a file where the card folder goes')
+    rows = [{'template': 'playbook/cover', 'slug': s, 'title': s} for s in ('a', 'b', 'c')]
+    status, report, out = run(tmp_path, rows, '--encoders', encoders)
+    assert status == 1
+    assert [e['row'] for e in report['errors']] == [2]
+    manifest = json.loads((out / 'build-manifest.json').read_text())
+    assert sorted(manifest['assets']) == ['a/cover.png', 'c/cover.png']
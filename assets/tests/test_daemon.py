@@ -0,0 +1,37 @@
+# a daemon render is a preview: it lands in the scratch directory (or --out)
+# and never touches the outputs a build tracks in its manifest
+import os
+
+import pytest
+from PIL import Image
+
+from assetkit import daemon
+
+
+@pytest.fixture(scope='module')
+def warm():
+    return daemon.Daemon()
+
+
+def listing(directory):
+    return {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in os.listdir(directory)}
+
+
+def test_render_writes_a_preview(warm, tmp_path, monkeypatch):
+    monkeypatch.setattr(warm, 'preview_dir', str(tmp_path))
+    out_dirs = {name: module.OUT_DIR for name, module in warm.modules.items()}
+    before = {name: listing(d) for name, d in out_dirs.items()}
+    result = warm.handle({'cmd': 'render', 'figure': 'things/cover_modern', 'scale': 2})
+    assert result['path'] == str(tmp_path / 'things' / 'cover_modern@2x.png')
+    assert {name: listing(d) for name, d in out_dirs.items()} == before
+    with Image.open(result['path']) as img:
+        assert img.size == (2400, 1260)
+        expected = warm.modules['things'].figures()['cover_modern'](2)
+        assert img.convert(expected.mode).tobytes() == expected.tobytes()
+
+
+def test_render_to_an_explicit_path(warm, tmp_path):
+    out = tmp_path / 'cover.png'
+    assert warm.render('playbook/cover', 1, str(out), 'dev') == str(out)
+    with Image.open(out) as img:
+        assert img.size == (1200, 630)
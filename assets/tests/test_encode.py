@@ -0,0 +1,91 @@
+# encoder profiles: narrowing to RGB or a palette is lossless, release PNGs
+# decode to the pixels drawn, and the same frame always encodes to the same
+# bytes
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from assetkit import encode, generators
+
+BG = (11, 15, 26)
+
+
+def decode(data):
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        return img
+
+
+def same_pixels(a, b):
+    mode = 'RGBA' if 'A' in a.mode or 'A' in b.mode or 'transparency' in b.info else 'RGB'
+    return a.convert(mode).tobytes() == b.convert(mode).tobytes()
+
+
+def flat(mode, colors, size=(64, 48), seed=0):
+    rng = random.Random(seed)
+    img = Image.new(mode, size)
+    img.putdata([rng.choice(colors) for _ in range(size[0] * size[1])])
+    return img
+
+
+def test_opaque_rgba_drops_alpha():
+    img = flat('RGBA', [(c, 255 - c, 40, 255) for c in range(0, 256, 1)] * 2)
+    img.putpixel((0, 0), (1, 2, 3, 255))
+    narrowed = encode.narrow(img)
+    assert narrowed.mode in ('RGB', 'P') and same_pixels(narrowed, img)
+
+
+def test_translucent_rgba_is_kept():
+    img = flat('RGBA', [(0, 229, 255, 128), (11, 15, 26, 255)])
+    assert encode.narrow(img) is img
+
+
+@pytest.mark.parametrize('count', [1, 2, 100, 255, 256])
+def test_few_colours_become_an_exact_palette(count):
+    for seed in range(10):
+        rng = random.Random(seed)
+        colors = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(count)]
+        img = flat('RGB', colors, seed=seed)
+        narrowed = encode.narrow(img)
+        assert narrowed.mode == 'P' and same_pixels(narrowed, img)
+
+
+def test_close_colours_keep_their_own_entries():
+    # an anti-aliased edge: colours one step apart in one channel
+    img = flat('RGB', [(11, 15, v) for v in range(26, 282 - 26)] + [(12, 15, 26)])
+    narrowed = encode.narrow(img)
+    assert narrowed.mode == 'P' and same_pixels(narrowed, img)
+
+
+def test_many_colours_stay_truecolour():
+    img = flat('RGB', [(c, c // 2, 255 - c) for c in range(256)] + [(1, 1, 1)])
+    img.putdata([(i % 256, i // 256 % 256, 7) for i in range(img.width * img.height)])
+    assert encode.narrow(img).mode == 'RGB'
+
+
+@pytest.mark.parametrize('profile', sorted(encode.PROFILES))
+def test_figures_decode_to_the_drawn_pixels(profile):
+    module = generators.load_generator('things')
+    for name, render in module.figures().items():
+        img = render(1)
+        data = encode.encode_png(img, encode.PROFILES[profile])
+        assert same_pixels(img, decode(data)), name
+        assert encode.encode_png(img, encode.PROFILES[profile]) == data
+
+
+def test_default_profile_matches_a_bare_save():
+    img = flat('RGB', [BG, (0, 229, 255)])
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    assert encode.encode_png(img) == buf.getvalue()
+
+
+def test_siblings_are_named_after_the_png():
+    profile = encode.get_profile('release', ('webp', 'avif'))
+    assert encode.output_names('cover.png', profile) == [('cover.png', 'png'), ('cover.webp', 'webp'),
+                                                        ('cover.avif', 'avif')]
+    img = flat('RGB', [BG, (0, 229, 255)])
+    files = dict(encode.encode_all(img, 'cover.png', profile))
+    assert same_pixels(img, decode(files['cover.webp']))   # lossless WebP
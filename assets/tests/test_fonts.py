@@ -0,0 +1,63 @@
+# the font registry: a family's candidates are resolved once, fonts are kept
+# in a bounded LRU, and re-registering the same family keeps it warm
+import pytest
+
+from assetkit import fonts, generators
+
+
+@pytest.fixture(scope='module')
+def font_file():
+    # whichever file the things generator's fonts resolved to here
+    generators.load_generator('things')
+    files = fonts.font_files('things')
+    if not files:
+        pytest.skip('no TrueType font installed')
+    return files[0]
+
+
+@pytest.fixture
+def registry(tmp_path, font_file):
+    # a missing file first, so resolution has to fall through to the next
+    reg = fonts.FontRegistry(maxsize=3)
+    reg.register('test', [str(tmp_path / 'missing.ttf'), font_file])
+    return reg
+
+
+def test_candidates_fall_through_to_the_first_that_loads(registry, tmp_path, font_file):
+    assert registry.resolve('test') == font_file
+    assert registry.files('test') == [font_file]
+    registry.register('none', [str(tmp_path / 'missing.ttf')])
+    assert registry.files('none') == []
+    assert registry.get('none', 12) is not None   # the PIL default
+
+
+def test_fonts_are_cached_per_size_and_weight(registry):
+    regular = registry.get('test', 20)
+    assert registry.get('test', 20) is regular and regular.size == 20
+    assert registry.get('test', 20, bold=True) is not regular
+    assert registry.stats() == {'hits': 1, 'misses': 2, 'evictions': 0, 'cached': 2}
+
+
+def test_least_recently_used_font_is_dropped(registry):
+    a = registry.get('test', 10)
+    registry.get('test', 11)
+    registry.get('test', 12)
+    assert registry.get('test', 10) is a   # now the most recently used
+    registry.get('test', 13)               # drops 11
+    assert registry.stats()['evictions'] == 1 and registry.stats()['cached'] == 3
+    assert registry.get('test', 10) is a
+    assert [key[1] for key in registry.cache] == [12, 13, 10]
+
+
+def test_re_registering_keeps_the_family_warm(registry, tmp_path, font_file):
+    font = registry.get('test', 20)
+    registry.register('test', [str(tmp_path / 'missing.ttf'), font_file])
+    assert registry.get('test', 20) is font
+    # new candidates drop what was loaded from the old ones
+    registry.register('test', [font_file])
+    assert registry.get('test', 20) is not font
+
+
+def test_unknown_family(registry):
+    with pytest.raises(KeyError):
+        registry.get('nope', 12)
@@ -0,0 +1,135 @@
+# golden check on stand-in figures in a temporary reference directory, and
+# the real figures against the committed references
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from assetkit import golden
+
+ENV = {'pillow': 'x', 'fonts': {'playbook': ['Sans.ttf'], 'things': ['Sans.ttf']}}
+
+
+def frame(shade=200, size=(40, 30)):
+    return Image.new('RGB', size, (shade, shade, shade))
+
+
+@pytest.fixture
+def figs(monkeypatch):
+    # {'gen/fig': frame at 1x}; renders scale it up
+    figures = {'gen/a': frame(), 'gen/b': frame(100)}
+
+    def render(key):
+        return lambda scale: figures[key].resize((figures[key].width * scale, figures[key].height * scale))
+    monkeypatch.setattr(golden.generators, 'figures', lambda: {key: render(key) for key in figures})
+    monkeypatch.setattr(golden, 'environment', lambda: ENV)
+    return figures
+
+
+def check(tmp_path, **kw):
+    return golden.check(scales=(1,), root=tmp_path / 'golden', diff_dir=tmp_path / 'diff', **kw)
+
+
+def test_update_records_references_and_index(figs, tmp_path):
+    golden.update(scales=(1,), root=tmp_path / 'golden')
+    assert sorted(p.name for p in (tmp_path / 'golden' / 'gen').iterdir()) == ['a@1x.png', 'b@1x.png']
+    index = json.loads((tmp_path / 'golden' / golden.INDEX_NAME).read_text())
+    assert index['environment'] == ENV and index['figures']['gen/a@1x']['size'] == [40, 30]
+    assert check(tmp_path) == (0, 0)
+
+
+def test_missing_reference_fails(figs, tmp_path, capsys):
+    assert check(tmp_path) == (2, 0)
+    assert 'FAIL gen/a@1x no reference' in capsys.readouterr().out
+    golden.update(match='gen/a', scales=(1,), root=tmp_path / 'golden')
+    assert check(tmp_path) == (1, 0)
+    # an index entry whose PNG is gone counts as missing too
+    os.remove(golden.golden_path('gen/a@1x', tmp_path / 'golden'))
+    assert check(tmp_path) == (2, 0)
+
+
+def test_update_flag_records_only_missing_references(figs, tmp_path, capsys):
+    golden.update(match='gen/a', scales=(1,), root=tmp_path / 'golden')
+    figs['gen/a'] = frame(0)
+    assert check(tmp_path, update_missing=True) == (1, 1)
+    out = capsys.readouterr().out
+    assert 'NEW gen/b@1x recorded' in out and 'FAIL gen/a@1x' in out
+    assert 'gen/b@1x' in golden.load_index(tmp_path / 'golden')['figures']
+    assert check(tmp_path) == (1, 0)
+
+
+def test_identical_figures_pass_on_the_digest(figs, tmp_path, capsys):
+    golden.update(scales=(1,), root=tmp_path / 'golden')
+    # a corrupt reference file is never opened when the digest matches
+    open(golden.golden_path('gen/a@1x', tmp_path / 'golden'), 'wb').close()
+    assert check(tmp_path) == (0, 0)
+    assert 'PASS gen/a@1x identical' in capsys.readouterr().out
+
+
+def test_changes_within_tolerance_pass(figs, tmp_path, capsys):
+    golden.update(scales=(1,), root=tmp_path / 'golden')
+    figs['gen/a'] = frame(200 + golden.DEFAULT_TOLERANCE)
+    assert check(tmp_path) == (0, 0)
+    assert 'PASS gen/a@1x within tolerance: 0 px' in capsys.readouterr().out
+    figs['gen/a'] = frame(200 + golden.DEFAULT_TOLERANCE + 1)
+    assert check(tmp_path) == (1, 0)
+
+
+def test_max_fraction_allows_a_few_changed_pixels(figs, tmp_path):
+    golden.update(scales=(1,), root=tmp_path / 'golden')
+    img = frame()
+    img.paste((0, 0, 0), (0, 0, 6, 5))   # 30 of 1200 px
+    figs['gen/a'] = img
+    assert check(tmp_path) == (1, 0)
+    assert check(tmp_path, max_fraction=0.025) == (0, 0)
+    assert check(tmp_path, max_fraction=0.02) == (1, 0)
+
+
+def test_failure_writes_a_heatmap(figs, tmp_path, capsys):
+    golden.update(scales=(1,), root=tmp_path / 'golden')
+    img = frame()
+    img.paste((0, 0, 0), (10, 10, 20, 20))
+    figs['gen/a'] = img
+    assert check(tmp_path) == (1, 0)
+    assert '100 px over tolerance' in capsys.readouterr().out
+    heat = np.asarray(Image.open(tmp_path / 'diff' / 'gen' / 'a@1x.png'))
+    assert heat[15, 15, 0] > 200 and heat[15, 15, 1] == 0     # red where it moved
+    assert heat[0, 0].tolist() == [60, 60, 60]                # dimmed elsewhere
+
+
+def test_size_change_fails(figs, tmp_path, capsys):
+    golden.update(scales=(1,), root=tmp_path / 'golden')
+    figs['gen/a'] = frame(size=(41, 30))
+    assert check(tmp_path) == (1, 0)
+    assert 'reference 40x30' in capsys.readouterr().out
+
+
+def test_other_fonts_fail_and_record_nothing(figs, tmp_path, monkeypatch, capsys):
+    golden.update(match='gen/a', scales=(1,), root=tmp_path / 'golden')
+    monkeypatch.setattr(golden, 'environment', lambda: dict(ENV, fonts={'playbook': ['Other.ttf']}))
+    assert check(tmp_path, update_missing=True) == (2, 0)
+    assert 'FAIL fonts' in capsys.readouterr().out
+    assert 'gen/b@1x' not in golden.load_index(tmp_path / 'golden')['figures']
+
+
+def test_main_exit_codes(figs, tmp_path):
+    args = ['--scales', '1', '--root', str(tmp_path / 'golden'), '--diff-dir', str(tmp_path / 'diff')]
+    assert golden.main(args) == 1
+    assert golden.main(args + ['--update']) == 0
+    assert golden.main(args) == 0
+    figs['gen/b'] = frame(0)
+    assert golden.main(args) == 1
+    assert golden.main(['update'] + args) == 0
+    assert golden.main(args) == 0
+
+
+def test_figures_match_the_committed_references():
+    index = golden.load_index()
+    if not index['figures']:
+        pytest.skip('no references committed')
+    golden.generators.figures()
+    if golden.environment()['fonts'] != index['environment']['fonts']:
+        pytest.skip('references are pinned to other fonts')
+    assert golden.check() == (0, 0)
@@ -0,0 +1,61 @@
+# native hi-DPI drawing: 1x logical coordinates land on the right device
+# pixels at every scale, and a viewport tile draws its crop of the frame
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from assetkit import canvas
+from assetkit.hidpi import Viewport, device_xy, scale_size, scale_value, scale_xy, scaled_draw, shift_xy
+
+BG = (11, 15, 26)
+CYAN = (0, 229, 255)
+
+
+def test_scaling_helpers():
+    assert scale_value(3, 2) == 6 and scale_value(2.5, 3) == 8 and scale_value(1.25, 1) == 1.25
+    assert scale_xy([1, 2.5, (3, 4)], 2) == [2, 5, (6, 8)]
+    assert scale_size((1200, 630), 3) == (3600, 1890)
+    assert shift_xy([10, 20, 30, 40], 5, 15) == [5, 5, 25, 25]
+    assert shift_xy([(10, 20), (30, 40)], 5, 15) == [(5, 5), (25, 25)]
+    assert device_xy((10, 20), 2, Viewport(0, 16, 100, 100)) == (20, 24)
+
+
+def test_scaled_drawing_lands_on_device_pixels():
+    scaled = canvas.new_canvas((200, 120), BG)
+    d = scaled_draw(scaled, 2)
+    d.rectangle([10, 10, 40, 30], fill=CYAN)
+    d.line([(0, 50), (99, 50)], fill=(255, 255, 255), width=2)
+    direct = canvas.new_canvas((200, 120), BG)
+    dd = ImageDraw.Draw(direct)
+    dd.rectangle([20, 20, 80, 60], fill=CYAN)
+    dd.line([(0, 100), (198, 100)], fill=(255, 255, 255), width=4)
+    assert scaled.tobytes() == direct.tobytes()
+    assert d.size == (100, 60)
+
+
+@pytest.mark.parametrize('scale', [1, 2, 3])
+def test_a_viewport_tile_is_a_crop_of_the_frame(scale):
+    def paint(img, viewport=None):
+        d = scaled_draw(img, scale, viewport)
+        d.rounded_rectangle([5, 5, 70, 45], radius=8, fill=CYAN + (160,), outline=(255, 255, 255), width=2)
+        d.ellipse([40, 10, 90, 50], fill=(255, 107, 107))
+        d.polygon([(0, 49), (50, 0), (99, 49)], outline=(200, 200, 90), width=1)
+        d.text((10, 20), 'Aa', fill=(255, 255, 255), font=ImageFont.load_default(12 * scale))
+
+    size = scale_size((100, 50), scale)
+    frame = canvas.new_canvas(size, BG)
+    paint(frame)
+    tile_h = 7 * scale
+    for top in range(0, size[1], tile_h):
+        tile = canvas.new_canvas((size[0], min(tile_h, size[1] - top)), BG)
+        viewport = Viewport(0, top, *size)
+        paint(tile, viewport)
+        assert scaled_draw(tile, scale, viewport).size == (100, 50)
+        assert tile.tobytes() == frame.crop((0, top, size[0], top + tile.height)).tobytes()
+
+
+def test_textbbox_is_in_logical_units():
+    font = ImageFont.load_default(24)
+    img = Image.new('RGB', (200, 100))
+    box = scaled_draw(img, 2, Viewport(0, 40, 200, 200)).textbbox((10, 30), 'Aa', font=font)
+    direct = ImageDraw.Draw(img).textbbox((20, 60), 'Aa', font=font)
+    assert box == tuple(v / 2 for v in direct)
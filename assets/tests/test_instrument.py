@@ -0,0 +1,69 @@
+# instrumentation: off, stage() is a shared no-op; on, every asset is one
+# JSON line whose exclusive stage times add up to no more than its total
+import json
+import pstats
+import time
+
+import pytest
+
+from assetkit import instrument
+
+
+@pytest.fixture
+def records(tmp_path):
+    path = tmp_path / 'timings.jsonl'
+    instrument.enable(str(path))
+    try:
+        yield lambda: [json.loads(line) for line in path.read_text().splitlines()]
+    finally:
+        instrument.disable()
+
+
+def test_disabled_is_a_no_op():
+    assert not instrument.enabled()
+    assert instrument.stage('draw') is instrument.stage('encode')
+    assert instrument.asset('x.png') is instrument.stage('draw')
+    assert instrument.new_image('RGB', (4, 4), (1, 2, 3)).getpixel((0, 0)) == (1, 2, 3)
+
+
+def test_stages_are_exclusive_and_add_up(records):
+    with instrument.asset('cover.png', scale=2, kind='cover'):
+        with instrument.stage('draw'):
+            time.sleep(0.02)
+            with instrument.stage('tag'):
+                time.sleep(0.01)
+            img = instrument.new_image('RGBA', (10, 20))
+        with instrument.stage('encode'):
+            time.sleep(0.01)
+        with instrument.stage('draw'):
+            pass
+    (record,) = records()
+    assert record['asset'] == 'cover.png' and record['scale'] == 2 and record['kind'] == 'cover'
+    stages = record['stages']
+    assert set(stages) == {'draw', 'tag', 'alloc', 'encode'}
+    assert 20 <= stages['draw'] and 10 <= stages['tag'] and 10 <= stages['encode']
+    # a nested stage's time is not counted again in the one around it
+    assert sum(stages.values()) <= record['total_ms']
+    assert record['alloc']['frames'] == 1 and record['alloc']['frame_bytes'] == 4 * 10 * 20
+    assert img.size == (10, 20)
+
+
+def test_nested_assets_get_their_own_records(records):
+    with instrument.asset('outer.png'):
+        with instrument.stage('draw'):
+            with instrument.asset('inner.png'):
+                with instrument.stage('encode'):
+                    pass
+    inner, outer = records()
+    assert (inner['asset'], outer['asset']) == ('inner.png', 'outer.png')
+    assert set(inner['stages']) == {'encode'} and set(outer['stages']) == {'draw'}
+
+
+def test_profile_is_dumped_on_disable(tmp_path):
+    path = tmp_path / 'run.pstats'
+    instrument.enable(str(tmp_path / 'timings.jsonl'), str(path))
+    with instrument.asset('a.png'):
+        sum(range(1000))
+    instrument.disable()
+    assert not instrument.enabled()
+    assert pstats.Stats(str(path)).total_calls > 0
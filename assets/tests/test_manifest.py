@@ -0,0 +1,129 @@
+# an edit to a figure's text constants, background or to assetkit has to
+# reach its manifest entry, or the stale PNG is kept as UNCHANGED; and a
+# build writes the same bytes however many processes it runs in
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from assetkit.generators import ASSETS_DIR, GENERATORS
+
+
+def copy_generator(name, tmp_path):
+    # the script in a directory of its own, so its outputs land there
+    src = GENERATORS[name]
+    dst = tmp_path / os.path.basename(os.path.dirname(src)) / os.path.basename(src)
+    dst.parent.mkdir()
+    shutil.copy(src, dst)
+    return dst
+
+
+def load(path, replace=None):
+    if replace is not None:
+        path.write_text(path.read_text().replace(*replace))
+    spec = importlib.util.spec_from_file_location(f'copy_{path.stem}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build(module, argv):
+    module.main(argv)
+    with open(os.path.join(module.OUT_DIR, 'build-manifest.json')) as f:
+        return json.load(f)['assets']
+
+
+def changed(before, after):
+    return sorted(name for name in after if before.get(name) != after[name])
+
+
+def test_playbook_text_constants_are_hashed(tmp_path):
+    path = copy_generator('playbook', tmp_path)
+    argv = ['--scales', '', '--profile', 'dev', '--encoders', '0']
+    before = build(load(path), argv)
+    after = build(load(path, ('"Quick Actions"', '"Next Steps"')), argv)
+    assert changed(before, after) == ['action_list.png']
+
+
+def test_things_text_constants_are_hashed(tmp_path):
+    path = copy_generator('things', tmp_path)
+    argv = ['--profile', 'dev', '--encoders', '0']
+    before = build(load(path), argv)
+    after = build(load(path, ("'Quick actions to convert", "'Small actions to convert")), argv)
+    assert changed(before, after) == ['action_list.png', 'action_list.svg', 'action_list@2x.png']
+
+
+def test_playbook_background_is_hashed(tmp_path):
+    path = copy_generator('playbook', tmp_path)
+    argv = ['--scales', '', '--profile', 'dev', '--encoders', '0']
+    before = build(load(path), argv)
+    after = build(load(path, ("'diagram': (251,251,250)", "'diagram': (250,250,250)")), argv)
+    assert changed(before, after) == ['diagram_flow.png']
+
+
+def package_copy(name, tmp_path):
+    # assetkit is already imported here, so a build against an edited
+    # package runs on a copy of it in a process of its own
+    tmp_path.mkdir(exist_ok=True)
+    shutil.copytree(os.path.join(ASSETS_DIR, 'assetkit'), tmp_path / 'assetkit',
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    return copy_generator(name, tmp_path)
+
+
+def build_copy(path, argv):
+    subprocess.run([sys.executable, str(path)] + argv, check=True, cwd=path.parent, stdout=subprocess.DEVNULL)
+    with open(path.parent / 'build-manifest.json') as f:
+        return json.load(f)['assets']
+
+
+def edit(path, old, new):
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new))
+
+
+def test_things_drawing_modules_are_hashed(tmp_path):
+    path = package_copy('things', tmp_path)
+    argv = ['--profile', 'dev', '--encoders', '0']
+    before = build_copy(path, argv)
+    cover = (path.parent / 'cover_modern.png').read_bytes()
+    edit(tmp_path / 'assetkit' / 'shapes.py', 'SUPERSAMPLE = 4', 'SUPERSAMPLE = 2')
+    after = build_copy(path, argv)
+    assert changed(before, after) == sorted(before)
+    assert (path.parent / 'cover_modern.png').read_bytes() != cover
+
+
+PLAYBOOK_ARGV = ['--scales', '', '--profile', 'dev', '--encoders', '0']
+
+
+@pytest.mark.parametrize('name, argv, module', [
+    ('playbook', PLAYBOOK_ARGV, 'encode.py'),
+    ('playbook', PLAYBOOK_ARGV + ['--tile-from', '1'], 'tiled.py'),
+    ('things', ['--profile', 'dev', '--encoders', '0'], 'encode.py'),
+])
+def test_encoder_code_is_hashed(tmp_path, name, argv, module):
+    # the encoded bytes come from encode (and tiled, for a frame written a
+    # band at a time), not only from the profile's settings
+    path = package_copy(name, tmp_path)
+    before = build_copy(path, argv)
+    edit(tmp_path / 'assetkit' / module, '\nimport ', '\n# edited\nimport ')
+    after = build_copy(path, argv)
+    assert changed(before, after) == sorted(before)
+
+
+@pytest.mark.parametrize('extra', [[], ['--tile-from', '2', '--srcset', '320,900']])
+def test_playbook_jobs_build_the_same_bytes(tmp_path, extra):
+    # worker processes hand frames back through shared memory; the files,
+    # manifest included, come out byte for byte as a serial build writes them
+    argv = ['--scales', '2', '--profile', 'dev', '--encoders', '0'] + extra
+    outputs = {}
+    for jobs in ('1', '2'):
+        path = package_copy('playbook', tmp_path / jobs)
+        build_copy(path, argv + ['--jobs', jobs])
+        outputs[jobs] = {p.name: p.read_bytes() for p in path.parent.iterdir() if p.suffix in ('.png', '.json')}
+    assert sorted(outputs['1']) == sorted(outputs['2']) and len(outputs['1']) > 3
+    assert [name for name in outputs['1'] if outputs['1'][name] != outputs['2'][name]] == []
@@ -0,0 +1,113 @@
+# the encode pipeline: writes in submission order, put() blocks once depth
+# frames are in flight, and a failed encode or write reaches the caller
+# instead of hanging the build
+import argparse
+import threading
+import time
+
+import pytest
+
+from assetkit import pipeline
+
+TIMEOUT = 10
+
+
+def finishes(fn):
+    # run fn on a thread; whether it returned (or raised) within TIMEOUT
+    done = threading.Event()
+    result = {}
+
+    def run():
+        try:
+            result['value'] = fn()
+        except BaseException as e:
+            result['error'] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    assert done.wait(TIMEOUT), 'pipeline hung'
+    return result
+
+
+def test_writes_come_out_in_submission_order():
+    written = []
+    with pipeline.Pipeline(encoders=3, depth=6) as pipe:
+        for i in range(20):
+            # later frames encode faster than earlier ones
+            pipe.put(lambda i=i: time.sleep((20 - i) * 0.001) or i, written.append)
+        pipe.put(None, lambda: written.append('streamed'))
+    assert written == list(range(20)) + ['streamed']
+
+
+def test_put_blocks_while_depth_frames_are_in_flight():
+    release = threading.Event()
+    written = []
+    pipe = pipeline.Pipeline(encoders=1, depth=2)
+    pipe.put(lambda: release.wait(TIMEOUT) and 0, written.append)
+    pipe.put(lambda: 1, written.append)
+    third = threading.Thread(target=pipe.put, args=(lambda: 2, written.append), daemon=True)
+    third.start()
+    third.join(0.2)
+    assert third.is_alive() and written == []
+    release.set()
+    third.join(TIMEOUT)
+    assert not third.is_alive()
+    pipe.close()
+    assert written == [0, 1, 2]
+
+
+@pytest.mark.parametrize('stage', ['encode', 'write'])
+def test_a_failure_surfaces_without_a_hang(stage):
+    written = []
+
+    def encode(i):
+        if stage == 'encode' and i == 2:
+            raise RuntimeError('encode failed')
+        return i
+
+    def write(data):
+        if stage == 'write' and data == 2:
+            raise RuntimeError('write failed')
+        written.append(data)
+
+    def build():
+        with pipeline.Pipeline(encoders=2, depth=2) as pipe:
+            for i in range(50):
+                pipe.put(lambda i=i: encode(i), write)
+
+    result = finishes(build)
+    assert str(result['error']) == f'{stage} failed'
+    # nothing is written after the failure
+    assert written == [0, 1]
+
+
+def test_close_reports_a_failure_in_the_last_frame():
+    pipe = pipeline.Pipeline(encoders=1)
+    pipe.put(lambda: 1 / 0, lambda data: None)
+    assert isinstance(finishes(pipe.close)['error'], ZeroDivisionError)
+
+
+def test_an_error_while_drawing_is_not_masked():
+    written = []
+    with pytest.raises(KeyError):
+        with pipeline.Pipeline(encoders=2) as pipe:
+            pipe.put(lambda: 1 / 0, written.append)
+            raise KeyError('draw failed')
+    assert written == []
+
+
+def test_no_encoders_runs_inline():
+    written = []
+    pipe = pipeline.Pipeline(encoders=0)
+    pipe.put(lambda: threading.current_thread(), written.append)
+    assert written == [threading.current_thread()]
+    with pytest.raises(ZeroDivisionError):
+        pipe.put(lambda: 1 / 0, written.append)
+
+
+def test_parse_jobs():
+    assert pipeline.parse_jobs('0') == 0 and pipeline.parse_jobs('3') == 3
+    for text in ('-1', 'many'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            pipeline.parse_jobs(text)
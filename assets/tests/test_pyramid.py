@@ -0,0 +1,67 @@
+# srcset pyramids: one frame at the scale covering the widest width, every
+# width derived from shared halvings, close to a direct LANCZOS resample,
+# and srcset.json listing what is on disk
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from assetkit import pyramid
+
+
+def test_widths_and_scales():
+    assert pyramid.parse_widths('640,320,,640,1600') == [320, 640, 1600]
+    assert pyramid.render_scale(1200, [320, 1200]) == 1
+    assert pyramid.render_scale(1200, [320, 2400]) == 2
+    assert pyramid.render_scale(1200, [2401]) == 3
+    assert pyramid.width_name('cover.png', 640) == 'cover-640w.png'
+
+
+def gradient_frame(size):
+    w, h = size
+    x = np.linspace(0, 255, w, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+    rgb = np.stack(np.broadcast_arrays(x, y, (x + y) / 2), axis=2)
+    return Image.fromarray(np.rint(rgb).astype(np.uint8))
+
+
+def test_frames_have_the_exact_widths_and_aspect():
+    img = gradient_frame((2400, 1260))
+    frames = pyramid.pyramid(img, [320, 640, 1200, 1600, 2400, 4800])
+    assert [w for w, _ in frames] == [2400, 1600, 1200, 640, 320]   # widest first, no upscaling
+    for width, frame in frames:
+        assert frame.size == (width, round(1260 * width / 2400))
+    assert frames[0][1] is img
+    assert frames[2][1].size == (1200, 630)
+
+
+def test_frames_are_close_to_a_direct_resample():
+    img = gradient_frame((2400, 1260))
+    for width, frame in pyramid.pyramid(img, [320, 900, 1200]):
+        direct = img.resize(frame.size, Image.LANCZOS)
+        diff = np.abs(np.asarray(frame, dtype=np.int16) - np.asarray(direct, dtype=np.int16))
+        assert diff.max() <= 2, width
+
+
+def test_srcset_manifest_lists_the_files_on_disk(tmp_path):
+    img = gradient_frame((1200, 630))
+    for width, frame in pyramid.pyramid(img, [320, 640]):
+        frame.save(tmp_path / pyramid.width_name('cover.png', width))
+    srcset = pyramid.SrcsetManifest(str(tmp_path))
+    srcset.record('cover.png', [640, 320, 960])   # 960 was never written
+    srcset.save()
+    data = json.loads((tmp_path / 'srcset.json').read_text())
+    entry = data['images']['cover.png']
+    assert entry['srcset'] == 'cover-320w.png 320w, cover-640w.png 640w'
+    assert [(e['width'], e['height']) for e in entry['widths']] == [(320, 168), (640, 336)]
+    # a merged directory is rescanned from its files
+    merged = pyramid.SrcsetManifest(str(tmp_path))
+    merged.rescan()
+    assert merged.widths == {'cover.png': [320, 640]}
+
+
+@pytest.mark.parametrize('width', [1, 3])
+def test_tiny_widths(width):
+    (_, frame), = pyramid.pyramid(gradient_frame((64, 10)), [width])
+    assert frame.size == (width, 1)
@@ -0,0 +1,112 @@
+# the scene graph: PNG and SVG come from the same nodes and break text the
+# same way, and variants of a figure resume from the layers they share,
+# which are the only ones cached
+import xml.etree.ElementTree as ET
+
+import pytest
+from PIL import Image
+
+from assetkit import fonts, generators
+from assetkit.layers import LayerCache
+from assetkit.scene import (Ellipse, Glow, Gradient, Group, RasterEmitter, Rect, Scene, Tag, TextBox, render_png,
+                            render_svg, scene_layers)
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+BG = (11, 15, 26)
+CYAN = (0, 229, 255)
+CORAL = (255, 107, 107)
+
+
+def variant(title_color, after=True):
+    s = Scene(width=120, height=80, background=BG)
+    s.add(Group(name='backdrop').add(Rect(10, 10, 100, 60, radius=12, fill=CYAN + (90,))))
+    s.add(Group(name='title', cache=False).add(Rect(20, 30, 80, 12, fill=title_color)))
+    if after:
+        s.add(Group(name='frame').add(Rect(4, 4, 112, 72, radius=8, stroke=(255, 255, 255), width=2)))
+    return s
+
+
+def test_groups_above_a_per_variant_group_are_not_cached():
+    layers = scene_layers(variant(CORAL))
+    assert [(layer.name, layer.cache) for layer in layers] == [
+        ('backdrop', True), ('title', False), ('frame', False)]
+    # unnamed children are never cached
+    s = Scene(width=10, height=10).add(Rect(0, 0, 5, 5, fill=CYAN), Group(name='top'))
+    assert [layer.cache for layer in scene_layers(s)] == [False, True]
+
+
+def test_variants_resume_from_the_shared_layers():
+    cache = LayerCache()
+    for scale in (1, 2):
+        for color in (CORAL, CYAN, CORAL):
+            s = variant(color)
+            assert render_png(s, scale, cache).tobytes() == render_png(s, scale).tobytes()
+    # one frame per scale: the backdrop, never a frame keyed by a title
+    assert len(cache.frames) == 2
+    assert [[name for name, key in prefix[3:]] for prefix in cache.frames] == [['backdrop'], ['backdrop']]
+    assert cache.stats()['hits'] == 4
+
+
+@pytest.fixture(scope='module')
+def family():
+    # the things generator's fonts, under a family of the tests' own
+    generators.load_generator('things')
+    files = fonts.font_files('things')
+    if not files:
+        pytest.skip('no TrueType font installed')
+    fonts.register('scene-test', files)
+    return 'scene-test'
+
+
+def figure(family):
+    s = Scene(width=300, height=160, background=BG, font_family=family)
+    s.add(Group(name='backdrop').add(
+        Gradient(0, 0, 300, 160, (BG, CYAN), (0, 0), (0, 160)),
+        Glow(150, 80, 60, CORAL + (50,)),
+    ))
+    s.add(Group(name='cards').add(
+        Rect(10, 10, 80, 50, radius=8, stroke=(255, 255, 255)),
+        Rect(110, 10, 80, 50, radius=8, stroke=(255, 255, 255)),
+        Ellipse(250, 40, 20, 20, fill=CORAL),
+    ))
+    s.add(TextBox(10, 80, 120, 70, 'Quick actions to convert ideas into outcomes', 18, (255, 255, 255),
+                  max_lines=3, min_size=12, valign='middle'))
+    s.add(Tag(200, 130, 'Beto Dias', 12, (255, 255, 255), (255, 255, 255, 20), (6, 3), 5))
+    return s
+
+
+def test_svg_follows_the_scene(family):
+    s = figure(family)
+    root = ET.fromstring(render_svg(s))
+    assert (root.get('width'), root.get('height')) == ('300', '160')
+    assert [g.get('id') for g in root.iter(SVG + 'g')] == ['backdrop', 'cards', 'tag']
+    assert len(root.findall(f'{SVG}defs/{SVG}linearGradient')) == 1
+    assert len(root.findall(f'{SVG}defs/{SVG}radialGradient')) == 1
+    # the two frames differ only by position: one symbol, two uses
+    assert len(root.findall(f'.//{SVG}use')) == 2
+    assert root.find(f'.//{SVG}circle[@r="20"]') is not None
+
+
+def test_text_breaks_the_same_in_every_output(family):
+    s = figure(family)
+    box = s.children[2]
+    layout = RasterEmitter(s, 2).layout(box)
+    assert layout.lines and layout.size <= 18
+    svg_lines = [span.text for span in ET.fromstring(render_svg(s)).iter(SVG + 'tspan')]
+    assert svg_lines == [line.text for line in layout.lines]
+    # lines are vertically centred in the box
+    x, y = RasterEmitter(s).origin(box, layout)
+    assert y == pytest.approx(80 + (70 - layout.height) / 2)
+
+
+@pytest.mark.parametrize('scale', [1, 2])
+def test_png_is_the_layers_painted_in_order(family, scale):
+    s = figure(family)
+    frame = render_png(s, scale)
+    assert frame.size == (300 * scale, 160 * scale) and frame.mode == 'RGB'
+    painted = Image.new('RGB', frame.size, BG)
+    for layer in scene_layers(s, scale):
+        layer.paint(painted)
+    assert painted.tobytes() == frame.tobytes()
+    assert render_png(s, scale, LayerCache()).tobytes() == frame.tobytes()
@@ -0,0 +1,48 @@
+# the sliced, mirrored and banded pieces of a shape have to cover exactly
+# what supersampling the whole shape at once does
+import pytest
+from PIL import Image
+
+from assetkit import shapes
+
+
+def assemble(pieces, size, alpha=255):
+    mask = Image.new('L', size, 0)
+    for xy, piece in pieces:
+        if isinstance(piece, tuple):
+            piece = Image.new('L', piece, alpha)
+        mask.paste(piece, xy)
+    return mask
+
+
+@pytest.mark.parametrize('size', [(1, 1), (2, 5), (7, 7), (40, 41), (301, 160), (700, 700)])
+@pytest.mark.parametrize('width', [0, 1, 6])
+@pytest.mark.parametrize('alpha', [255, 20])
+def test_ellipse_pieces_match_supersampled(size, width, alpha):
+    shapes.clear_cache()
+    expected = shapes.scaled(shapes.supersampled('ellipse', size, 0, width), alpha)
+    pieces = shapes.shape_pieces('ellipse', size, 0, width, alpha)
+    assert assemble(pieces, size, alpha).tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize('size, radius', [((3, 3), 1), ((20, 9), 4), ((300, 160), 12), ((640, 480), 40)])
+@pytest.mark.parametrize('width', [0, 2])
+@pytest.mark.parametrize('alpha', [255, 15])
+def test_rounded_rect_pieces_match_supersampled(size, radius, width, alpha):
+    shapes.clear_cache()
+    expected = shapes.scaled(shapes.supersampled('rounded_rect', size, radius, width), alpha)
+    pieces = shapes.shape_pieces('rounded_rect', size, radius, width, alpha)
+    assert assemble(pieces, size, alpha).tobytes() == expected.tobytes()
+
+
+def test_cache_drops_least_recently_used(monkeypatch):
+    monkeypatch.setattr(shapes, 'MAXSIZE', 3)
+    shapes.clear_cache()
+    for size in (10, 11, 12):
+        shapes.shape_pieces('ellipse', (size, size))
+    shapes.shape_pieces('ellipse', (10, 10))
+    shapes.shape_pieces('ellipse', (13, 13))
+    assert shapes.cache_size() == 3
+    assert ('ellipse', (11, 11), 0, 0, 255) not in shapes._shapes
+    assert ('ellipse', (10, 10), 0, 0, 255) in shapes._shapes
+    shapes.clear_cache()
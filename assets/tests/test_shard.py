@@ -0,0 +1,93 @@
+# merging the partial manifests of a sharded build: every shard there, each
+# asset built exactly once, by the shard it hashes to, in one environment
+import json
+
+from assetkit import shard
+
+COUNT = 3
+NAMES = [f'{fig}{suffix}' for fig in ('cover', 'cover_notitle', 'diagram_flow', 'action_list', 'action_agent',
+                                      'action_endstate', 'card_a', 'card_b', 'card_c', 'card_d')
+         for suffix in ('.png', '@2x.png', '.svg')]
+
+
+def build(out_dir, count=COUNT):
+    # every shard's outputs and partial manifest, as if copied together
+    for index in range(1, count + 1):
+        manifest = shard.ShardManifest(str(out_dir), (index, count))
+        for name in NAMES:
+            if manifest.claim(name):
+                (out_dir / name).write_bytes(name.encode('utf-8'))
+                manifest.record(name, 'inputs of ' + name)
+        manifest.save()
+
+
+def partial(out_dir, index, count=COUNT):
+    return out_dir / shard.manifest_name((index, count))
+
+
+def edit(path, change):
+    data = json.loads(path.read_text())
+    change(data)
+    path.write_text(json.dumps(data))
+
+
+def test_complete_shards_merge(tmp_path):
+    build(tmp_path)
+    merged, problems = shard.merge(str(tmp_path), verify=True)
+    assert problems == []
+    assert merged == {name: 'inputs of ' + name for name in NAMES}
+
+
+def test_missing_shard_is_a_gap(tmp_path):
+    build(tmp_path)
+    partial(tmp_path, 2).unlink()
+    _, problems = shard.merge(str(tmp_path))
+    assert f'shard 2/{COUNT}: no partial manifest' in problems
+
+
+def test_missing_output_is_reported(tmp_path):
+    build(tmp_path)
+    (tmp_path / 'cover@2x.png').unlink()
+    _, problems = shard.merge(str(tmp_path))
+    assert problems == [f'cover@2x.png: missing from {tmp_path}']
+
+
+def test_asset_built_twice_is_reported(tmp_path):
+    build(tmp_path)
+    aid = next(shard.asset_id(n) for n in NAMES if shard.shard_of(shard.asset_id(n), COUNT) == 2)
+    outputs = [n for n in NAMES if shard.asset_id(n) == aid]
+
+    def claim(data):
+        data['outputs'][aid] = outputs
+        data['assets'].update({n: 'inputs of ' + n for n in outputs})
+    edit(partial(tmp_path, 1), claim)
+    _, problems = shard.merge(str(tmp_path))
+    assert f'{aid}: built by shard 1/{COUNT}, belongs to 2/{COUNT}' in problems
+    assert f'{aid}: built by shards 1/{COUNT} and 2/{COUNT}' in problems
+
+
+def test_environment_mismatch_is_reported(tmp_path):
+    build(tmp_path)
+    edit(partial(tmp_path, 3), lambda data: data['environment'].update(pillow='0.0'))
+    _, problems = shard.merge(str(tmp_path))
+    assert problems == [f'shard 3/{COUNT}: pillow differs from shard 1/{COUNT}']
+
+
+def test_different_plans_and_counts_are_reported(tmp_path):
+    build(tmp_path)
+    edit(partial(tmp_path, 2), lambda data: data.update(plan='0' * 64))
+    _, problems = shard.merge(str(tmp_path))
+    assert any('different plans' in p for p in problems)
+    edit(partial(tmp_path, 2), lambda data: data.update(shard=[2, 4]))
+    merged, problems = shard.merge(str(tmp_path))
+    assert merged == {}
+    assert problems == ['partial manifests from different shard counts: [3, 4]']
+
+
+def test_verify_catches_a_rewritten_output(tmp_path):
+    build(tmp_path)
+    (tmp_path / 'diagram_flow.svg').write_bytes(b'<svg/>')
+    _, problems = shard.merge(str(tmp_path))
+    assert problems == []
+    _, problems = shard.merge(str(tmp_path), verify=True)
+    assert len(problems) == 1 and problems[0].startswith('diagram_flow.svg: differs from what shard')
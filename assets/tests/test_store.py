@@ -0,0 +1,70 @@
+# gc may only drop blobs no output points at any more
+import os
+
+from assetkit import store
+
+
+def blobs(s):
+    return sorted(name[:2] + f for name in os.listdir(os.path.join(s.root, 'objects'))
+                  for f in os.listdir(os.path.join(s.root, 'objects', name)))
+
+
+def make_store(tmp_path):
+    s = store.BlobStore(str(tmp_path / '.store'))
+    out = tmp_path / 'out'
+    out.mkdir()
+    return s, out
+
+
+def test_gc_keeps_referenced_blobs(tmp_path):
+    s, out = make_store(tmp_path)
+    shared = s.put(b'shared frame')
+    s.link(shared, out / 'cover.png')
+    s.link(shared, out / 'cover_v2.png')
+    single = s.put(b'single frame')
+    s.link(single, out / 'diagram.png')
+    orphan = s.put(b'never linked')
+    s.save()
+
+    assert sorted(store.BlobStore(s.root).gc(dry_run=True)) == [orphan]
+    assert blobs(s) == sorted([shared, single, orphan])
+    removed = store.BlobStore(s.root).gc()
+    assert removed == [orphan]
+    assert blobs(s) == sorted([shared, single])
+    assert (out / 'cover.png').read_bytes() == b'shared frame'
+
+
+def test_gc_keeps_a_blob_while_any_output_points_at_it(tmp_path):
+    s, out = make_store(tmp_path)
+    shared = s.put(b'shared frame')
+    s.link(shared, out / 'cover.png')
+    s.link(shared, out / 'cover_v2.png')
+    s.save()
+    os.remove(out / 'cover.png')
+    assert store.BlobStore(s.root).gc() == []
+    assert blobs(s) == [shared]
+    os.remove(out / 'cover_v2.png')
+    assert store.BlobStore(s.root).gc() == [shared]
+
+
+def test_gc_keeps_blobs_of_copies(tmp_path):
+    # where hardlinks aren't possible an output is a copy of its blob
+    s, out = make_store(tmp_path)
+    digest = s.put(b'copied frame')
+    (out / 'cover.png').write_bytes(b'copied frame')
+    s.refs[s._ref(out / 'cover.png')] = digest
+    s.save()
+    assert store.BlobStore(s.root).gc() == []
+    assert blobs(s) == [digest]
+
+
+def test_gc_drops_blobs_of_rewritten_outputs(tmp_path):
+    s, out = make_store(tmp_path)
+    digest = s.put(b'old frame', pkey='old pixels')
+    s.link(digest, out / 'cover.png')
+    s.save()
+    store.replace_file(str(out / 'cover.png'), b'new frame, written without the store')
+    gc_store = store.BlobStore(s.root)
+    assert gc_store.gc() == [digest]
+    assert gc_store.refs == {} and gc_store.pixels == {}
+    assert (out / 'cover.png').read_bytes() == b'new frame, written without the store'
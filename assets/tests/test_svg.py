@@ -0,0 +1,83 @@
+# the SVG writer: text and attributes are escaped, repeated shapes become
+# one <symbol> placed with <use>, and whatever it writes parses as XML
+import gzip
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from assetkit import generators, svg
+from assetkit.scene import render_svg
+
+SVG = '{http://www.w3.org/2000/svg}'
+XLINK = '{http://www.w3.org/1999/xlink}'
+
+
+def parse(markup):
+    return ET.fromstring(markup)
+
+
+@pytest.mark.parametrize('minify', [False, True])
+def test_text_and_attributes_are_escaped(minify):
+    doc = svg.SvgDocument(100, 40)
+    doc.add('text', {'x': 1, 'y': 2, 'data-note': 'say "hi" & <go>'}, {'fill': '#fff'}, text='>70% of "teams" & <co>')
+    root = parse(doc.serialize(minify))
+    text = root.find(SVG + 'text')
+    assert text.text == '>70% of "teams" & <co>'
+    assert text.get('data-note') == 'say "hi" & <go>'
+
+
+def test_repeated_shapes_become_one_symbol():
+    doc = svg.SvgDocument(400, 100)
+    for i in range(5):
+        doc.add('rect', {'x': 10 + i * 70, 'y': 20, 'width': 60, 'height': 40, 'rx': 8}, {'fill': '#00e5ff'})
+    doc.add('rect', {'x': 0, 'y': 0, 'width': 5, 'height': 5}, {'fill': '#00e5ff'})
+    markup = doc.serialize()
+    assert markup.count('<symbol') == 1 and markup.count('<use') == 5
+    root = parse(markup)
+    symbol = root.find(f'{SVG}defs/{SVG}symbol')
+    (shape,) = symbol
+    assert shape.get('x') is None and shape.get('width') == '60'
+    uses = root.findall(SVG + 'use')
+    assert [u.get('x') for u in uses] == ['10', '80', '150', '220', '290']
+    assert all(u.get('y') == '20' for u in uses)
+    # SVG 2 href and xlink:href for older renderers, in the xlink namespace
+    sid = '#' + symbol.get('id')
+    assert all(u.get('href') == sid and u.get(XLINK + 'href') == sid for u in uses)
+    # the odd one out is written as it is
+    assert len(root.findall(SVG + 'rect')) == 1
+
+
+def test_no_xlink_namespace_without_symbols():
+    doc = svg.SvgDocument(10, 10)
+    doc.add('rect', {'x': 0, 'y': 0, 'width': 5, 'height': 5}, {'fill': '#000'})
+    assert 'xlink' not in doc.serialize()
+
+
+def test_repeated_styles_become_classes():
+    doc = svg.SvgDocument(100, 100)
+    doc.add('circle', {'cx': 10, 'cy': 10, 'r': 5}, {'fill': '#f00', 'stroke-width': 2})
+    doc.add('circle', {'cx': 30, 'cy': 10, 'r': 7}, {'fill': '#f00', 'stroke-width': 2})
+    root = parse(doc.serialize())
+    assert root.find(SVG + 'style').text == '.a{fill:#f00;stroke-width:2px}'
+    assert [c.get('class') for c in root.findall(SVG + 'circle')] == ['a', 'a']
+
+
+def test_numbers_are_rounded():
+    doc = svg.SvgDocument(10, 10, precision=2)
+    assert [doc.value(v) for v in (3, 1.005, 2.5, -0.001, [(1.234, 5.0)])] == ['3', '1', '2.5', '0', '1.23,5']
+
+
+def test_svgz_is_reproducible():
+    markup = svg.SvgDocument(10, 10).serialize()
+    assert svg.svgz(markup) == svg.svgz(markup)
+    assert gzip.decompress(svg.svgz(markup)).decode('utf-8') == markup
+
+
+@pytest.mark.parametrize('minify', [False, True])
+def test_things_figures_parse(minify):
+    module = generators.load_generator('things')
+    for name, build_fn in module.FIGURES.items():
+        root = parse(render_svg(build_fn(), minify))
+        assert root.tag == SVG + 'svg', name
+        if name == 'action_endstate':
+            assert '>70%' in [t.text for t in root.iter(SVG + 'text')]
@@ -0,0 +1,62 @@
+# a stamped tag sprite has to land exactly where ImageDraw.text would have
+# drawn the tag, and the sprites are kept in a bounded LRU
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from assetkit import tag
+
+BG = (11, 15, 26)
+CYAN = (0, 229, 255)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    tag.clear_cache()
+
+
+@pytest.fixture
+def font():
+    return ImageFont.load_default(18)
+
+
+@pytest.mark.parametrize('mode', ['RGB', 'RGBA'])
+def test_stamped_text_matches_drawn_text(font, mode):
+    stamped = Image.new(mode, (200, 60), BG)
+    drawn = stamped.copy()
+    tag.stamp_tag(stamped, (10, 20), 'Beto Dias', font, (255, 255, 255))
+    ImageDraw.Draw(drawn).text((10, 20), 'Beto Dias', font=font, fill=(255, 255, 255))
+    assert stamped.tobytes() == drawn.tobytes()
+
+
+def test_stamped_pill_matches_drawn_pill(font):
+    stamped = Image.new('RGB', (200, 60), BG)
+    drawn = stamped.copy()
+    tag.stamp_tag(stamped, (10, 20), 'Beto Dias', font, BG, CYAN, (6, 3), 5)
+    d = ImageDraw.Draw(drawn)
+    r, b = font.getbbox('Beto Dias')[2:]
+    d.rounded_rectangle([4, 17, 10 + r + 6, 20 + b + 3], radius=5, fill=CYAN)
+    d.text((10, 20), 'Beto Dias', font=font, fill=BG)
+    assert stamped.tobytes() == drawn.tobytes()
+
+
+def test_sprite_is_cut_to_the_text(font):
+    sprite, (dx, dy) = tag.tag_sprite('Beto Dias', font, (255, 255, 255, 200))
+    l, t, r, b = font.getbbox('Beto Dias')
+    assert (dx, dy) == (l, t) and sprite.size == (r - l, b - t)
+    assert sprite.getchannel('A').getextrema() == (0, 200)
+
+
+def test_sprites_are_cached_least_recently_used_first(font, monkeypatch):
+    monkeypatch.setattr(tag, 'MAXSIZE', 3)
+
+    def sprite(text):
+        return tag.tag_sprite(text, font, (255, 255, 255))[0]
+
+    a = sprite('a')
+    sprite('b')
+    sprite('c')
+    assert sprite('a') is a   # now the most recently used
+    sprite('d')               # drops b
+    assert tag.cache_size() == 3
+    assert sprite('a') is a
+    assert [key[0] for key in tag._sprites] == ['c', 'd', 'a']
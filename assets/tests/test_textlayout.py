@@ -0,0 +1,85 @@
+# wrapping, ellipsizing and fitting against a monospaced stand-in font
+# (every character size / 2 wide), so the boundaries are exact pixel counts
+import pytest
+
+from assetkit import textlayout
+
+
+class Mono:
+    def __init__(self, size=20):
+        self.size = size
+        self.path = 'mono'
+
+    def getlength(self, text):
+        return len(text) * self.size / 2
+
+    def getbbox(self, text):
+        return (0, 0, self.getlength(text), self.size)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    textlayout.cache.clear()
+
+
+def test_wrap_breaks_at_the_width_boundary():
+    font = Mono()   # 10 px a character
+    assert textlayout.wrap('aaa bbb ccc', font, 70) == ['aaa bbb', 'ccc']
+    assert textlayout.wrap('aaa bbb ccc', font, 69) == ['aaa', 'bbb', 'ccc']
+    assert textlayout.wrap('aaa\nbbb', font, 200) == ['aaa', 'bbb']
+
+
+def test_unbreakable_word_is_split_at_characters():
+    font = Mono()
+    assert textlayout.wrap('abcdefghijkl', font, 50) == ['abcde', 'fghij', 'kl']
+    assert textlayout.wrap('ab abcdefghijkl x', font, 50) == ['ab', 'abcde', 'fghij', 'kl x']
+    box = textlayout.layout('abcdefghijkl', font, width=50)
+    assert all(line.width <= 50 for line in box.lines)
+
+
+def test_max_lines_ellipsizes_the_last_line():
+    font = Mono()
+    box = textlayout.layout('one two three four five', font, width=70, max_lines=2)
+    assert box.truncated
+    assert [line.text for line in box.lines] == ['one two', 'three' + textlayout.ELLIPSIS]
+    assert box.height == 2 * textlayout.line_height(font) - 4
+    # a last line that fills the width is cut to make room
+    box = textlayout.layout('aaaaaaa bbbbbbb ccc', font, width=70, max_lines=2)
+    assert box.lines[-1].text == 'bbbbbb' + textlayout.ELLIPSIS
+    assert box.lines[-1].width <= 70
+
+
+def test_text_that_fits_is_not_truncated():
+    box = textlayout.layout('one two three', Mono(), width=70, max_lines=2)
+    assert not box.truncated
+    assert [line.text for line in box.lines] == ['one two', 'three']
+
+
+def test_height_caps_the_lines():
+    font = Mono()   # lines 24 px apart, 20 high
+    box = textlayout.layout('a b c d', font, width=20, height=44)
+    assert [line.text for line in box.lines] == ['a', 'b' + textlayout.ELLIPSIS]
+    assert [line.y for line in box.lines] == [0, 24]
+
+
+def test_fit_shrinks_until_the_text_fits():
+    text = 'quick actions to convert ideas'
+    box = textlayout.fit(text, Mono, 40, width=200, height=60, min_size=10)
+    assert not box.truncated and box.size < 40
+    assert box.height <= 60 and all(line.width <= 200 for line in box.lines)
+    # one size up does not fit
+    assert textlayout.layout(text, Mono(box.size + 1), width=200, height=60).truncated
+
+
+def test_fit_ellipsizes_at_min_size():
+    box = textlayout.fit('quick actions to convert ideas', Mono, 40, width=60, height=20, min_size=16)
+    assert box.size == 16 and box.truncated
+    assert len(box.lines) == 1 and box.lines[0].text.endswith(textlayout.ELLIPSIS)
+
+
+def test_alignment_offsets_lines_in_the_box():
+    font = Mono()
+    centre = textlayout.layout('aaaa\nbb', font, align='center')
+    assert centre.width == 40 and [line.x for line in centre.lines] == [0, 10]
+    right = textlayout.layout('aaaa\nbb', font, width=60, align='right')
+    assert [line.x for line in right.lines] == [20, 40]
@@ -0,0 +1,105 @@
+# the streaming PNG writer has to decode to exactly the rows it was given,
+# and a figure painted strip by strip to exactly the frame drawn at once
+import random
+
+import pytest
+from PIL import Image
+
+from assetkit import generators, tiled
+from assetkit.hidpi import scale_size
+from assetkit.scene import (Ellipse, Glow, Gradient, Grain, Group, Line, Polygon, Rect, Scene, Stripes, render_png,
+                            render_png_tiled)
+
+BG = (11, 15, 26)
+CYAN = (0, 229, 255)
+CORAL = (255, 107, 107)
+
+
+def noise_image(mode, size, seed=0):
+    rng = random.Random(seed)
+    channels = len(mode)
+    return Image.frombytes(mode, size, bytes(rng.randrange(256) for _ in range(size[0] * size[1] * channels)))
+
+
+@pytest.mark.parametrize('mode', ['L', 'LA', 'RGB', 'RGBA'])
+def test_png_writer_round_trips(tmp_path, monkeypatch, mode):
+    # several IDAT chunks, strips of uneven height
+    monkeypatch.setattr(tiled.PngWriter, 'CHUNK_SIZE', 512)
+    img = noise_image(mode, (37, 101))
+    path = tmp_path / 'out.png'
+    with tiled.PngWriter(str(path), img.size, mode) as png:
+        top = 0
+        for h in (1, 32, 32, 7, 29):
+            png.write_rows(img.crop((0, top, img.width, top + h)).tobytes())
+            top += h
+    with Image.open(path) as decoded:
+        assert decoded.mode == mode and decoded.size == img.size
+        assert decoded.tobytes() == img.tobytes()
+
+
+def test_png_writer_refuses_a_wrong_row_count(tmp_path):
+    path = tmp_path / 'out.png'
+    img = noise_image('RGB', (8, 4))
+    png = tiled.PngWriter(str(path), img.size, 'RGB')
+    with pytest.raises(ValueError):
+        png.write_rows(img.tobytes() + img.tobytes())
+    png.write_rows(img.crop((0, 0, 8, 3)).tobytes())
+    with pytest.raises(ValueError):
+        png.close()
+    # nothing left behind, not even the temporary file
+    assert list(tmp_path.iterdir()) == []
+
+
+def figure(background):
+    s = Scene(width=150, height=101, background=background)
+    s.add(Group(name='backdrop').add(
+        Gradient(0, 0, 150, 101, (BG, CYAN), (0, 0), (0, 101)),
+        Glow(60, 50, 45, CORAL + (60,)),
+        Grain((255, 255, 255), 0.4, seed=3, density=0.02),
+    ))
+    s.add(Stripes(-100, 250, 20, -60, 0, 101, (20, 30, 40), width=2))
+    s.add(Rect(10, 12, 90, 70, radius=14, fill=CYAN + (120,), stroke=(255, 255, 255), width=2))
+    s.add(Ellipse(110, 60, 30, 35, fill=CORAL))
+    s.add(Line([(0, 100), (149, 0)], (255, 255, 255, 200), width=3))
+    s.add(Polygon([(120, 5), (145, 40), (95, 40)], fill=(200, 200, 90)))
+    return s
+
+
+@pytest.mark.parametrize('background', [BG, BG + (128,)], ids=['RGB', 'RGBA'])
+@pytest.mark.parametrize('scale', [1, 2])
+def test_tiled_render_matches_untiled(tmp_path, background, scale):
+    # 101 and 202 rows are not a multiple of the 16 row strips
+    s = figure(background)
+    path = tmp_path / 'tiled.png'
+    render_png_tiled(str(path), s, scale, tile_height=16)
+    frame = render_png(s, scale)
+    with Image.open(path) as decoded:
+        assert decoded.mode == frame.mode == ('RGB' if len(background) == 3 else 'RGBA')
+        assert decoded.size == frame.size and frame.height % 16
+        assert decoded.tobytes() == frame.tobytes()
+
+
+@pytest.fixture(scope='module')
+def generator_modules():
+    return {name: generators.load_generator(name) for name in generators.GENERATORS}
+
+
+def test_playbook_figures_tile_like_they_render(tmp_path, generator_modules):
+    module = generator_modules['playbook']
+    for _, w, h, kind in module.SPECS:
+        path = tmp_path / f'{kind}.png'
+        size = scale_size((w, h), 2)
+        tiled.render_tiled(str(path), size, module.BACKGROUNDS[kind],
+                           lambda strip, viewport: module.paint_spec(strip, kind, 2, viewport), tile_height=96)
+        with Image.open(path) as decoded:
+            assert decoded.tobytes() == module.render_spec(w, h, kind, 2).tobytes(), kind
+
+
+def test_things_figures_tile_like_they_render(tmp_path, generator_modules):
+    module = generator_modules['things']
+    for name, build_fn in module.FIGURES.items():
+        path = tmp_path / f'{name}.png'
+        s = build_fn()
+        render_png_tiled(str(path), s, 2, tile_height=96)
+        with Image.open(path) as decoded:
+            assert decoded.tobytes() == render_png(s, 2).tobytes(), name
@@ -1,164 +1,241 @@
-from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+from multiprocessing import resource_tracker, shared_memory
+import argparse
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from assetkit import (canvas, cards, encode, fonts, instrument, layers, pipeline, pyramid, shard, store, textlayout,
+                      tiled)
+from assetkit.hidpi import device_xy, scale_size, scaled_draw
+from assetkit.layers import Layer
+from assetkit.manifest import input_hash, package_files
+from assetkit.tag import stamp_tag
 
 OUT_DIR = os.path.dirname(__file__)
 
 # Try common fonts
-def load_font(size, bold=False):
-    candidates = [
-        "/Library/Fonts/Inter-Bold.ttf",
-        "/Library/Fonts/Arial Bold.ttf",
-        "/Library/Fonts/Arial.ttf",
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-    ]
-    for p in candidates:
-        try:
-            return ImageFont.truetype(p, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
+fonts.register('playbook', [
+    "/Library/Fonts/Inter-Bold.ttf",
+    "/Library/Fonts/Arial Bold.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+])
+
 
+def load_font(size, bold=False, scale=1):
+    return fonts.get_font('playbook', round(size*scale), bold)
 
-def rounded_rect(draw, xy, radius, fill):
-    x1,y1,x2,y2 = xy
-    draw.rectangle([x1+radius, y1, x2-radius, y2], fill=fill)
-    draw.rectangle([x1, y1+radius, x2, y2-radius], fill=fill)
-    # corners
-    draw.pieslice([x1, y1, x1+2*radius, y1+2*radius], 180, 270, fill=fill)
-    draw.pieslice([x2-2*radius, y1, x2, y1+2*radius], 270, 360, fill=fill)
-    draw.pieslice([x1, y2-2*radius, x1+2*radius, y2], 90, 180, fill=fill)
-    draw.pieslice([x2-2*radius, y2-2*radius, x2, y2], 0, 90, fill=fill)
 
+def draw_label(draw, xy, text, size, width, bold=False, scale=1, fill=(11,37,69), min_size=None):
+    # one line within width: stepped down towards min_size (3/4 of size by
+    # default), ellipsized below that; sizes are decided on the 1x font
+    if min_size is None:
+        min_size = size - size // 4
+    box = textlayout.fit(text, partial(load_font, bold=bold), size, width, max_lines=1, min_size=min_size)
+    textlayout.draw_layout(draw, xy, box, load_font(box.size, bold, scale), fill)
 
-def save_png(img, name):
+
+def write_png(data, name):
     path = os.path.join(OUT_DIR, name)
-    img.save(path)
+    with instrument.stage('write'):
+        store.replace_file(path, data)
     print('WROTE', path)
 
 
-def draw_cover(img, title=True):
-    w,h = img.size
-    draw = ImageDraw.Draw(img)
-    bg = (247,247,246)
+def draw_tag(img, xy, scale=1, viewport=None):
+    # cached sprite, composited over its own bounding box only
+    stamp_tag(img, device_xy(xy, scale, viewport), "Beto Dias", load_font(16, scale=scale), (11,37,69,153))
+
+
+def encode_outputs(img, name, profile=encode.PROFILES['default'], report=False, blob_store=None):
+    # [(file name, pixel key, data, digest)] for one frame plus its baseline
+    # size when reporting; with a blob store, data is None for encodings the
+    # store already holds. The serial and --jobs paths share this so both
+    # produce identical bytes
+    if blob_store is None:
+        files = [(fname, None, data, None) for fname,data in encode.encode_all(img, name, profile)]
+    else:
+        files = store.encode_outputs(blob_store, img, name, profile)
+    baseline = encode.baseline_size(img) if report else None
+    return files, baseline
+
+
+def write_outputs(files, blob_store=None):
+    # [(file name, size)] as written
+    if blob_store is None:
+        for fname,_,data,_ in files:
+            write_png(data, fname)
+        return [(fname, len(data)) for fname,_,data,_ in files]
+    written = store.store_outputs(blob_store, files, OUT_DIR)
+    for fname,_ in written:
+        print('WROTE', os.path.join(OUT_DIR, fname))
+    return written
+
+
+def report(name, baseline, sizes):
+    print(encode.report_line(os.path.join(OUT_DIR, name), baseline, sizes))
+
+
+def write_encoded(name, blob_store, encoded):
+    files, baseline = encoded
+    written = write_outputs(files, blob_store)
+    if baseline is not None:
+        report(name, baseline, written)
+
+
+def save_png(img, name, profile=encode.PROFILES['default'], report_sizes=False, blob_store=None, pipe=None):
+    # with a pipeline the frame is encoded and written on its threads while
+    # the next one is drawn
+    encode_frame = partial(encode_outputs, img, name, profile, report_sizes, blob_store)
+    write_frame = partial(write_encoded, name, blob_store)
+    if pipe is None:
+        write_frame(encode_frame())
+    else:
+        pipe.put(encode_frame, write_frame)
+
+
+COVER_TITLE = "The New Builder Playbook for AI First Development"
+COVER_SUBTITLE = "How to push and thrive as one new builder"
+
+
+def draw_cover_background(img, scale=1, viewport=None):
+    draw = scaled_draw(img, scale, viewport)
     cyan = (0,211,255)
     coral = (255,111,97)
-    navy = (11,37,69)
 
     # background already filled
     # muted rectangle
-    rounded_rect(draw, (64,64,64+420,64+420), 24, (11,37,69,20))
+    draw.rounded_rectangle((64,64,64+420,64+420), 24, fill=(11,37,69,20))
     # circle
     draw.ellipse((980-84,160-84,980+84,160+84), fill=cyan)
     # coral rect
-    rounded_rect(draw, (840,360,840+220,360+120), 12, coral)
+    draw.rounded_rectangle((840,360,840+220,360+120), 12, fill=coral)
     # frame line
     draw.rectangle((120,110,120+720,110+420), outline=(230,238,247))
 
+
+def draw_cover_title(img, title=COVER_TITLE, subtitle=COVER_SUBTITLE, scale=1, viewport=None):
+    draw = scaled_draw(img, scale, viewport)
+    cyan = (0,211,255)
+    coral = (255,111,97)
+    navy = (11,37,69)
+    draw_label(draw, (96,220), title, 40, 1200-2*96, bold=True, scale=scale, fill=navy)
+    if subtitle:
+        draw_label(draw, (96,260), subtitle, 18, 1200-2*96, scale=scale, fill=navy)
+    draw.rectangle((96,300,96+280,300+8), fill=cyan)
+    draw.rectangle((392,300,392+140,300+8), fill=coral)
+
+
+def cover_layers(title=COVER_TITLE, subtitle=COVER_SUBTITLE, scale=1, viewport=None):
+    # background is shared by every cover variant (and every card rendered
+    # from the cover template); title and tag are cheap and sit on top, so
+    # only the background frame is worth caching. No title, no title layer
+    def tag_layer(img):
+        h = scaled_draw(img, scale, viewport).size[1]
+        draw_tag(img, (24,h-24), scale, viewport)
+
+    # keyed by the drawing code, so a long-lived process (the render daemon)
+    # never resumes from a background painted by an older version of it
+    background = (draw_cover_background.__code__,)
+    layers = [Layer('background', background, partial(draw_cover_background, scale=scale, viewport=viewport))]
     if title:
-        f_title = load_font(40,bold=True)
-        f_sub = load_font(18)
-        draw.text((96,220), "The New Builder Playbook for AI First Development", font=f_title, fill=navy)
-        draw.text((96,260), "How to push and thrive as one new builder", font=f_sub, fill=navy)
-        draw.rectangle((96,300,96+280,300+8), fill=cyan)
-        draw.rectangle((392,300,392+140,300+8), fill=coral)
-    # tag
-    f_tag = load_font(16)
-    tag_col = (11,37,69,153)
-    tag_img = Image.new('RGBA', img.size, (0,0,0,0))
-    tdraw = ImageDraw.Draw(tag_img)
-    tdraw.text((24,h-24), "Beto Dias", font=f_tag, fill=tag_col)
-    img.alpha_composite(tag_img)
+        layers.append(Layer('title', (title, subtitle),
+                            partial(draw_cover_title, title=title, subtitle=subtitle, scale=scale, viewport=viewport),
+                            cache=False))
+    layers.append(Layer('tag', 'Beto Dias', tag_layer, cache=False))
+    return layers
 
 
-def draw_diagram(img):
-    w,h = img.size
-    draw = ImageDraw.Draw(img)
+def draw_cover(img, title=COVER_TITLE, subtitle=COVER_SUBTITLE, scale=1, viewport=None):
+    for layer in cover_layers(title, subtitle, scale, viewport):
+        layer.paint(img)
+
+
+def draw_diagram(img, scale=1, viewport=None):
+    draw = scaled_draw(img, scale, viewport)
+    w,h = draw.size
     cyan = (0,211,255)
     coral = (255,111,97)
     navy = (11,37,69)
 
-    rounded_rect(draw, (80,140,80+300,140+160), 12, (11,37,69,15))
-    f_label = load_font(18,bold=True)
-    f_small = load_font(14)
-    draw.text((120,180), "Model-powered IDEs", font=f_label, fill=navy)
-    draw.text((120,208), "Code suggestions · LLM code actions", font=f_small, fill=navy)
+    draw.rounded_rectangle((80,140,80+300,140+160), 12, fill=(11,37,69,15))
+    f_small = load_font(14, scale=scale)
+    # labels run from their x to 16px short of the box's right edge
+    draw_label(draw, (120,180), "Model-powered IDEs", 18, 380-16-120, bold=True, scale=scale, fill=navy)
+    draw_label(draw, (120,208), "Code suggestions · LLM code actions", 14, 380-16-120, scale=scale, fill=navy)
 
-    rounded_rect(draw, (460,80,460+280,80+240), 12, (11,37,69,15))
-    draw.text((500,140), "Agent Loop", font=f_label, fill=navy)
-    draw.text((500,168), "Plan → Act → Observe", font=f_small, fill=navy)
+    draw.rounded_rectangle((460,80,460+280,80+240), 12, fill=(11,37,69,15))
+    draw_label(draw, (500,140), "Agent Loop", 18, 740-16-500, bold=True, scale=scale, fill=navy)
+    draw_label(draw, (500,168), "Plan → Act → Observe", 14, 740-16-500, scale=scale, fill=navy)
     draw.ellipse((600-46,240-46,600+46,240+46), fill=(0,211,255,32))
 
-    rounded_rect(draw, (820,140,820+300,140+160), 12, (11,37,69,15))
-    draw.text((860,180), "Publishing & Measurement", font=f_label, fill=navy)
-    draw.text((860,208), "Metrics · A/B · Telemetry", font=f_small, fill=navy)
+    draw.rounded_rectangle((820,140,820+300,140+160), 12, fill=(11,37,69,15))
+    draw_label(draw, (860,180), "Publishing & Measurement", 18, 1120-16-860, bold=True, scale=scale, fill=navy)
+    draw_label(draw, (860,208), "Metrics · A/B · Telemetry", 14, 1120-16-860, scale=scale, fill=navy)
 
     # arrows
     draw.line((380,220,460,220), fill=cyan, width=6)
     draw.line((740,220,820,220), fill=cyan, width=6)
 
     # supporting icons
-    rounded_rect(draw, (120,340,120+120,340+80), 8, (0,211,255,32))
+    draw.rounded_rectangle((120,340,120+120,340+80), 8, fill=(0,211,255,32))
     draw.text((140,387), "Data", font=f_small, fill=navy)
-    rounded_rect(draw, (460,360,460+120,360+80), 8, (255,111,97,32))
+    draw.rounded_rectangle((460,360,460+120,360+80), 8, fill=(255,111,97,32))
     draw.text((480,407), "Tools", font=f_small, fill=navy)
 
     # tag
-    f_tag = load_font(16)
-    t_img = Image.new('RGBA', img.size, (0,0,0,0))
-    td = ImageDraw.Draw(t_img)
-    td.text((24,h-20), "Beto Dias", font=f_tag, fill=(11,37,69,153))
-    img.alpha_composite(t_img)
+    draw_tag(img, (24,h-20), scale, viewport)
+
 
+ACTION_LIST_TITLE = "Quick Actions"
+ACTION_LIST_ITEMS = [
+    "Sketch problem & core metric",
+    "Build a small model-in-the-loop prototype",
+    "Automate tests and checks",
+    "Measure, iterate, ship",
+]
 
-def draw_action_list(img):
-    w,h = img.size
-    draw = ImageDraw.Draw(img)
+
+def draw_action_list(img, scale=1, viewport=None, title=ACTION_LIST_TITLE, items=ACTION_LIST_ITEMS):
+    draw = scaled_draw(img, scale, viewport)
+    w,h = draw.size
     cyan = (0,211,255)
     navy = (11,37,69)
-    f_title = load_font(34,bold=True)
-    f_item = load_font(20)
-    draw.text((96,96), "Quick Actions", font=f_title, fill=navy)
-    items = [
-        "Sketch problem & core metric",
-        "Build a small model-in-the-loop prototype",
-        "Automate tests and checks",
-        "Measure, iterate, ship",
-    ]
+    # title and items fitted to one line each, up to six items
+    draw_label(draw, (96,96), title, 34, 1200-2*96, bold=True, scale=scale, fill=navy)
     y = 140
-    for it in items:
+    for it in items[:6]:
         draw.ellipse((96, y, 96+36, y+36), fill=cyan)
-        draw.text((150, y+8), it, font=f_item, fill=navy)
+        draw_label(draw, (150, y+8), it, 20, 760-24-150, scale=scale, fill=navy)
         y += 56
-    rounded_rect(draw, (760,120,760+320,120+320), 20, (0,211,255,20))
-    f_tag = load_font(16)
-    t_img = Image.new('RGBA', img.size, (0,0,0,0))
-    td = ImageDraw.Draw(t_img)
-    td.text((24,h-24), "Beto Dias", font=f_tag, fill=(11,37,69,153))
-    img.alpha_composite(t_img)
+    draw.rounded_rectangle((760,120,760+320,120+320), 20, fill=(0,211,255,20))
+    draw_tag(img, (24,h-24), scale, viewport)
 
 
-def draw_action_agent(img):
-    w,h = img.size
-    draw = ImageDraw.Draw(img)
+def draw_action_agent(img, scale=1, viewport=None):
+    draw = scaled_draw(img, scale, viewport)
+    w,h = draw.size
     cyan = (0,211,255)
     coral = (255,111,97)
     navy = (11,37,69)
-    f_title = load_font(32,bold=True)
-    f_label = load_font(16,bold=True)
+    f_title = load_font(32, bold=True, scale=scale)
     draw.text((96,96), "Agent-assisted Builder Workflow", font=f_title, fill=navy)
 
-    rounded_rect(draw, (96,140,96+440,140+320), 12, (0,211,255,20))
-    draw.text((120,180), "Code", font=f_label, fill=navy)
-    draw.text((120,210), "Live suggestions · refactors", font=load_font(14), fill=navy)
+    draw.rounded_rectangle((96,140,96+440,140+320), 12, fill=(0,211,255,20))
+    draw_label(draw, (120,180), "Code", 16, 536-16-120, bold=True, scale=scale, fill=navy)
+    draw_label(draw, (120,210), "Live suggestions · refactors", 14, 536-16-120, scale=scale, fill=navy)
 
-    rounded_rect(draw, (560,200,560+280,200+180), 12, (255,111,97,20))
-    draw.text((584,240), "Tests", font=f_label, fill=navy)
-    draw.text((584,268), "Auto-checks · unit & integration", font=load_font(14), fill=navy)
+    draw.rounded_rectangle((560,200,560+280,200+180), 12, fill=(255,111,97,20))
+    draw_label(draw, (584,240), "Tests", 16, 840-16-584, bold=True, scale=scale, fill=navy)
+    draw_label(draw, (584,268), "Auto-checks · unit & integration", 14, 840-16-584, scale=scale, fill=navy)
 
-    rounded_rect(draw, (880,240,880+180,240+120), 12, (0,211,255,15))
-    draw.text((896,280), "Deploy", font=f_label, fill=navy)
-    draw.text((896,308), "Preview · Canary", font=load_font(14), fill=navy)
+    draw.rounded_rectangle((880,240,880+180,240+120), 12, fill=(0,211,255,15))
+    draw_label(draw, (896,280), "Deploy", 16, 1060-16-896, bold=True, scale=scale, fill=navy)
+    draw_label(draw, (896,308), "Preview · Canary", 14, 1060-16-896, scale=scale, fill=navy)
 
     # arrows
     draw.line((536,300,560,300), fill=cyan, width=6)
@@ -166,72 +243,361 @@ def draw_action_agent(img):
 
     # assistant avatar
     draw.ellipse((520-28,380-28,520+28,380+28), fill=(0,211,255,36))
-    draw.text((556,386), "Agent", font=load_font(14), fill=navy)
+    draw.text((556,386), "Agent", font=load_font(14, scale=scale), fill=navy)
 
-    f_tag = load_font(16)
-    t_img = Image.new('RGBA', img.size, (0,0,0,0))
-    td = ImageDraw.Draw(t_img)
-    td.text((24,h-24), "Beto Dias", font=f_tag, fill=(11,37,69,153))
-    img.alpha_composite(t_img)
+    draw_tag(img, (24,h-24), scale, viewport)
 
 
-def draw_action_endstate(img):
-    w,h = img.size
-    draw = ImageDraw.Draw(img)
-    cyan = (0,211,255)
-    coral = (255,111,97)
-    navy = (11,37,69)
-    draw.text((96,96), "End States", font=load_font(34,bold=True), fill=navy)
-    # three boxes
-    rounded_rect(draw, (96,140,96+320,140+120), 12, (0,211,255,20))
-    draw.text((120,184), "Speed", font=load_font(20,bold=True), fill=navy)
-    draw.text((120,216), "Faster experiments & shipping", font=load_font(14), fill=navy)
-
-    rounded_rect(draw, (456,140,456+320,140+120), 12, (255,111,97,20))
-    draw.text((480,184), "Quality", font=load_font(20,bold=True), fill=navy)
-    draw.text((480,216), "More reliable outputs", font=load_font(14), fill=navy)
+ACTION_ENDSTATE_TITLE = "End States"
+ACTION_ENDSTATE_BOXES = [
+    ("Speed", "Faster experiments & shipping"),
+    ("Quality", "More reliable outputs"),
+    ("Collaboration", "Shared context & workflows"),
+]
 
-    rounded_rect(draw, (816,140,816+320,140+120), 12, (11,37,69,15))
-    draw.text((840,184), "Collaboration", font=load_font(20,bold=True), fill=navy)
-    draw.text((840,216), "Shared context & workflows", font=load_font(14), fill=navy)
 
-    f_tag = load_font(16)
-    t_img = Image.new('RGBA', img.size, (0,0,0,0))
-    td = ImageDraw.Draw(t_img)
-    td.text((24,h-24), "Beto Dias", font=f_tag, fill=(11,37,69,153))
-    img.alpha_composite(t_img)
+def draw_action_endstate(img, scale=1, viewport=None, title=ACTION_ENDSTATE_TITLE, boxes=ACTION_ENDSTATE_BOXES):
+    draw = scaled_draw(img, scale, viewport)
+    w,h = draw.size
+    navy = (11,37,69)
+    draw_label(draw, (96,96), title, 34, 1200-2*96, bold=True, scale=scale, fill=navy)
+    # up to three boxes
+    fills = [(0,211,255,20), (255,111,97,20), (11,37,69,15)]
+    for x,fill,(label,detail) in zip((96, 456, 816), fills, boxes):
+        draw.rounded_rectangle((x,140,x+320,140+120), 12, fill=fill)
+        draw_label(draw, (x+24,184), label, 20, 320-16-24, bold=True, scale=scale, fill=navy)
+        draw_label(draw, (x+24,216), detail, 14, 320-16-24, scale=scale, fill=navy)
+
+    draw_tag(img, (24,h-24), scale, viewport)
+
+
+SPECS = [
+    ('cover.png', 1200, 630, 'cover'),
+    ('cover_notitle.png', 1200, 630, 'cover_notitle'),
+    ('diagram_flow.png', 1200, 800, 'diagram'),
+    ('action_list.png', 1200, 630, 'action_list'),
+    ('action_agent.png', 1200, 630, 'action_agent'),
+    ('action_endstate.png', 1200, 630, 'action_endstate'),
+]
+
+HIDPI_SCALES = (2,)
+
+# print / social exports at this scale and above are rendered in strips and
+# streamed to disk (see assetkit/tiled.py) instead of held as one frame
+TILE_FROM = 4
+
+BACKGROUNDS = {
+    'cover': (247,247,246),
+    'cover_notitle': (247,247,246),
+    'diagram': (251,251,250),
+    'action_list': (251,251,250),
+    'action_agent': (248,248,247),
+    'action_endstate': (251,251,251),
+}
+
+
+# the text each spec kind is drawn with unless a template card passes its
+# own (see templates()); hashed into the build manifest with the draw code
+SPEC_FIELDS = {
+    'cover': {'title': COVER_TITLE, 'subtitle': COVER_SUBTITLE},
+    'cover_notitle': {'title': None},
+    'action_list': {'title': ACTION_LIST_TITLE, 'items': ACTION_LIST_ITEMS},
+    'action_endstate': {'title': ACTION_ENDSTATE_TITLE, 'boxes': ACTION_ENDSTATE_BOXES},
+}
+
+
+def spec_fields(kind, fields=None):
+    return {**SPEC_FIELDS.get(kind, {}), **(fields or {})}
+
+
+def paint_spec(img, kind, scale=1, viewport=None, **fields):
+    fields = spec_fields(kind, fields)
+    if kind in ('cover', 'cover_notitle'):
+        draw_cover(img, scale=scale, viewport=viewport, **fields)
+    elif kind == 'diagram':
+        draw_diagram(img, scale, viewport)
+    elif kind == 'action_list':
+        draw_action_list(img, scale, viewport, **fields)
+    elif kind == 'action_agent':
+        draw_action_agent(img, scale, viewport)
+    elif kind == 'action_endstate':
+        draw_action_endstate(img, scale, viewport, **fields)
+
+
+def render_spec(w, h, kind, scale=1, **fields):
+    size = scale_size((w,h), scale)
+    if kind in ('cover', 'cover_notitle'):
+        # title and no-title covers resume from the same cached background
+        return layers.cache.render(size, BACKGROUNDS[kind], cover_layers(scale=scale, **spec_fields(kind, fields)))
+    img = canvas.new_canvas(size, BACKGROUNDS[kind])
+    with instrument.stage('draw'):
+        paint_spec(img, kind, scale, **fields)
+    return img
+
+
+def render_spec_tiled(spec, name, scale, profile=encode.PROFILES['default']):
+    # strips bypass the layer cache and the encoder profile's palette and
+    # siblings; only the zlib level carries over to the streamed PNG
+    _,w,h,kind = spec
+    def paint(canvas, viewport):
+        paint_spec(canvas, kind, scale, viewport)
+    path = os.path.join(OUT_DIR, name)
+    tiled.render_tiled(path, scale_size((w,h), scale), BACKGROUNDS[kind], paint,
+                 compress_level=profile.compress_level)
+    return path
+
+
+def figures():
+    # importable render functions, figure name -> render(scale) -> frame;
+    # the benchmark and the render daemon call these instead of main()
+    return {name[:-4]: partial(render_spec, w, h, kind) for name,w,h,kind in SPECS}
+
+
+def templates():
+    # bulk card templates (python -m assetkit.cards): the figures whose text
+    # comes from a feed row, with the fields each one takes
+    return {
+        'cover': cards.Template(partial(render_spec, 1200, 630, 'cover'),
+                                title=cards.Field(), subtitle=cards.Field(default='')),
+        'action_list': cards.Template(partial(render_spec, 1200, 630, 'action_list'),
+                                      title=cards.Field(), items=cards.Field(cards.LIST, min_items=1, max_items=6)),
+        'action_endstate': cards.Template(partial(render_spec, 1200, 630, 'action_endstate'),
+                                          title=cards.Field(),
+                                          boxes=cards.Field(cards.PAIRS, min_items=1, max_items=3)),
+    }
+
+
+# draw code behind each spec kind, hashed into the build manifest
+KIND_DRAW = {
+    'cover': [draw_cover, draw_cover_background, draw_cover_title, cover_layers, draw_label],
+    'cover_notitle': [draw_cover, draw_cover_background, cover_layers],
+    'diagram': [draw_diagram, draw_label],
+    'action_list': [draw_action_list, draw_label],
+    'action_agent': [draw_action_agent, draw_label],
+    'action_endstate': [draw_action_endstate, draw_label],
+}
+
+
+def spec_outputs(spec, scales=HIDPI_SCALES):
+    # (file name, scale) for the 1x frame plus one natively drawn frame per
+    # hi-DPI scale (name@2x.png, name@3x.png, ...)
+    name = spec[0]
+    return [(name, 1)] + [(name.replace('.png', f'@{scale}x.png'), scale) for scale in scales]
+
+
+def output_hash(spec, scale, profile=encode.PROFILES['default'], tile=False, width=None):
+    # width: a srcset output derived from the frame drawn at scale
+    name,w,h,kind = spec
+    code = KIND_DRAW[kind] + [render_spec, paint_spec, load_font, draw_tag]
+    extra = profile.key() + (sorted(spec_fields(kind).items()), BACKGROUNDS[kind])
+    if tile:
+        code = code + [render_spec_tiled]
+        extra = extra + ('tiled',)
+    if width is not None:
+        extra = extra + ('srcset', width)
+    return input_hash(name, (w,h), scale, extra=extra, code=code, code_files=package_files(),
+                      font_files=fonts.font_files('playbook'))
+
+
+def render_outputs(spec, outputs, tile_from=TILE_FROM, profile=encode.PROFILES['default'], widths=()):
+    # (name, frame) per output, or (name, None) once a tiled output has been
+    # streamed to disk; frames are rendered lazily so only one is alive. The
+    # instrumentation record stays open while the caller encodes and writes
+    # the frame, until the next one is asked for. The srcset widths come
+    # last, from one frame at their render scale: the hi-DPI frame of that
+    # scale when it was just drawn
+    name,w,h,kind = spec
+    top_scale = pyramid.render_scale(w, widths) if widths else None
+    top = None
+    for out,scale in outputs:
+        with instrument.asset(out, scale=scale, kind=kind, tiled=scale >= tile_from):
+            if scale >= tile_from:
+                render_spec_tiled(spec, out, scale, profile)
+                yield out, None
+            else:
+                img = render_spec(w, h, kind, scale)
+                if scale == top_scale:
+                    top = img
+                yield out, img
+                del img
+    if widths:
+        with instrument.asset(os.path.splitext(name)[0] + '-srcset', scale=top_scale, kind=kind, widths=widths):
+            if top is None:
+                top = render_spec(w, h, kind, top_scale)
+            frames = pyramid.pyramid(top, widths)
+            del top
+        for width,img in frames:
+            yield pyramid.width_name(name, width), img
+
+
+def parent_owned_block(size):
+    # shared memory the parent unlinks once written, so the worker's resource
+    # tracker must not unlink it when the worker exits: created untracked
+    # where SharedMemory supports it (3.13+), otherwise unregistered under the
+    # name POSIX shm_open() was given
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    if os.name == 'posix':
+        resource_tracker.unregister('/' + shm.name, 'shared_memory')
+    return shm
+
+
+def render_job(spec, outputs, profile=encode.PROFILES['default'], report_sizes=False, tile_from=TILE_FROM,
+               store_root=None, widths=()):
+    # worker side of --jobs: encode every output of the spec into one shared
+    # memory block and hand back only its name, the (name, offset, size,
+    # pixel key, digest) layout and, when reporting, (name, baseline size,
+    # file count) per frame. Tiled outputs are written by the worker itself
+    # and come back with a file count of 0. The worker only reads the blob
+    # store; the parent puts and links
+    blob_store = store.BlobStore(store_root) if store_root else None
+    files = []
+    reports = []
+    for name,img in render_outputs(spec, outputs, tile_from, profile, widths):
+        if img is None:
+            reports.append((name, None, 0))
+            continue
+        encoded, baseline = encode_outputs(img, name, profile, report_sizes, blob_store)
+        files.extend(encoded)
+        reports.append((name, baseline, len(encoded)))
+    shm = parent_owned_block(max(1, sum(len(f[2] or b'') for f in files)))
+    layout = []
+    offset = 0
+    for name,pkey,data,digest in files:
+        data = data or b''
+        shm.buf[offset:offset+len(data)] = data
+        layout.append((name, offset, len(data), pkey, digest))
+        offset += len(data)
+    shm.close()
+    return shm.name, layout, reports
+
+
+def write_job(shm_name, layout, reports, blob_store=None):
+    # with instrumentation on, the parent adds a second record per asset
+    # holding only its write stage
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        entries = iter(layout)
+        for name,baseline,count in reports:
+            if count == 0:
+                print('WROTE', os.path.join(OUT_DIR, name))
+                continue
+            files = []
+            for fname,offset,size,pkey,digest in [next(entries) for _ in range(count)]:
+                data = None if digest is not None else bytes(shm.buf[offset:offset+size])
+                files.append((fname, pkey, data, digest))
+            with instrument.asset(name):
+                written = write_outputs(files, blob_store)
+            if baseline is not None:
+                report(name, baseline, written)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the playbook figures.')
+    parser.add_argument('--jobs', type=pipeline.parse_jobs, default=1,
+                        help='render specs in N worker processes (0 = one per core)')
+    parser.add_argument('--scales', default=','.join(str(s) for s in HIDPI_SCALES),
+                        help='comma-separated hi-DPI scales drawn next to each 1x asset, e.g. 2,3')
+    parser.add_argument('--encoders', type=int, default=pipeline.DEFAULT_ENCODERS,
+                        help='encode frames on N threads while the next one is drawn (0 = inline)')
+    parser.add_argument('--tile-from', type=int, default=TILE_FROM,
+                        help='render scales >= N in strips streamed to disk (bounded memory for 4x/8x exports)')
+    parser.add_argument('--srcset', default='',
+                        help='comma-separated responsive widths, e.g. 320,640,960,1200,1600,2400: drawn once '
+                             'at the scale covering the widest, written as name-<width>w.png and listed '
+                             'in srcset.json')
+    parser.add_argument('--force', action='store_true',
+                        help='re-render every asset even if its build manifest entry is current')
+    parser.add_argument('--profile', choices=sorted(encode.PROFILES), default='default',
+                        help='encoder profile: dev (fast zlib), release (palette + max compression)')
+    parser.add_argument('--siblings', default=None,
+                        help='comma-separated extra formats written next to each PNG: webp,avif')
+    parser.add_argument('--report', action='store_true',
+                        help='print bytes saved per asset against a bare 32-bit PNG save')
+    parser.add_argument('--instrument', metavar='PATH', default=None,
+                        help="append per-asset stage timings as JSON lines to PATH ('-' for stderr)")
+    parser.add_argument('--pstats', metavar='PATH', default=None,
+                        help='dump cProfile stats of the render to PATH (implies --instrument -)')
+    parser.add_argument('--store', nargs='?', const=store.DEFAULT_ROOT, default=None, metavar='DIR',
+                        help='keep encodings in the content-addressed store (default assets/.store) '
+                             'and hardlink the outputs to it; frames stored before are not re-encoded')
+    shard.add_argument(parser)
+    args = parser.parse_args(argv)
+    if args.instrument or args.pstats:
+        instrument.enable(args.instrument or '-', args.pstats)
+    scales = tuple(int(s) for s in args.scales.split(',') if s)
+    siblings = None if args.siblings is None else tuple(f for f in args.siblings.split(',') if f)
+    profile = encode.get_profile(args.profile, siblings)
+    blob_store = store.BlobStore(args.store) if args.store else None
+
+    srcset_widths = pyramid.parse_widths(args.srcset)
+    srcset = pyramid.SrcsetManifest(OUT_DIR) if srcset_widths else None
+
+    manifest = shard.open_manifest(OUT_DIR, args.shard, args.force)
+    todo = []
+    for spec in SPECS:
+        outputs = []
+        for name,scale in spec_outputs(spec, scales):
+            if not manifest.claim(name):
+                continue
+            digest = output_hash(spec, scale, profile, scale >= args.tile_from)
+            if manifest.is_fresh(name, digest):
+                print('UNCHANGED', os.path.join(OUT_DIR, name))
+                continue
+            manifest.record(name, digest)
+            outputs.append((name, scale))
+        widths = []
+        if srcset_widths:
+            srcset.record(spec[0], srcset_widths)
+            top_scale = pyramid.render_scale(spec[1], srcset_widths)
+            for width in srcset_widths:
+                name = pyramid.width_name(spec[0], width)
+                if not manifest.claim(name):
+                    continue
+                digest = output_hash(spec, top_scale, profile, width=width)
+                if manifest.is_fresh(name, digest):
+                    print('UNCHANGED', os.path.join(OUT_DIR, name))
+                    continue
+                manifest.record(name, digest)
+                widths.append(width)
+        if outputs or widths:
+            todo.append((spec, outputs, widths))
+
+    jobs = args.jobs or os.cpu_count() or 1
+    if jobs == 1 or len(todo) < 2:
+        with pipeline.Pipeline(args.encoders) as pipe:
+            for spec,outputs,widths in todo:
+                for name,img in render_outputs(spec, outputs, args.tile_from, profile, widths):
+                    if img is None:
+                        pipe.put(None, partial(print, 'WROTE', os.path.join(OUT_DIR, name)))
+                    else:
+                        save_png(img, name, profile, args.report, blob_store, pipe)
+                    del img   # freed once encoded, not after the next draw
+    else:
+        # workers append to the same JSON lines file; cProfile only covers
+        # the parent
+        initializer = instrument.enable if instrument.enabled() else None
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo)), initializer=initializer,
+                                 initargs=(args.instrument or '-',)) as pool:
+            # map() yields in submission order, so WROTE lines stay in spec order
+            specs, outputs, widths = zip(*todo)
+            results = pool.map(render_job, specs, outputs, repeat(profile), repeat(args.report),
+                               repeat(args.tile_from), repeat(args.store), widths)
+            for shm_name,layout,reports in results:
+                write_job(shm_name, layout, reports, blob_store)
+
+    if blob_store is not None:
+        blob_store.save()
+    if srcset is not None:
+        srcset.save()
+    manifest.save()
+    instrument.disable()
+    print('Done')
 
 
 if __name__ == '__main__':
-    specs = [
-        ('cover.png', 1200, 630, 'cover'),
-        ('cover_notitle.png', 1200, 630, 'cover_notitle'),
-        ('diagram_flow.png', 1200, 800, 'diagram'),
-        ('action_list.png', 1200, 630, 'action_list'),
-        ('action_agent.png', 1200, 630, 'action_agent'),
-        ('action_endstate.png', 1200, 630, 'action_endstate'),
-    ]
-    for name,w,h,kind in specs:
-        img = Image.new('RGBA', (w,h), (247,247,246))
-        if kind == 'cover':
-            draw_cover(img, title=True)
-        elif kind == 'cover_notitle':
-            draw_cover(img, title=False)
-        elif kind == 'diagram':
-            img = Image.new('RGBA', (w,h), (251,251,250))
-            draw_diagram(img)
-        elif kind == 'action_list':
-            img = Image.new('RGBA', (w,h), (251,251,250))
-            draw_action_list(img)
-        elif kind == 'action_agent':
-            img = Image.new('RGBA', (w,h), (248,248,247))
-            draw_action_agent(img)
-        elif kind == 'action_endstate':
-            img = Image.new('RGBA', (w,h), (251,251,251))
-            draw_action_endstate(img)
-        save_png(img, name)
-        # save @2x
-        hi = img.resize((w*2, h*2), Image.LANCZOS)
-        save_png(hi, name.replace('.png','@2x.png'))
-
-    print('Done')
+    main()
@@ -1,24 +1,31 @@
-from PIL import Image, ImageDraw, ImageFont
+import argparse
+import inspect
 import os
+import sys
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from assetkit import backgrounds, cards, encode, fonts, instrument, layers, pipeline, pyramid, shard, store
+from assetkit import svg as svgdoc
+from assetkit.manifest import input_hash, package_files
+from assetkit.scene import (Ellipse, Glow, Gradient, Grain, Group, Line, Polygon, Rect, Scene, Stripes, Tag, Text,
+                            TextBox, render_png, render_png_tiled, render_svg)
 
 OUT_DIR = os.path.join(os.path.dirname(__file__))
 # ensure directory
 os.makedirs(OUT_DIR, exist_ok=True)
 
 # Try to load a TTF font
-def get_font(size, bold=False):
-    possible = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        "/Library/Fonts/Arial.ttf",
-        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
-    ]
-    for p in possible:
-        try:
-            return ImageFont.truetype(p, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
+fonts.register('things', [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+])
+
+
+def get_font(size, bold=False, scale=1):
+    return fonts.get_font('things', round(size*scale), bold)
 
 # Colors (Neo-Minimal Startup)
 BG = (11,15,26)  # dark navy
@@ -27,320 +34,462 @@ CORAL = (255,107,107)  # soft coral
 WHITE = (245,247,250)
 TAG_FILL = (255,255,255,200)
 
+PALETTE = {'BG': BG, 'CYAN': CYAN, 'CORAL': CORAL, 'WHITE': WHITE, 'TAG_FILL': TAG_FILL}
+
 TAG_TEXT = "Beto Dias"
 
-# helper to draw bottom-left tag on image (Pillow)
-def draw_tag(draw, W, H):
+# every figure is built once as a scene and emitted to PNG and SVG from it;
+# PNGs go through the shared layer cache so variants reuse painted layers
+def new_scene(size):
+    W,H = size
+    return Scene(width=W, height=H, background=BG, font_family='things')
+
+# bottom-left tag (translucent rounded rect + name), stamped as a cached sprite
+def tag(W, H):
     font = get_font(16)
     padding = 16
-    text_w, text_h = draw.textbbox((0,0), TAG_TEXT, font=font)[2:]
+    text_h = font.getbbox(TAG_TEXT)[3]
     x = padding
     y = H - padding - text_h
-    # translucent rounded rect bg
-    rect_w = text_w + 12
-    rect_h = text_h + 8
-    rect = [x-6, y-4, x-6+rect_w, y-4+rect_h]
-    draw.rounded_rectangle(rect, radius=6, fill=(255,255,255,24))
-    draw.text((x, y), TAG_TEXT, font=font, fill=(255,255,255,200))
-
-# Save PNG and @2x versions
-
-def save_png_and_2x(img, name, size):
+    return Tag(x, y, TAG_TEXT, 16, TAG_FILL, background=(255,255,255,24), pad=(6,4), radius=6)
+
+# Save PNG and @2x versions, skipping any output whose build manifest entry
+# still matches its inputs; hi-DPI variants are drawn natively at `scale`
+
+class Build:
+    # per-run settings threaded through the save helpers
+    def __init__(self, manifest, profile=encode.PROFILES['default'], report=False, export_scales=(),
+                 blob_store=None, pipe=None, srcset=None, srcset_widths=(), minify_svg=True, svgz=False):
+        self.manifest = manifest
+        self.profile = profile
+        self.report = report
+        self.export_scales = export_scales
+        self.blob_store = blob_store
+        self.srcset = srcset
+        self.srcset_widths = srcset_widths
+        self.minify_svg = minify_svg
+        self.svgz = svgz
+        # encodes and writes frames while the next one is drawn
+        self.pipe = pipe if pipe is not None else pipeline.Pipeline(encoders=0)
+
+def build_args(build_fn, kwargs):
+    # the builder's arguments with its defaults filled in: the figure text
+    # lives in module constants, outside the builder's source
+    bound = inspect.signature(build_fn).bind(**kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+def asset_hash(name, build_fn, scale=1, encoding=None, **kwargs):
+    return input_hash(name, None, scale, code=[build_fn, new_scene, tag],
+                      code_files=package_files(), palette=PALETTE, font_files=fonts.font_files('things'),
+                      extra=[encoding, build_args(build_fn, kwargs)])
+
+def save_png(build, build_fn, name, scale=1, **kwargs):
     path = os.path.join(OUT_DIR, name)
-    img.save(path)
+    if not build.manifest.claim(name):
+        return path
+    digest = asset_hash(name, build_fn, scale, build.profile.key(), **kwargs)
+    if not build.manifest.is_fresh(name, digest):
+        with instrument.asset(name, scale=scale):
+            with instrument.stage('scene'):
+                fig = build_fn(**kwargs)
+            img = render_png(fig, scale, cache=layers.cache)
+            build.pipe.put(partial(encode_frame, build, img, name), partial(write_frame, build, path))
+        build.manifest.record(name, digest)
+    return path
+
+# encoder side: [(file name, pixel key, data, digest)] plus the baseline size
+# when reporting; data is None where the blob store already holds the encoding
+def encode_frame(build, img, name):
+    if build.blob_store is not None:
+        files = store.encode_outputs(build.blob_store, img, name, build.profile)
+    else:
+        files = [(fname, None, data, None) for fname,data in encode.encode_all(img, name, build.profile)]
+    return files, encode.baseline_size(img) if build.report else None
+
+def write_frame(build, path, encoded):
+    files, baseline = encoded
+    if build.blob_store is not None:
+        sizes = store.store_outputs(build.blob_store, files, OUT_DIR)
+    else:
+        for fname,_,data,_ in files:
+            with instrument.stage('write'):
+                store.replace_file(os.path.join(OUT_DIR, fname), data)
+        sizes = [(fname, len(data)) for fname,_,data,_ in files]
+    if baseline is not None:
+        print(encode.report_line(path, baseline, sizes))
+
+def save_png_tiled(build, build_fn, name, scale, **kwargs):
+    # print / social exports (@4x, @8x): streamed to disk strip by strip, so
+    # only the zlib level of the encoder profile applies
+    path = os.path.join(OUT_DIR, name)
+    if not build.manifest.claim(name):
+        return path
+    encoding = ('tiled', build.profile.compress_level)
+    digest = asset_hash(name, build_fn, scale, encoding, **kwargs)
+    if not build.manifest.is_fresh(name, digest):
+        with instrument.asset(name, scale=scale, tiled=True):
+            with instrument.stage('scene'):
+                fig = build_fn(**kwargs)
+            render_png_tiled(path, fig, scale, compress_level=build.profile.compress_level)
+        build.manifest.record(name, digest)
+    return path
+
+def save_srcset(build, build_fn, name, **kwargs):
+    # responsive widths (name-640w.png, ...) from one frame drawn at the
+    # scale covering the widest, see assetkit/pyramid.py
+    widths = build.srcset_widths
+    build.srcset.record(name, widths)
+    stale = []
+    for width in widths:
+        wname = pyramid.width_name(name, width)
+        if not build.manifest.claim(wname):
+            continue
+        digest = asset_hash(wname, build_fn, ('srcset', width), build.profile.key(),
+                            **kwargs)
+        if not build.manifest.is_fresh(wname, digest):
+            stale.append((width, wname, digest))
+    if not stale:
+        return
+    with instrument.asset(name.replace('.png', '-srcset'), widths=[w for w,_,_ in stale]):
+        with instrument.stage('scene'):
+            fig = build_fn(**kwargs)
+        top = render_png(fig, pyramid.render_scale(fig.width, widths), cache=layers.cache)
+        frames = dict(pyramid.pyramid(top, [w for w,_,_ in stale]))
+    for width,wname,digest in stale:
+        path = os.path.join(OUT_DIR, wname)
+        build.pipe.put(partial(encode_frame, build, frames.pop(width), wname), partial(write_frame, build, path))
+        build.manifest.record(wname, digest)
+
+def save_png_and_2x(build, build_fn, name, **kwargs):
+    path = save_png(build, build_fn, name, **kwargs)
     # @2x
-    w,h = size
-    img2 = img.resize((w*2, h*2), Image.LANCZOS)
-    path2 = os.path.join(OUT_DIR, name.replace('.png','@2x.png'))
-    img2.save(path2)
+    path2 = save_png(build, build_fn, name.replace('.png','@2x.png'), 2, **kwargs)
+    for scale in build.export_scales:
+        save_png_tiled(build, build_fn, name.replace('.png', f'@{scale}x.png'), scale, **kwargs)
+    if build.srcset_widths:
+        save_srcset(build, build_fn, name, **kwargs)
     return path, path2
 
+def save_svg(build, build_fn, name, **kwargs):
+    path = os.path.join(OUT_DIR, name)
+    if not build.manifest.claim(name):
+        return path
+    encoding = (build.minify_svg, build.svgz)
+    digest = asset_hash(name, build_fn, 'svg', encoding, **kwargs)
+    if not build.manifest.is_fresh(name, digest):
+        with instrument.asset(name):
+            with instrument.stage('scene'):
+                fig = build_fn(**kwargs)
+            with instrument.stage('draw'):
+                svg = render_svg(fig, minify=build.minify_svg)
+            build.pipe.put(partial(svgdoc.svgz, svg) if build.svgz else None, partial(write_svg, build, path, svg))
+        build.manifest.record(name, digest)
+    return path
+
+def write_svg(build, path, svg, svgz=None):
+    # svgz: the gzipped document, written next to the .svg as name.svgz
+    outputs = [(path, svg)] + ([(path + 'z', svgz)] if svgz is not None else [])
+    for out,data in outputs:
+        if build.blob_store is not None:
+            build.blob_store.link(build.blob_store.put(data), out)
+        else:
+            with instrument.stage('write'):
+                store.replace_file(out, data)
+
 # 1) cover_modern
-W,H = 1200,630
-cover = Image.new('RGBA',(W,H),BG)
-d = ImageDraw.Draw(cover)
-font_title = get_font(56)
-font_sub = get_font(22)
-
-# background geometric shapes
-for i,(x,y,w,h,angle,col) in enumerate([
-    (60,40,540,420,0,CYAN),
-    (520,90,640,420,0,CORAL),
-]):
-    for b in range(4):
-        bbox = [x-b*10, y-b*10, x+w+b*10, y+h+b*10]
-        d.rounded_rectangle(bbox, radius=40+b*4, outline=col)
-
-# diagonal accent lines
-for i in range(-400, W+400, 80):
-    d.line([(i,0),(i-200,H)], fill=(20,30,40), width=2)
-
-# Title
-title = "Things Are Moving Fast"
-subtitle = "Generative UI, MCP Apps, and the New Standards Race"
-
-d.text((80, H//2 - 60), title, font=font_title, fill=WHITE)
-d.text((80, H//2 - 6), subtitle, font=font_sub, fill=(220,224,229))
-
-# Tag
-draw_tag(d,W,H)
-
-# Save cover PNG and @2x
-cover_path, cover_2x = save_png_and_2x(cover, 'cover_modern.png', (W,H))
-
-# cover without title
-cover_notitle = cover.copy()
-# erase title area by redrawing background patterns roughly
-c = Image.new('RGBA',(W,H),BG)
-d2 = ImageDraw.Draw(c)
-for i,(x,y,w,h,angle,col) in enumerate([
-    (60,40,540,420,0,CYAN),
-    (520,90,640,420,0,CORAL),
-]):
-    for b in range(4):
-        bbox = [x-b*10, y-b*10, x+w+b*10, y+h+b*10]
-        d2.rounded_rectangle(bbox, radius=40+b*4, outline=col)
-for i in range(-400, W+400, 80):
-    d2.line([(i,0),(i-200,H)], fill=(20,30,40), width=2)
-# composite tag
-c_draw = ImageDraw.Draw(c)
-draw_tag(c_draw,W,H)
-cover_notitle.save(os.path.join(OUT_DIR,'cover_modern_notitle.png'))
-
-# SVG for cover
-svg_cover = f'''<svg width="1200" height="630" viewBox="0 0 1200 630" xmlns="http://www.w3.org/2000/svg">
-  <rect width="100%" height="100%" fill="#0b0f1a" />
-  <g fill="none" stroke="#00E5FF" stroke-width="3">
-    <rect x="60" y="40" width="540" height="420" rx="40"/>
-  </g>
-  <g fill="none" stroke="#FF6B6B" stroke-width="3">
-    <rect x="520" y="90" width="640" height="420" rx="40"/>
-  </g>
-  <text x="80" y="280" fill="#F5F7FA" font-family="Inter, Arial, sans-serif" font-size="48">Things Are Moving Fast</text>
-  <text x="80" y="320" fill="#DCE0E5" font-family="Inter, Arial, sans-serif" font-size="20">Generative UI, MCP Apps, and the New Standards Race</text>
-  <rect x="16" y="590" width="120" height="28" rx="6" fill="rgba(255,255,255,0.08)" />
-  <text x="24" y="610" fill="rgba(255,255,255,0.85)" font-family="Inter, Arial, sans-serif" font-size="16">Beto Dias</text>
-</svg>'''
-
-with open(os.path.join(OUT_DIR,'cover_modern.svg'),'w') as f:
-    f.write(svg_cover)
-
-# also save a @2x explicitly for cover (2400x1260) already created above as cover_modern@2x.png
-# But ensure path name matches desired: cover_modern@2x.png was created by save_png_and_2x
+COVER_SIZE = (1200,630)
+COVER_TITLE = "Things Are Moving Fast"
+COVER_SUBTITLE = "Generative UI, MCP Apps, and the New Standards Race"
+
+def build_cover_modern(title=COVER_TITLE, subtitle=COVER_SUBTITLE):
+    W,H = COVER_SIZE
+    s = new_scene(COVER_SIZE)
+
+    # backdrop: a faint cyan wash fading down into the navy, a glow behind
+    # each frame and a sparse dust of specks, all computed as arrays
+    # (assetkit/backgrounds.py); full grain would not compress
+    s.add(Group(name='backdrop').add(
+        Gradient(0, 0, W, H, (backgrounds.mix(BG, CYAN, 0.08), BG), (0,0), (0,H)),
+        Glow(330, 250, 280, CYAN + (40,)),
+        Glow(840, 300, 280, CORAL + (36,)),
+        Grain(WHITE, 0.35, seed=7, density=0.0015),
+    ))
+
+    # background geometric shapes
+    shapes = Group(name='shapes')
+    for i,(x,y,w,h,angle,col) in enumerate([
+        (60,40,540,420,0,CYAN),
+        (520,90,640,420,0,CORAL),
+    ]):
+        for b in range(4):
+            shapes.add(Rect(x-b*10, y-b*10, w+2*b*10, h+2*b*10, radius=40+b*4, stroke=col))
+    s.add(shapes)
+
+    # diagonal accent lines, rasterised as one stripe field
+    s.add(Group(name='accents').add(Stripes(-400, W+400, 80, -200, 0, H, (20,30,40), width=2)))
+
+    # Title (a falsy title leaves it out); one line each, shrunk to fit
+    if title:
+        s.add(Group(name='title', cache=False).add(
+            TextBox(80, H//2 - 60, W - 160, None, title, 56, WHITE, max_lines=1, min_size=40),
+            TextBox(80, H//2 - 6, W - 160, None, subtitle, 22, (220,224,229), max_lines=1, min_size=16),
+        ))
+
+    # Tag
+    return s.add(tag(W,H))
 
 # 2) diagram_flow (1200x800)
-W2,H2 = 1200,800
-img = Image.new('RGBA',(W2,H2),BG)
-di = ImageDraw.Draw(img)
-font_lbl = get_font(22)
-font_title = get_font(28)
-
-# boxes positions
-mx = 80
-my = 200
-bw = 240
-bh = 84
-gap = 60
-labels = ['Model','Generative UI\nRenderer','MCP Host','MCP Apps\n(composable modules)']
-boxes = []
-for i,lab in enumerate(labels):
-    x = mx + i*(bw+gap)
-    y = my
-    di.rounded_rectangle([x,y,x+bw,y+bh], radius=12, outline=WHITE, width=2)
-    # icon
-    icx = x+30
-    icy = y+bh//2
-    di.ellipse([icx-18,icy-18,icx+18,icy+18], outline=CYAN, width=3)
-    # text
-    di.multiline_text((x+70,y+10), lab, font=font_lbl, fill=WHITE, spacing=4)
-    boxes.append((x,y,bw,bh))
-
-# arrows
-for i in range(len(boxes)-1):
-    ax,ay,aw,ah = boxes[i]
-    bx,by,bw2,bh2 = boxes[i+1]
-    start = (ax+aw, ay+ah//2)
-    end = (bx, by+bh2//2)
-    di.line([start,end], fill=CYAN, width=4)
-    ex,ey = end
-    di.polygon([(ex,ey),(ex-12,ey-6),(ex-12,ey+6)], fill=CYAN)
-
-# Agent box above
-agent_x = mx + (bw+gap)
-agent_y = my - 180
-di.rounded_rectangle([agent_x,agent_y,agent_x+bw,agent_y+bh], radius=12, outline=WHITE, width=2)
-di.multiline_text((agent_x+70,agent_y+10), 'Agent (A2UI)\norchestrator', font=font_lbl, fill=WHITE)
-# arrows from agent to model and to MCP Apps
-start = (agent_x+10+bw//2, agent_y+bh)
-end1 = (boxes[0][0]+20, boxes[0][1]+boxes[0][3]//2)
-end2 = (boxes[-1][0]+boxes[-1][2]-10, boxes[-1][1]+boxes[-1][3]//2)
-di.line([start,end1], fill=CORAL, width=3)
-di.line([start,end2], fill=CORAL, width=3)
-
-# title
-di.text((mx, my-80), 'Architecture / Flow', font=font_title, fill=WHITE)
-
-# tag
-draw_tag(di,W2,H2)
-
-img.save(os.path.join(OUT_DIR,'diagram_flow.png'))
-# save @2x
-img.resize((W2*2,H2*2), Image.LANCZOS).save(os.path.join(OUT_DIR,'diagram_flow@2x.png'))
-
-# create simple SVG for diagram
-svg_diag = f'''<svg width="1200" height="800" viewBox="0 0 1200 800" xmlns="http://www.w3.org/2000/svg">
-  <rect width="100%" height="100%" fill="#0b0f1a" />
-  <text x="80" y="140" fill="#F5F7FA" font-family="Inter, Arial, sans-serif" font-size="28">Architecture / Flow</text>
-  <g stroke="#F5F7FA" fill="none" stroke-width="2">
-    <rect x="80" y="200" width="240" height="84" rx="12"/>
-    <rect x="380" y="200" width="240" height="84" rx="12"/>
-    <rect x="680" y="200" width="240" height="84" rx="12"/>
-    <rect x="980" y="200" width="240" height="84" rx="12"/>
-  </g>
-  <g fill="none" stroke="#00E5FF" stroke-width="4">
-    <path d="M320 242 L380 242" />
-    <path d="M620 242 L680 242" />
-    <path d="M920 242 L980 242" />
-  </g>
-  <rect x="320" y="20" width="240" height="84" rx="12" stroke="#F5F7FA" fill="none" />
-  <line x1="440" y1="104" x2="100" y2="242" stroke="#FF6B6B" stroke-width="3" />
-  <line x1="440" y1="104" x2="1120" y2="242" stroke="#FF6B6B" stroke-width="3" />
-  <rect x="16" y="760" width="120" height="28" rx="6" fill="rgba(255,255,255,0.08)" />
-  <text x="24" y="780" fill="rgba(255,255,255,0.85)" font-family="Inter, Arial, sans-serif" font-size="16">Beto Dias</text>
-</svg>'''
-
-with open(os.path.join(OUT_DIR,'diagram_flow.svg'),'w') as f:
-    f.write(svg_diag)
+DIAGRAM_SIZE = (1200,800)
+
+def build_diagram_flow():
+    W2,H2 = DIAGRAM_SIZE
+    s = new_scene(DIAGRAM_SIZE)
+
+    # boxes positions
+    mx = 80
+    my = 200
+    bw = 240
+    bh = 84
+    gap = 60
+    labels = ['Model','Generative UI Renderer','MCP Host','MCP Apps (composable modules)']
+    boxes = []
+    for i,lab in enumerate(labels):
+        x = mx + i*(bw+gap)
+        y = my
+        # box, icon and text
+        icx = x+30
+        icy = y+bh//2
+        s.add(
+            Rect(x, y, bw, bh, radius=12, stroke=WHITE, width=2),
+            Ellipse(icx, icy, 18, 18, stroke=CYAN, width=3),
+            TextBox(x+70, y+4, bw-76, bh-8, lab, 22, WHITE, valign='middle'),
+        )
+        boxes.append((x,y,bw,bh))
+
+    # arrows
+    for i in range(len(boxes)-1):
+        ax,ay,aw,ah = boxes[i]
+        bx,by,bw2,bh2 = boxes[i+1]
+        start = (ax+aw, ay+ah//2)
+        end = (bx, by+bh2//2)
+        ex,ey = end
+        s.add(
+            Line([start,end], CYAN, width=4),
+            Polygon([(ex,ey),(ex-12,ey-6),(ex-12,ey+6)], fill=CYAN),
+        )
+
+    # Agent box above
+    agent_x = mx + (bw+gap)
+    agent_y = my - 180
+    s.add(
+        Rect(agent_x, agent_y, bw, bh, radius=12, stroke=WHITE, width=2),
+        TextBox(agent_x+70, agent_y+4, bw-76, bh-8, 'Agent (A2UI) orchestrator', 22, WHITE, valign='middle'),
+    )
+    # arrows from agent to model and to MCP Apps
+    start = (agent_x+10+bw//2, agent_y+bh)
+    end1 = (boxes[0][0]+20, boxes[0][1]+boxes[0][3]//2)
+    end2 = (boxes[-1][0]+boxes[-1][2]-10, boxes[-1][1]+boxes[-1][3]//2)
+    s.add(
+        Line([start,end1], CORAL, width=3),
+        Line([start,end2], CORAL, width=3),
+    )
 
-# 3) action_list (1200x630) 3-panel
-W3,H3 = 1200,630
-al = Image.new('RGBA',(W3,H3),BG)
-d3 = ImageDraw.Draw(al)
-font_h = get_font(26)
-font_s = get_font(20)
-# three panels
-panel_w = (W3 - 4*40)//3
-px = 40
-for i,(title_txt, color) in enumerate([('Generate UI',CYAN),('Compose App',CORAL),('Deploy to Host',WHITE) ]):
-    x = px + i*(panel_w+40)
-    d3.rounded_rectangle([x,80,x+panel_w, H3-120], radius=16, outline=(255,255,255,24), width=2, fill=(0,0,0,0))
-    # icon circle
-    cx = x + 60
-    cy = 180
-    d3.ellipse([cx-34,cy-34,cx+34,cy+34], fill=color)
     # title
-    d3.text((x+120, cy-14), title_txt, font=font_h, fill=WHITE)
-    # short label
-    d3.text((x+40, cy+44), 'Quick actions to convert ideas into running interfaces', font=font_s, fill=(200,205,210))
-
-# tag
-draw_tag(d3,W3,H3)
-
-al.save(os.path.join(OUT_DIR,'action_list.png'))
-al.resize((W3*2,H3*2), Image.LANCZOS).save(os.path.join(OUT_DIR,'action_list@2x.png'))
-
-# svg for action_list
-svg_al = f'''<svg width="1200" height="630" viewBox="0 0 1200 630" xmlns="http://www.w3.org/2000/svg">
-  <rect width="100%" height="100%" fill="#0b0f1a" />
-  <g font-family="Inter, Arial, sans-serif">
-    <rect x="40" y="80" width="340" height="430" rx="16" stroke="rgba(255,255,255,0.09)" fill="none" />
-    <rect x="440" y="80" width="340" height="430" rx="16" stroke="rgba(255,255,255,0.09)" fill="none" />
-    <rect x="840" y="80" width="340" height="430" rx="16" stroke="rgba(255,255,255,0.09)" fill="none" />
-    <circle cx="100" cy="180" r="34" fill="#00E5FF" />
-    <text x="160" y="188" fill="#F5F7FA" font-size="26">Generate UI</text>
-    <circle cx="500" cy="180" r="34" fill="#FF6B6B" />
-    <text x="560" y="188" fill="#F5F7FA" font-size="26">Compose App</text>
-    <circle cx="900" cy="180" r="34" fill="#F5F7FA" />
-    <text x="960" y="188" fill="#F5F7FA" font-size="26">Deploy to Host</text>
-  </g>
-  <rect x="16" y="594" width="120" height="28" rx="6" fill="rgba(255,255,255,0.08)" />
-  <text x="24" y="614" fill="rgba(255,255,255,0.85)" font-family="Inter, Arial, sans-serif" font-size="16">Beto Dias</text>
-</svg>'''
-with open(os.path.join(OUT_DIR,'action_list.svg'),'w') as f:
-    f.write(svg_al)
+    s.add(Text(mx, my-80, 'Architecture / Flow', 28, WHITE))
+
+    # tag
+    return s.add(tag(W2,H2))
+
+# 3) action_list (1200x630) 3-panel
+ACTION_LIST_SIZE = (1200,630)
+ACTION_ITEMS = ['Generate UI', 'Compose App', 'Deploy to Host']
+ACTION_CAPTION = 'Quick actions to convert ideas into running interfaces'
+
+def build_action_list(items=ACTION_ITEMS, caption=ACTION_CAPTION):
+    W3,H3 = ACTION_LIST_SIZE
+    s = new_scene(ACTION_LIST_SIZE)
+    # up to three panels
+    panel_w = (W3 - 4*40)//3
+    px = 40
+    for i,(title_txt, color) in enumerate(zip(items[:3], [CYAN, CORAL, WHITE])):
+        x = px + i*(panel_w+40)
+        cx = x + 60
+        cy = 180
+        s.add(Group(name=f'panel-{i+1}').add(
+            Rect(x, 80, panel_w, H3-200, radius=16, stroke=(255,255,255,24), width=2, fill=(0,0,0,0)),
+            # icon circle
+            Ellipse(cx, cy, 34, 34, fill=color),
+            # title
+            TextBox(x+120, cy-14, panel_w-124, None, title_txt, 26, WHITE, max_lines=1, min_size=18),
+            # short label
+            TextBox(x+40, cy+44, panel_w-80, None, caption, 20, (200,205,210), max_lines=6),
+        ))
+
+    # tag
+    return s.add(tag(W3,H3))
 
 # 4) action_agent (split-screen)
-W4,H4 = 1200,630
-aa = Image.new('RGBA',(W4,H4),BG)
-d4 = ImageDraw.Draw(aa)
-# left half: A2UI agent orchestration
-d4.rectangle([0,0,W4//2,H4], fill=None, outline=None)
-d4.text((60,60), 'Model-driven Agents (A2UI)', font=get_font(30), fill=WHITE)
-d4.text((60,110), 'Autonomous orchestration, real-time rendering', font=get_font(18), fill=(200,205,210))
-# right half: MCP Apps
-d4.text((W4//2 + 60,60), 'MCP Apps', font=get_font(30), fill=WHITE)
-d4.text((W4//2 + 60,110), 'Composable app modules hosted by MCP', font=get_font(18), fill=(200,205,210))
-# divider
-d4.line([(W4//2,40),(W4//2,H4-40)], fill=(255,255,255,20), width=2)
-# small visuals
-# left: flow circles
-for i in range(4):
-    cx = 140 + i*60
-    cy = 260
-    d4.ellipse([cx-22,cy-22,cx+22,cy+22], outline=CYAN, width=3)
-    d4.line([(cx+22,cy),(cx+60,cy)], fill=CYAN, width=3)
-# right: module cards
-for i in range(3):
-    rx = W4//2 + 80
-    ry = 220 + i*90
-    d4.rounded_rectangle([rx,ry,rx+420,ry+64], radius=10, outline=WHITE, width=2)
-    d4.text((rx+16,ry+18), f'Module {i+1}', font=get_font(18), fill=WHITE)
-
-# tag
-draw_tag(d4,W4,H4)
-
-aa.save(os.path.join(OUT_DIR,'action_agent.png'))
-aa.resize((W4*2,H4*2), Image.LANCZOS).save(os.path.join(OUT_DIR,'action_agent@2x.png'))
-
-# svg for action_agent
-svg_agent = f'''<svg width="1200" height="630" viewBox="0 0 1200 630" xmlns="http://www.w3.org/2000/svg">
-  <rect width="100%" height="100%" fill="#0b0f1a" />
-  <line x1="600" y1="40" x2="600" y2="590" stroke="rgba(255,255,255,0.08)" stroke-width="2" />
-  <text x="60" y="60" fill="#F5F7FA" font-family="Inter, Arial, sans-serif" font-size="30">Model-driven Agents (A2UI)</text>
-  <text x="660" y="60" fill="#F5F7FA" font-family="Inter, Arial, sans-serif" font-size="30">MCP Apps</text>
-  <rect x="16" y="594" width="120" height="28" rx="6" fill="rgba(255,255,255,0.08)" />
-  <text x="24" y="614" fill="rgba(255,255,255,0.85)" font-family="Inter, Arial, sans-serif" font-size="16">Beto Dias</text>
-</svg>'''
-with open(os.path.join(OUT_DIR,'action_agent.svg'),'w') as f:
-    f.write(svg_agent)
+ACTION_AGENT_SIZE = (1200,630)
+
+def build_action_agent():
+    W4,H4 = ACTION_AGENT_SIZE
+    s = new_scene(ACTION_AGENT_SIZE)
+    # left half: A2UI agent orchestration
+    s.add(
+        Text(60, 60, 'Model-driven Agents (A2UI)', 30, WHITE),
+        Text(60, 110, 'Autonomous orchestration, real-time rendering', 18, (200,205,210)),
+    )
+    # right half: MCP Apps
+    s.add(
+        Text(W4//2 + 60, 60, 'MCP Apps', 30, WHITE),
+        Text(W4//2 + 60, 110, 'Composable app modules hosted by MCP', 18, (200,205,210)),
+    )
+    # divider
+    s.add(Line([(W4//2,40),(W4//2,H4-40)], (255,255,255,20), width=2))
+    # small visuals
+    # left: flow circles
+    for i in range(4):
+        cx = 140 + i*60
+        cy = 260
+        s.add(
+            Ellipse(cx, cy, 22, 22, stroke=CYAN, width=3),
+            Line([(cx+22,cy),(cx+60,cy)], CYAN, width=3),
+        )
+    # right: module cards
+    for i in range(3):
+        rx = W4//2 + 80
+        ry = 220 + i*90
+        s.add(
+            Rect(rx, ry, 420, 64, radius=10, stroke=WHITE, width=2),
+            Text(rx+16, ry+18, f'Module {i+1}', 18, WHITE),
+        )
+
+    # tag
+    return s.add(tag(W4,H4))
 
 # 5) action_endstate (metrics)
-W5,H5 = 1200,630
-es = Image.new('RGBA',(W5,H5),BG)
-d5 = ImageDraw.Draw(es)
-# three metric cards
-mx = 80
-for i,(label,val) in enumerate([('Speed','+3.2x'),('Conversions','+18%'),('Automation','>70%')]):
-    x = mx + i*360
-    d5.rounded_rectangle([x,120,x+320,360], radius=12, outline=WHITE, width=2)
-    d5.text((x+24,160), val, font=get_font(44), fill=CYAN)
-    d5.text((x+24,220), label, font=get_font(20), fill=(200,205,210))
-# small description
-d5.text((80,420), 'Tangible business outcomes from combining Generative UI and composable apps', font=get_font(20), fill=(200,205,210))
-
-# tag
-draw_tag(d5,W5,H5)
-
-es.save(os.path.join(OUT_DIR,'action_endstate.png'))
-es.resize((W5*2,H5*2), Image.LANCZOS).save(os.path.join(OUT_DIR,'action_endstate@2x.png'))
-
-svg_es = f'''<svg width="1200" height="630" viewBox="0 0 1200 630" xmlns="http://www.w3.org/2000/svg">
-  <rect width="100%" height="100%" fill="#0b0f1a" />
-  <g font-family="Inter, Arial, sans-serif">
-    <rect x="80" y="120" width="320" height="240" rx="12" stroke="#F5F7FA" fill="none" />
-    <rect x="440" y="120" width="320" height="240" rx="12" stroke="#F5F7FA" fill="none" />
-    <rect x="800" y="120" width="320" height="240" rx="12" stroke="#F5F7FA" fill="none" />
-    <text x="104" y="180" fill="#00E5FF" font-size="44">+3.2x</text>
-    <text x="104" y="230" fill="#F5F7FA" font-size="20">Speed</text>
-    <text x="464" y="180" fill="#00E5FF" font-size="44">+18%</text>
-    <text x="464" y="230" fill="#F5F7FA" font-size="20">Conversions</text>
-    <text x="824" y="180" fill="#00E5FF" font-size="44">>70%</text>
-    <text x="824" y="230" fill="#F5F7FA" font-size="20">Automation</text>
-  </g>
-  <rect x="16" y="594" width="120" height="28" rx="6" fill="rgba(255,255,255,0.08)" />
-  <text x="24" y="614" fill="rgba(255,255,255,0.85)" font-family="Inter, Arial, sans-serif" font-size="16">Beto Dias</text>
-</svg>'''
-with open(os.path.join(OUT_DIR,'action_endstate.svg'),'w') as f:
-    f.write(svg_es)
-
-print('Generated assets in', OUT_DIR)
+ACTION_ENDSTATE_SIZE = (1200,630)
+ENDSTATE_METRICS = [('Speed','+3.2x'), ('Conversions','+18%'), ('Automation','>70%')]
+ENDSTATE_CAPTION = 'Tangible business outcomes from combining Generative UI and composable apps'
+
+def build_action_endstate(metrics=ENDSTATE_METRICS, caption=ENDSTATE_CAPTION):
+    W5,H5 = ACTION_ENDSTATE_SIZE
+    s = new_scene(ACTION_ENDSTATE_SIZE)
+    # up to three metric cards
+    mx = 80
+    for i,(label,val) in enumerate(metrics[:3]):
+        x = mx + i*360
+        s.add(
+            Rect(x, 120, 320, 240, radius=12, stroke=WHITE, width=2),
+            TextBox(x+24, 160, 272, None, val, 44, CYAN, max_lines=1, min_size=24),
+            TextBox(x+24, 220, 272, None, label, 20, (200,205,210), max_lines=2),
+        )
+    # small description
+    s.add(TextBox(80, 420, W5-160, None, caption, 20, (200,205,210), max_lines=3))
+
+    # tag
+    return s.add(tag(W5,H5))
+
+
+# importable render functions: the benchmark and the render daemon call
+# figures()[name](scale) instead of running main()
+FIGURES = {
+    'cover_modern': build_cover_modern,
+    'diagram_flow': build_diagram_flow,
+    'action_list': build_action_list,
+    'action_agent': build_action_agent,
+    'action_endstate': build_action_endstate,
+}
+
+def render_figure(build_fn, scale=1, **kwargs):
+    return render_png(build_fn(**kwargs), scale, cache=layers.cache)
+
+def figures():
+    return {name: partial(render_figure, build_fn) for name, build_fn in FIGURES.items()}
+
+# bulk card templates (python -m assetkit.cards): the figures whose text
+# comes from a feed row, with the fields each one takes
+def templates():
+    return {
+        'cover_modern': cards.Template(partial(render_figure, build_cover_modern),
+                                       title=cards.Field(), subtitle=cards.Field(default='')),
+        'action_list': cards.Template(partial(render_figure, build_action_list),
+                                      items=cards.Field(cards.LIST, min_items=1, max_items=3),
+                                      caption=cards.Field(default='')),
+        'action_endstate': cards.Template(partial(render_figure, build_action_endstate),
+                                          metrics=cards.Field(cards.PAIRS, min_items=1, max_items=3),
+                                          caption=cards.Field(default='')),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the Things Are Moving Fast figures.')
+    parser.add_argument('--force', action='store_true',
+                        help='re-render every asset even if its build manifest entry is current')
+    parser.add_argument('--profile', choices=sorted(encode.PROFILES), default='default',
+                        help='encoder profile: dev (fast zlib), release (palette + max compression)')
+    parser.add_argument('--siblings', default=None,
+                        help='comma-separated extra formats written next to each PNG: webp,avif')
+    parser.add_argument('--report', action='store_true',
+                        help='print bytes saved per asset against a bare 32-bit PNG save')
+    parser.add_argument('--encoders', type=int, default=pipeline.DEFAULT_ENCODERS,
+                        help='encode frames on N threads while the next one is drawn (0 = inline)')
+    parser.add_argument('--export-scales', default='',
+                        help='comma-separated large export scales rendered in tiles, e.g. 4,8')
+    parser.add_argument('--srcset', default='',
+                        help='comma-separated responsive widths, e.g. 320,640,960,1200,1600,2400: drawn once '
+                             'at the scale covering the widest, written as name-<width>w.png and listed '
+                             'in srcset.json')
+    parser.add_argument('--pretty-svg', action='store_true',
+                        help='indent the SVGs instead of minifying them')
+    parser.add_argument('--svgz', action='store_true',
+                        help='also write each SVG gzipped as name.svgz')
+    parser.add_argument('--instrument', metavar='PATH', default=None,
+                        help="append per-asset stage timings as JSON lines to PATH ('-' for stderr)")
+    parser.add_argument('--pstats', metavar='PATH', default=None,
+                        help='dump cProfile stats of the render to PATH (implies --instrument -)')
+    parser.add_argument('--store', nargs='?', const=store.DEFAULT_ROOT, default=None, metavar='DIR',
+                        help='keep encodings in the content-addressed store (default assets/.store) '
+                             'and hardlink the outputs to it; frames stored before are not re-encoded')
+    shard.add_argument(parser)
+    args = parser.parse_args(argv)
+    if args.instrument or args.pstats:
+        instrument.enable(args.instrument or '-', args.pstats)
+    siblings = None if args.siblings is None else tuple(f for f in args.siblings.split(',') if f)
+    export_scales = tuple(int(s) for s in args.export_scales.split(',') if s)
+    manifest = shard.open_manifest(OUT_DIR, args.shard, args.force)
+    blob_store = store.BlobStore(args.store) if args.store else None
+    srcset_widths = pyramid.parse_widths(args.srcset)
+    srcset = pyramid.SrcsetManifest(OUT_DIR) if srcset_widths else None
+    with pipeline.Pipeline(args.encoders) as pipe:
+        build = Build(manifest, encode.get_profile(args.profile, siblings), args.report, export_scales,
+                      blob_store, pipe, srcset, srcset_widths, not args.pretty_svg, args.svgz)
+
+        save_png_and_2x(build, build_cover_modern, 'cover_modern.png')
+        # cover without title
+        save_png(build, build_cover_modern, 'cover_modern_notitle.png', title=False)
+        save_svg(build, build_cover_modern, 'cover_modern.svg')
+
+        save_png_and_2x(build, build_diagram_flow, 'diagram_flow.png')
+        save_svg(build, build_diagram_flow, 'diagram_flow.svg')
+
+        save_png_and_2x(build, build_action_list, 'action_list.png')
+        save_svg(build, build_action_list, 'action_list.svg')
+
+        save_png_and_2x(build, build_action_agent, 'action_agent.png')
+        save_svg(build, build_action_agent, 'action_agent.svg')
+
+        save_png_and_2x(build, build_action_endstate, 'action_endstate.png')
+        save_svg(build, build_action_endstate, 'action_endstate.svg')
+
+    if blob_store is not None:
+        blob_store.save()
+    if srcset is not None:
+        srcset.save()
+    manifest.save()
+    instrument.disable()
+    print('Generated assets in', OUT_DIR)
+
+
+if __name__ == '__main__':
+    main()